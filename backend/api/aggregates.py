@@ -0,0 +1,464 @@
+import numpy as np
+import pandas as pd
+import logging
+from collections import Counter
+from .stats_engine import column_moments, grouped_moments, std_from_m2, BASE_QUANTILES
+
+logger = logging.getLogger(__name__)
+
+# Acumuladores combinables (merge) para calcular estadísticas por bloques.
+# Cada uno admite update(bloque) y merge(otro): el resultado de procesar un
+# archivo por trozos, o repartido entre procesos, es el mismo que en una pasada.
+
+class Moments:
+    """
+    Conteo, media, M2, mínimo y máximo por columna (Welford / Chan et al.).
+    La combinación de dos acumuladores es exacta salvo redondeo.
+    """
+    
+    def __init__(self, k):
+        self.count = np.zeros(k, dtype=np.int64)
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.min = np.full(k, np.nan)
+        self.max = np.full(k, np.nan)
+    
+    def update(self, X):
+        """X: matriz float64 (n, k), NaN = valor ausente"""
+        if len(X) == 0:
+            return self
+        other = Moments(X.shape[1])
+        other.count, other.mean, other.m2 = column_moments(X)
+        other.mean = np.nan_to_num(other.mean)
+        other.min = np.fmin.reduce(X, axis=0)
+        other.max = np.fmax.reduce(X, axis=0)
+        return self.merge(other)
+    
+    def merge(self, other):
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(n > 0, other.count / np.maximum(n, 1), 0.0)
+            self.m2 = self.m2 + other.m2 + delta ** 2 * self.count * weight
+        self.mean = self.mean + delta * weight
+        self.count = n
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        return self
+    
+    @property
+    def std(self):
+        return std_from_m2(self.count, self.m2)
+    
+    @property
+    def means(self):
+        """Medias con NaN en columnas sin valores"""
+        return np.where(self.count > 0, self.mean, np.nan)
+
+class Comoments:
+    """
+    Co-momentos C = sum((x - media)(y - media)) entre todas las columnas, por
+    pares completos (igual que pandas y stats_engine.correlation): para cada
+    par (i, j) se acumulan sus filas con ambos valores, la media de i en esas
+    filas (mean[i, j]), su M2 (m2[i, j]) y el co-momento. Suficiente para
+    covarianza y correlación de Pearson.
+    """
+    
+    def __init__(self, k):
+        self.count = np.zeros((k, k), dtype=np.int64)
+        self.mean = np.zeros((k, k))
+        self.m2 = np.zeros((k, k))
+        self.c = np.zeros((k, k))
+    
+    def update(self, X):
+        n, k = X.shape
+        if n == 0:
+            return self
+        other = Comoments(k)
+        valid = ~np.isnan(X)
+        
+        if valid.all():
+            other.count[:] = n
+            mean = X.mean(axis=0)
+            dev = X - mean
+            other.mean[:] = mean[:, None]
+            other.c = dev.T @ dev
+            other.m2[:] = np.diag(other.c)[:, None]
+        else:
+            # Sumas por par con los NaN a 0, sobre los valores desplazados a la
+            # media de cada columna en el bloque para no perder precisión
+            with np.errstate(invalid='ignore', divide='ignore'):
+                shift = np.nan_to_num(np.where(valid, X, 0.0).sum(axis=0) / valid.sum(axis=0))
+                Y = np.where(valid, X - shift, 0.0)
+                V = valid.astype(np.float64)
+                count = V.T @ V
+                sums = Y.T @ V
+                other.count = count.astype(np.int64)
+                other.mean = np.where(count > 0, sums / count + shift[:, None], 0.0)
+                other.m2 = np.where(count > 0, (Y * Y).T @ V - sums * sums / count, 0.0)
+                other.c = np.where(count > 0, Y.T @ Y - sums * sums.T / count, 0.0)
+        return self.merge(other)
+    
+    def merge(self, other):
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(n > 0, other.count / np.maximum(n, 1), 0.0)
+            self.c = self.c + other.c + delta * delta.T * self.count * weight
+            self.m2 = self.m2 + other.m2 + delta ** 2 * self.count * weight
+        self.mean = self.mean + delta * weight
+        self.count = n
+        return self
+    
+    def correlation(self):
+        """Matriz de correlación (k, k); NaN para columnas constantes o pares con menos de 2 filas"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.c / np.sqrt(self.m2 * self.m2.T)
+        corr = np.where(self.count > 1, corr, np.nan)
+        return np.clip(corr, -1.0, 1.0)
+
+class QuantileSketch:
+    """
+    Sketch de cuantiles tipo KLL para una columna.
+    
+    Los valores se guardan en niveles; el nivel h pesa 2**h. Cuando un nivel
+    supera su capacidad se ordena y se promueve uno de cada dos elementos
+    al nivel siguiente. El peso total (conteo) se conserva exactamente y la
+    memoria queda en O(k log(n/k)). Error de rango típico ~1/k.
+    """
+    
+    def __init__(self, k=512, seed=0):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+    
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(8, int(np.ceil(self.k * (2 / 3) ** depth)))
+    
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.count += len(values)
+        self._compress()
+        return self
+    
+    def merge(self, other):
+        for h, items in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.count += other.count
+        self._compress()
+        return self
+    
+    def _compress(self):
+        compacted = True
+        while compacted:
+            compacted = False
+            for h in range(len(self.levels)):
+                items = self.levels[h]
+                if len(items) <= self._capacity(h):
+                    continue
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                odd = len(items) % 2
+                offset = int(self._rng.integers(2))
+                self.levels[h] = items[:odd]
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], items[odd + offset::2]])
+                compacted = True
+    
+    def quantiles(self, qs):
+        """Cuantiles aproximados para una lista de q en [0, 1]"""
+        if self.count == 0:
+            return np.full(len(qs), np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(level), 2 ** h, dtype=np.int64)
+            for h, level in enumerate(self.levels)
+        ])
+        order = np.argsort(items, kind='stable')
+        items, cumulative = items[order], np.cumsum(weights[order])
+        targets = np.asarray(qs) * (cumulative[-1] - 1)
+        idx = np.searchsorted(cumulative, targets, side='right')
+        return items[np.minimum(idx, len(items) - 1)]
+
+# Resolución más fina de los histogramas: 960 es divisible por 2, 3 y 5, así
+# 10, 15, 20, 30, 60... bins se obtienen sumando bins vecinos (ver coarsen)
+PYRAMID_BINS = 960
+HISTOGRAM_BINNINGS = ('linear', 'log', 'quantile')
+
+def bin_resolutions(finest=PYRAMID_BINS, minimum=5):
+    """Números de bins que se obtienen re-agregando finest bins (sus divisores)"""
+    return [bins for bins in range(minimum, finest + 1) if finest % bins == 0]
+
+HISTOGRAM_RESOLUTIONS = tuple(bin_resolutions())
+
+class FixedBinHistogram:
+    """
+    Histograma de bordes fijos por columna, combinable sumando conteos.
+    
+    binning:
+    - 'linear': bins de igual ancho, mismas reglas que np.histogram: el
+      último bin incluye el extremo superior y un rango degenerado
+      (min == max) se amplía a (min - 0.5, max + 0.5).
+    - 'log': bins de igual ancho sobre log1p(x - lower), para columnas de
+      cola larga (src_bytes, duration) donde casi todo cae en el primer bin.
+    - 'quantile': bordes dados en edges (k, bins + 1), p.ej. cuantiles de
+      cada columna (ver stats_engine.quantile_histogram); bins de frecuencia
+      similar. Bordes repetidos dejan bins vacíos de ancho cero y el valor
+      repetido cuenta en el último de ellos.
+    """
+    
+    def __init__(self, lower, upper, bins, binning='linear', edges=None):
+        if binning == 'quantile':
+            edges = np.asarray(edges, dtype=np.float64)
+            lower, upper = edges[:, 0], edges[:, -1]
+        lower = np.asarray(lower, dtype=np.float64)
+        upper = np.asarray(upper, dtype=np.float64)
+        # Columna sin valores: rango (0, 1), como np.histogram de un array vacío
+        empty = np.isnan(lower) | np.isnan(upper)
+        lower = np.where(empty, 0.0, lower)
+        upper = np.where(empty, 1.0, upper)
+        degenerate = lower == upper
+        self.lower = np.where(degenerate, lower - 0.5, lower)
+        self.upper = np.where(degenerate, upper + 0.5, upper)
+        self.bins = bins
+        self.binning = binning
+        self.counts = np.zeros((len(lower), bins), dtype=np.int64)
+        
+        steps = np.linspace(0.0, 1.0, bins + 1)
+        linear = self.lower[:, None] + (self.upper - self.lower)[:, None] * steps
+        if binning == 'quantile':
+            self.edges = np.where(empty[:, None], linear, edges)
+        elif binning == 'log':
+            self.edges = self.lower[:, None] + np.expm1(np.log1p(self.upper - self.lower)[:, None] * steps)
+            self.edges[:, -1] = self.upper  # exacto, sin el redondeo de expm1(log1p(...))
+        else:
+            self.edges = linear
+    
+    def _bin(self, j, x):
+        """Bin de cada valor de x en la columna j (sin validar el rango)"""
+        edges = self.edges[j]
+        if self.binning == 'quantile':
+            return np.searchsorted(edges, x, side='right') - 1
+        
+        # Bin aproximado con aritmética (en escala log1p para 'log')...
+        lower, upper = self.lower[j], self.upper[j]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if self.binning == 'log':
+                scaled = np.log1p(x - lower) * (self.bins / np.log1p(upper - lower))
+            else:
+                scaled = (x - lower) * (self.bins / (upper - lower))
+        np.floor(scaled, out=scaled)
+        np.fmax(scaled, 0, out=scaled)  # fmax/fmin también reemplazan los NaN
+        np.fmin(scaled, self.bins - 1, out=scaled)
+        idx = scaled.astype(np.intp)
+        
+        # ...corregido contra los bordes, como np.histogram: el bin de cada
+        # valor es coherente con los bordes que se retornan
+        idx -= x < edges[idx]
+        idx += x >= edges[idx + 1]
+        return idx
+    
+    def update(self, X):
+        """
+        Todas las columnas en un solo bincount con desplazamiento por columna:
+        el bin b de la columna j cuenta en j * (bins + 1) + b. El hueco bins de
+        cada columna recoge el extremo superior (se suma al último bin) y una
+        posición final, los NaN y valores fuera de rango.
+        
+        X: matriz (n, k) o lista de k columnas 1-D de cualquier dtype numérico
+        (p.ej. los arrays del DataFrame, sin copiarlos a una matriz float64).
+        Cada columna se procesa contigua, con sus bordes en caché.
+        """
+        columns = X.T if isinstance(X, np.ndarray) else X
+        k = len(columns)
+        width = self.bins + 1
+        slots = np.empty((k, len(columns[0]) if k else 0), dtype=np.intp)
+        for j, x in enumerate(columns):
+            idx = self._bin(j, x)
+            idx += j * width
+            idx[~((x >= self.lower[j]) & (x <= self.upper[j]))] = k * width
+            slots[j] = idx
+        
+        counts = np.bincount(slots.ravel(), minlength=k * width + 1)[:-1].reshape(k, width)
+        counts[:, -2] += counts[:, -1]
+        self.counts += counts[:, :-1]
+        return self
+    
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+    
+    def coarsen(self, bins):
+        """(conteos, bordes) con bins intervalos, sumando grupos de bins vecinos"""
+        if self.bins % bins:
+            raise ValueError(f'{bins} bins no divide la resolución del histograma ({self.bins})')
+        factor = self.bins // bins
+        counts = self.counts.reshape(len(self.counts), bins, factor).sum(axis=2)
+        return counts, self.edges[:, ::factor]
+    
+    def pyramid(self, resolutions=None):
+        """{bins: (conteos, bordes)} para cada resolución, de la más fina a la más gruesa"""
+        resolutions = resolutions or bin_resolutions(self.bins)
+        return {bins: self.coarsen(bins) for bins in sorted(resolutions, reverse=True)}
+
+class CategoryCounter:
+    """
+    Frecuencias de valores por columna categórica y, si el bloque trae la
+    columna class, de cada par (valor, class) para las tablas de contingencia.
+    Cada bloque se cuenta con un bincount sobre códigos enteros (los de la
+    columna category o los de pd.factorize): solo los valores distintos del
+    bloque pasan a los Counter.
+    """
+    
+    def __init__(self, columns):
+        self.counts = {col: Counter() for col in columns}
+        self.by_class = {col: Counter() for col in columns}
+    
+    @staticmethod
+    def _codes(values):
+        codes, uniques = pd.factorize(values)
+        return codes.astype(np.intp), list(uniques)
+    
+    def update(self, frame):
+        labels = self._codes(frame['class']) if 'class' in frame.columns else None
+        for col, counter in self.counts.items():
+            codes, values = self._codes(frame[col])
+            valid = codes >= 0
+            counts = np.bincount(codes[valid], minlength=len(values))
+            counter.update(dict(zip(values, counts.tolist())))
+            
+            if labels is not None:
+                label_codes, label_values = labels
+                valid &= label_codes >= 0
+                width = len(label_values)
+                cells = np.bincount(codes[valid] * width + label_codes[valid], minlength=len(values) * width)
+                pairs = self.by_class[col]
+                for cell in np.flatnonzero(cells).tolist():
+                    pairs[values[cell // width], label_values[cell % width]] += int(cells[cell])
+        return self
+    
+    def merge(self, other):
+        for col, counter in self.counts.items():
+            counter.update(other.counts[col])
+            self.by_class[col].update(other.by_class[col])
+        return self
+    
+    def most_common(self, col):
+        """Dict valor -> conteo ordenado de mayor a menor (como value_counts)"""
+        return {value: count for value, count in self.counts[col].most_common() if count > 0}
+    
+    def arrays(self, col):
+        """(valores, conteos) de col en orden de aparición"""
+        counter = self.counts[col]
+        return list(counter), np.fromiter(counter.values(), dtype=np.int64, count=len(counter))
+    
+    def crosstab(self, col):
+        """(valores, etiquetas de class, conteos (valores, etiquetas)) de col"""
+        values = list(self.counts[col])
+        pairs = self.by_class[col]
+        labels = list(dict.fromkeys(label for _, label in pairs))
+        rows = {value: i for i, value in enumerate(values)}
+        columns = {label: j for j, label in enumerate(labels)}
+        table = np.zeros((len(values), len(labels)), dtype=np.int64)
+        for (value, label), count in pairs.items():
+            table[rows[value], columns[label]] += count
+        return values, labels, table
+
+class GroupedMoments:
+    """
+    Momentos por grupo (p.ej. por valor de la columna class). Cada bloque se
+    reduce de una vez con stats_engine.grouped_moments, sin copiar las filas
+    de cada grupo; por eso solo se acumulan conteo, media y M2 (sin mín/máx).
+    """
+    
+    def __init__(self, k):
+        self.k = k
+        self.groups = {}
+    
+    def update(self, X, labels):
+        keys, codes = np.unique(labels, return_inverse=True)
+        count, mean, m2 = grouped_moments(X.T, codes, len(keys))
+        for i, label in enumerate(keys):
+            partial = Moments(self.k)
+            partial.count, partial.mean, partial.m2 = count[i], np.nan_to_num(mean[i]), m2[i]
+            self.groups.setdefault(label, Moments(self.k)).merge(partial)
+        return self
+    
+    def merge(self, other):
+        for label, moments in other.groups.items():
+            self.groups.setdefault(label, Moments(self.k)).merge(moments)
+        return self
+    
+    def get(self, label):
+        return self.groups.get(label, Moments(self.k))
+    
+    def arrays(self, labels):
+        """Conteo, media y M2 de labels como arrays (len(labels), k)"""
+        moments = [self.get(label) for label in labels]
+        return (
+            np.array([m.count for m in moments]).reshape(len(labels), self.k),
+            np.array([m.means for m in moments]).reshape(len(labels), self.k),
+            np.array([m.m2 for m in moments]).reshape(len(labels), self.k),
+        )
+
+class DatasetAggregates:
+    """
+    Conjunto de acumuladores que resume un dataset completo:
+    momentos, co-momentos, sketches de cuantiles por columna, frecuencias
+    categóricas y momentos por clase. Se alimenta por bloques (DataFrames
+    con las mismas columnas) y dos resúmenes parciales se combinan con merge.
+    """
+    
+    def __init__(self, numeric_cols, categorical_cols, sketch_k=512):
+        k = len(numeric_cols)
+        self.numeric_cols = list(numeric_cols)
+        self.categorical_cols = list(categorical_cols)
+        self.rows = 0
+        self.moments = Moments(k)
+        self.comoments = Comoments(k)
+        self.sketches = [QuantileSketch(sketch_k, seed=i) for i in range(k)]
+        self.categories = CategoryCounter(self.categorical_cols)
+        self.class_moments = GroupedMoments(k)
+    
+    def update(self, frame):
+        X = frame[self.numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+        self.rows += len(frame)
+        self.moments.update(X)
+        self.comoments.update(X)
+        for i, sketch in enumerate(self.sketches):
+            sketch.update(X[:, i])
+        self.categories.update(frame)
+        if 'class' in frame.columns:
+            self.class_moments.update(X, frame['class'].to_numpy())
+        return self
+    
+    def merge(self, other):
+        self.rows += other.rows
+        self.moments.merge(other.moments)
+        self.comoments.merge(other.comoments)
+        for sketch, other_sketch in zip(self.sketches, other.sketches):
+            sketch.merge(other_sketch)
+        self.categories.merge(other.categories)
+        self.class_moments.merge(other.class_moments)
+        return self
+    
+    def summary(self, percentiles=None):
+        """Mismo formato que stats_engine.describe, con cuantiles aproximados"""
+        quantiles = sorted(set(BASE_QUANTILES) | set(percentiles or ()))
+        values = np.array([sketch.quantiles(quantiles) for sketch in self.sketches])
+        return {
+            'count': self.moments.count,
+            'mean': self.moments.means,
+            'std': self.moments.std,
+            'min': self.moments.min,
+            'max': self.moments.max,
+            'quantiles': {
+                q: values[:, i] if len(values) else np.empty(0)
+                for i, q in enumerate(quantiles)
+            },
+        }
@@ -1,17 +1,530 @@
+import copy
+import threading
+import time
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import LabelEncoder
 import logging
+from .aggregates import FixedBinHistogram, HISTOGRAM_RESOLUTIONS, PYRAMID_BINS
+from .bitmap_index import BitmapIndex
+from .detector import detector
+from .drift import DriftAnalysis
+from .sampling import CONFIDENCE, STRATA_COLUMNS, StratifiedSample
+from .stats_engine import (
+    BASE_QUANTILES, correlation, describe, effect_sizes, grouped_moments, pool_moments,
+    quantile_histogram, quantile_label, std_from_m2, top_pairs,
+)
 
 logger = logging.getLogger(__name__)
 
+# Histogramas: bins por defecto y filas por bloque al asignar bins
+HISTOGRAM_BINS = 30
+HISTOGRAM_BLOCK_ROWS = 65536
+
+# Valores por columna en el análisis categórico (el resto se suma en 'other')
+CATEGORY_TOP = 20
+
+BINNING_LABELS = {
+    'linear': 'intervalos',
+    'log': 'intervalos logarítmicos',
+    'quantile': 'intervalos de igual frecuencia (cuantiles)',
+}
+
+# Familias de ataque de NSL-KDD (train y test) para la comparación por clase
+# con grouping='family'. La columna class puede traer el nombre del ataque
+# (neptune, satan...) o directamente la familia (dos, probe...).
+ATTACK_FAMILIES = {
+    'dos': (
+        'back', 'land', 'neptune', 'pod', 'smurf', 'teardrop',
+        'apache2', 'mailbomb', 'processtable', 'udpstorm',
+    ),
+    'probe': ('ipsweep', 'nmap', 'portsweep', 'satan', 'mscan', 'saint'),
+    'r2l': (
+        'ftp_write', 'guess_passwd', 'imap', 'multihop', 'phf', 'spy',
+        'warezclient', 'warezmaster', 'named', 'sendmail', 'snmpgetattack',
+        'snmpguess', 'xlock', 'xsnoop', 'httptunnel', 'worm',
+    ),
+    'u2r': ('buffer_overflow', 'loadmodule', 'perl', 'rootkit', 'ps', 'sqlattack', 'xterm'),
+}
+ATTACK_FAMILY = {attack: family for family, attacks in ATTACK_FAMILIES.items() for attack in attacks}
+ANOMALY_GROUPINGS = ('binary', 'family')
+
+def class_groups(labels, grouping='binary'):
+    """
+    Grupos de la comparación por clase y el grupo de cada etiqueta de class.
+    
+    binary: normal / anomaly. family: normal, dos, probe, r2l y u2r, más
+    'anomaly' para ataques sin familia conocida (p.ej. un dataset binario).
+    Retorna (nombres de grupo con 'normal' primero, índice de grupo por etiqueta).
+    """
+    def group(label):
+        key = str(label).lower()
+        if key == 'normal':
+            return 'normal'
+        if grouping == 'family':
+            return key if key in ATTACK_FAMILIES else ATTACK_FAMILY.get(key, 'anomaly')
+        return 'anomaly'
+    
+    assigned = [group(label) for label in labels]
+    names = ['normal', 'anomaly'] if grouping == 'binary' else ['normal', *ATTACK_FAMILIES]
+    if 'anomaly' in assigned and 'anomaly' not in names:
+        names.append('anomaly')
+    return names, np.array([names.index(name) for name in assigned], dtype=np.intp)
+
+def class_filter_labels(labels, name):
+    """
+    Etiquetas de class que selecciona el filtro ?class=name: la propia
+    etiqueta si existe en labels, o todas las del grupo name ('normal',
+    'anomaly' o una familia de ataque, ver class_groups). Lista vacía si
+    ninguna etiqueta de labels corresponde.
+    """
+    labels = list(labels)
+    if name in labels:
+        return [name]
+    key = name.lower()
+    for grouping in ANOMALY_GROUPINGS:
+        names, groups = class_groups(labels, grouping)
+        if key in names:
+            selected = [label for label, group in zip(labels, groups) if names[group] == key]
+            if selected:
+                return selected
+    return []
+
+# Formato de las respuestas. Compartido por DatasetAnalytics y los motores
+# alternativos (p.ej. StreamingAnalytics) para que el JSON sea idéntico.
+
+def overview_payload(total_records, feature_names, numeric_features, categorical_features):
+    return {
+        'total_records': total_records,
+        'total_features': len(feature_names),
+        'numeric_features': numeric_features,
+        'categorical_features': categorical_features,
+        'feature_names': list(feature_names),
+        'dataset_description': (
+            'NSL-KDD 2009: Dataset de detección de intrusiones en redes. '
+            'Contiene registros de conexiones clasificadas como Normal o Anomalía. '
+            '125,973 registros reales con 43 características de tráfico de red.'
+        )
+    }
+
+def class_distribution_payload(class_dist, total):
+    percentages = {
+        k: round((v / total) * 100, 2)
+        for k, v in class_dist.items()
+    }
+    
+    return {
+        'distribution': class_dist,
+        'percentages': percentages,
+        'total_records': total,
+        'explanation': (
+            'Distribución de clases en el dataset. '
+            'Normal: conexiones legítimas. '
+            'Anomaly: conexiones con intentos de ataque.'
+        )
+    }
+
+def statistics_payload(cols, summary, extra=()):
+    """
+    summary: resultado de stats_engine.describe (o equivalente) para cols.
+    Los valores quedan como escalares NumPy (ver renderers.NumpyJSONRenderer).
+    """
+    quantiles = summary['quantiles']
+    stats = {}
+    
+    for i, col in enumerate(cols):
+        stats[col] = {
+            'mean': summary['mean'][i],
+            'median': quantiles[0.5][i],
+            'std': summary['std'][i],
+            'min': summary['min'][i],
+            'max': summary['max'][i],
+            'q25': quantiles[0.25][i],
+            'q75': quantiles[0.75][i],
+        }
+        for q in extra:
+            stats[col][quantile_label(q)] = quantiles[q][i]
+        stats[col]['explanation'] = f'Estadísticas de {col}: Media, mediana, rango y dispersión.'
+    
+    return stats
+
+def _rounded(values, decimals=3):
+    """Array redondeado; los NaN (p.ej. columnas constantes) se renderizan como null"""
+    return np.round(np.asarray(values), decimals)
+
+def correlation_payload(cols, corr):
+    """
+    corr: matriz (k, k) de correlaciones de Pearson en el orden de cols.
+    
+    Formato compacto: la matriz es simétrica con diagonal 1, así que solo se
+    envía el triángulo superior sin diagonal, por filas. El valor del par
+    (i, j) con i < j está en values[i*k - i*(i+1)/2 + (j - i - 1)].
+    """
+    rows, columns = np.triu_indices(len(cols), 1)
+    
+    return {
+        'columns': list(cols),
+        'values': _rounded(corr[rows, columns]),
+        'layout': 'upper_triangle',
+        'explanation': (
+            'Matriz de correlación de Pearson entre características. '
+            'Valores cercanos a 1: correlación positiva fuerte. '
+            'Valores cercanos a -1: correlación negativa fuerte. '
+            'Valores cercanos a 0: sin correlación lineal.'
+        )
+    }
+
+def top_correlations_payload(cols, corr, k):
+    """Los k pares de características con mayor correlación absoluta"""
+    rows, columns = top_pairs(corr, k)
+    values = _rounded(corr[rows, columns])
+    
+    return {
+        'pairs': [
+            {'feature_1': cols[i], 'feature_2': cols[j], 'correlation': value}
+            for i, j, value in zip(rows.tolist(), columns.tolist(), values)
+        ],
+        'explanation': (
+            f'Los {len(values)} pares de características con mayor correlación '
+            'absoluta (positiva o negativa).'
+        )
+    }
+
+def distribution_payload(col, hist, bins, count, binning='linear'):
+    return {
+        'values': hist,
+        'bins': bins,
+        'count': count,
+        'explanation': f'Histograma de {col}: Distribucion de frecuencias en {len(hist)} {BINNING_LABELS[binning]}.'
+    }
+
+def distributions_payload(cols, counts, edges, binning='linear'):
+    """Histogramas de cols a partir de conteos (k, bins) y bordes (k, bins + 1)"""
+    totals = counts.sum(axis=1)
+    return {
+        col: distribution_payload(col, counts[i], edges[i], totals[i], binning)
+        for i, col in enumerate(cols)
+    }
+
+def _top_order(totals, top):
+    """Índices con total > 0 de mayor a menor: los top primeros y el resto"""
+    order = np.argsort(-totals, kind='stable')
+    order = order[totals[order] > 0]
+    return order[:top], order[top:]
+
+def categorical_payload(col, categories, counts, top=CATEGORY_TOP):
+    """
+    Frecuencias de col de mayor a menor. categories y counts van alineados
+    (un conteo por categoría); solo se listan los top valores más
+    frecuentes y el resto se suma en 'other', así el tamaño de la respuesta
+    no depende de la cardinalidad. 'other' va fuera de 'counts' porque
+    puede existir una categoría llamada así (p.ej. service=other).
+    """
+    shown, rest = _top_order(counts, top)
+    return {
+        'counts': dict(zip([categories[i] for i in shown], counts[shown].tolist())),
+        'other': int(counts[rest].sum()),
+        'other_values': len(rest),
+        'distinct': len(shown) + len(rest),
+        'total': int(counts.sum()),
+        'explanation': (
+            f'Frecuencia de valores en {col}. Utilizado para análisis de protocolos y servicios. '
+            f'Se muestran los {len(shown)} valores más frecuentes; otros {len(rest)} se agrupan en other.'
+        )
+    }
+
+def crosstab_payload(col, categories, groups, table, top=CATEGORY_TOP, grouping='binary'):
+    """
+    Tabla de contingencia de col contra class: table (categorías, grupos)
+    con los grupos de class_groups. Los top valores con más registros, el
+    resto sumado por grupo en 'other', y la proporción de cada grupo por valor.
+    """
+    totals = table.sum(axis=1)
+    shown, rest = _top_order(totals, top)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        shares = table / totals[:, None]
+    return {
+        'column': col,
+        'grouping': grouping,
+        'groups': groups,
+        'counts': {categories[i]: dict(zip(groups, table[i].tolist())) for i in shown},
+        'shares': {categories[i]: dict(zip(groups, np.round(shares[i], 4))) for i in shown},
+        'totals': dict(zip([categories[i] for i in shown], totals[shown].tolist())),
+        'other': dict(zip(groups, table[rest].sum(axis=0).tolist())),
+        'other_values': len(rest),
+        'group_totals': dict(zip(groups, table.sum(axis=0).tolist())),
+        'explanation': (
+            f'Registros de cada valor de {col} por clase ({", ".join(groups)}). '
+            'shares: proporción de cada clase dentro del valor; un valor con alta '
+            'proporción de ataques es un indicador de tráfico anómalo.'
+        )
+    }
+
+def anomaly_payload(cols, groups, rows, count, mean, m2, grouping='binary'):
+    """
+    Comparación por clase de cada columna de cols.
+    
+    groups: nombres de grupo con 'normal' (la referencia) primero; rows: filas
+    por grupo; count, mean, m2: arrays (grupos, k) de stats_engine.grouped_moments.
+    Las claves normal_mean / anomaly_mean / difference comparan normal con el
+    conjunto de todos los ataques; 'groups' y 'effect_sizes' detallan cada grupo.
+    """
+    std = std_from_m2(count, m2)
+    attack_count, attack_mean, attack_m2 = pool_moments(count[1:], mean[1:], m2[1:])
+    normal_count, anomaly_count = rows[0], rows[1:].sum()
+    difference, cohens_d, smd = effect_sizes(count[0], mean[0], m2[0], attack_count, attack_mean, attack_m2)
+    by_group = [effect_sizes(count[0], mean[0], m2[0], count[g], mean[g], m2[g]) for g in range(1, len(groups))]
+    
+    comparison = {}
+    for i, col in enumerate(cols):
+        normal_mean = mean[0, i] if normal_count > 0 else 0
+        anomaly_mean = attack_mean[i] if anomaly_count > 0 else 0
+        
+        comparison[col] = {
+            'normal_mean': normal_mean,
+            'anomaly_mean': anomaly_mean,
+            'difference': anomaly_mean - normal_mean,
+            'cohens_d': cohens_d[i],
+            'smd': smd[i],
+            'groups': {
+                name: {'count': count[g, i], 'mean': mean[g, i], 'std': std[g, i]}
+                for g, name in enumerate(groups)
+            },
+            'effect_sizes': {
+                name: {'difference': d[i], 'cohens_d': cd[i], 'smd': sm[i]}
+                for name, (d, cd, sm) in zip(groups[1:], by_group)
+            },
+            'explanation': f'Comparación de {col} entre conexiones normales y anómalas.'
+        }
+    
+    return {
+        'comparison': comparison,
+        'normal_count': normal_count,
+        'anomaly_count': anomaly_count,
+        'grouping': grouping,
+        'reference': groups[0],
+        'groups': dict(zip(groups, rows.tolist())),
+        'explanation': (
+            'Análisis comparativo entre conexiones legítimas y conexiones con anomalías/ataques. '
+            "Cohen's d: diferencia de medias en desviaciones estándar combinadas "
+            '(|d| ~0.2 pequeño, ~0.5 medio, >=0.8 grande). '
+            'SMD: diferencia estandarizada con la media de las varianzas de ambos grupos.'
+        )
+    }
+
+# Valores de referencia publicados para NSL-KDD (clasificadores clásicos)
+REFERENCE_METRICS = {
+    'accuracy': 0.87,
+    'precision': 0.85,
+    'recall': 0.82,
+    'f1_score': 0.83,
+}
+
+def model_metrics_payload():
+    """
+    Métricas del detector entrenado sobre el dataset (api/detector.py).
+    Mientras se entrena, status es 'training' y measured_metrics es None.
+    """
+    model = detector.describe()
+    return {
+        'status': model['status'],
+        'error': model['error'],
+        'measured_metrics': model.get('metrics'),
+        'confusion_matrix': model.get('confusion_matrix'),
+        'model': model.get('info'),
+        'expected_metrics': REFERENCE_METRICS,
+        'explanation': (
+            'Métricas medidas del detector (gradient boosting) sobre un 20% de registros reservados '
+            'para evaluación; expected_metrics son valores de referencia de benchmarks de NSL-KDD. '
+            'Accuracy: Proporción de predicciones correctas. '
+            'Precision: Proporción de anomalías detectadas que son reales. '
+            'Recall: Proporción de anomalías reales que fueron detectadas. '
+            'F1-Score: Media armónica de Precision y Recall. '
+            'Matriz de confusión: [[normal bien clasificadas, falsas alarmas], [ataques no detectados, ataques detectados]].'
+        ),
+        'dataset_characteristics': {
+            'imbalanced': True,
+            'challenge': 'Dataset desbalanceado: 67% normal, 33% anomalía',
+            'real_world': 'Datos reales de traffic de red con múltiples tipos de ataques'
+        }
+    }
+
 class DatasetAnalytics:
-    """Análisis estadístico y visualización del dataset NSL-KDD"""
+    """
+    Análisis estadístico y visualización del dataset NSL-KDD.
+    
+    Los métodos de análisis aceptan filtros opcionales:
+    - mask: máscara booleana de filas (ver select), resuelta con el índice de
+      bitmaps sobre class, protocol_type, service y flag.
+    - features: columnas a incluir (por defecto todas o las primeras N).
+    Las reducciones se hacen sobre los arrays de cada columna enmascarados,
+    sin indexar el DataFrame (que copiaría todas sus columnas).
+    """
+    
+    # Memo de trabajo compartido entre secciones (solo en copias de shared_work)
+    _memo = None
+    _memo_mask = None
     
     def __init__(self, data):
         self.data = data
         self.numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
-        self.categorical_cols = data.select_dtypes(include=['object']).columns.tolist()
+        self.categorical_cols = data.select_dtypes(include=['object', 'category']).columns.tolist()
+        self.index = BitmapIndex(data)
+        self.sample = self._stratified_sample()
+        
+        # Pirámide de histogramas del dataset completo por binning (ver _pyramid),
+        # el histograma del que sale y el min/max de cada columna numérica
+        self._pyramids = {}
+        self._histograms = {}
+        self._bounds = None
+        self._pyramid_lock = threading.Lock()
+        self._pyramid('linear')
+        
+        # Deriva respecto al dataset de prueba (ver get_drift)
+        self._drift = None
+        self._drift_lock = threading.Lock()
+    
+    def appended(self, data):
+        """
+        Motor para data = self.data + filas nuevas al final (recarga por
+        anexado, ver DatasetLoader.refresh) sin recalcular desde cero:
+        - El índice de bitmaps solo codifica las filas nuevas.
+        - Los histogramas lineal y log del dataset completo suman a una copia
+          de los anteriores los conteos de las filas nuevas. Las columnas cuyo
+          min o max cambia (sus bordes ya no son los mismos) se cuentan de nuevo.
+        - quantile (bordes de la columna ordenada) se recalcula al pedirse.
+        El resultado es el mismo que el de DatasetAnalytics(data).
+        """
+        start = self.index.n_rows
+        engine = copy.copy(self)
+        engine.data = data
+        engine.numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
+        engine.categorical_cols = data.select_dtypes(include=['object', 'category']).columns.tolist()
+        if engine.numeric_cols != self.numeric_cols or engine.categorical_cols != self.categorical_cols:
+            return self._fresh(data)
+        
+        engine.index = self.index.appended(data.iloc[start:])
+        engine.sample = engine._stratified_sample()
+        engine._pyramids = {}
+        engine._histograms = {}
+        engine._pyramid_lock = threading.Lock()
+        engine._drift = None
+        engine._drift_lock = threading.Lock()
+        
+        tail = [values[start:] for values in (data[col].to_numpy() for col in self.numeric_cols)]
+        old_lower, old_upper = self._data_bounds()
+        lower = np.fmin(old_lower, [np.fmin.reduce(values) if len(values) else np.nan for values in tail])
+        upper = np.fmax(old_upper, [np.fmax.reduce(values) if len(values) else np.nan for values in tail])
+        engine._bounds = lower, upper
+        same = lambda a, b: (a == b) | (np.isnan(a) & np.isnan(b))
+        changed = ~(same(lower, old_lower) & same(upper, old_upper))
+        
+        for binning, histogram in self._histograms.items():
+            if binning == 'quantile':
+                continue
+            histogram = copy.deepcopy(histogram)
+            for offset in range(0, len(data) - start, HISTOGRAM_BLOCK_ROWS):
+                histogram.update([values[offset:offset + HISTOGRAM_BLOCK_ROWS] for values in tail])
+            if changed.any():
+                cols = [col for col, flag in zip(self.numeric_cols, changed) if flag]
+                fresh = engine._histogram(cols, None, PYRAMID_BINS, binning, (lower[changed], upper[changed]))
+                for name in ('lower', 'upper', 'edges', 'counts'):
+                    getattr(histogram, name)[changed] = getattr(fresh, name)
+            engine._histograms[binning] = histogram
+            engine._pyramids[binning] = histogram.pyramid(HISTOGRAM_RESOLUTIONS)
+        
+        engine._pyramid('linear')
+        return engine
+    
+    def _fresh(self, data):
+        """Motor del mismo tipo construido desde cero sobre data (ver appended)"""
+        return type(self)(data)
+    
+    def _stratified_sample(self):
+        """Muestra estratificada por class x protocol_type para el modo aproximado"""
+        strata = np.zeros(len(self.data), dtype=np.intp)
+        names = [()]
+        for col in STRATA_COLUMNS:
+            if col not in self.data.columns:
+                continue
+            categories, codes = self._category_codes(col)
+            # Código -1 (nulo) -> última posición (None)
+            codes = np.where(codes < 0, len(categories), codes)
+            strata = strata * (len(categories) + 1) + codes
+            names = [(*name, value) for name in names for value in [*categories, None]]
+        return StratifiedSample(strata, names)
+    
+    def approximate(self, error=None, budget_ms=None):
+        """Respuestas aproximadas desde la muestra estratificada (ver ApproximateAnalytics)"""
+        return ApproximateAnalytics(self, error, budget_ms)
+    
+    def select(self, filters):
+        """Máscara booleana de las filas que cumplen filters ({columna: [valores]})"""
+        if not filters:
+            return None
+        return self.index.to_mask(self.index.lookup(filters))
+    
+    def shared_work(self, mask=None):
+        """
+        Copia ligera para calcular varias secciones sobre las mismas filas
+        (ver api/batch.py). Lo que comparten las secciones se extrae una sola
+        vez: las columnas numéricas enmascaradas, los códigos de cada
+        categórica (p.ej. class) y la matriz de correlación.
+        
+        Solo se reutiliza lo calculado con este mismo mask. La copia es de una
+        petición, así que el memo no se comparte entre hilos.
+        """
+        work = copy.copy(self)
+        work._memo = {}
+        work._memo_mask = mask
+        return work
+    
+    def _memoized(self, key, mask, compute):
+        """compute() memoizado en shared_work; sin memo (o con otro mask), directo"""
+        if self._memo is None or mask is not self._memo_mask:
+            return compute()
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+    
+    @staticmethod
+    def _columns(candidates, features, limit=None):
+        """Columnas de candidates pedidas en features (o las primeras limit)"""
+        if features is None:
+            return candidates[:limit] if limit else candidates
+        requested = set(features)
+        return [col for col in candidates if col in requested]
+    
+    def _category_codes(self, col, mask=None):
+        """(categorías, códigos enteros) de col en las filas de mask; -1 = nulo"""
+        def compute():
+            values = self.data[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                categories, codes = values.cat.categories, values.cat.codes.to_numpy()
+            else:
+                codes, categories = pd.factorize(values)
+            return list(categories), codes if mask is None else codes[mask]
+        
+        return self._memoized(('codes', col), mask, compute)
+    
+    def _category_counts(self, col, mask=None):
+        """(categorías, conteo de cada una) de col: un bincount sobre los códigos"""
+        categories, codes = self._category_codes(col, mask)
+        return categories, np.bincount(codes.astype(np.intp) + 1, minlength=len(categories) + 1)[1:]
+    
+    def _value_counts(self, col, mask=None):
+        """
+        Frecuencia de cada valor de col en las filas seleccionadas, de mayor a
+        menor (un bincount sobre los códigos). Sin mask se incluyen también las
+        categorías sin registros, como value_counts de pandas.
+        """
+        categories, counts = self._category_counts(col, mask)
+        order = np.argsort(-counts, kind='stable')
+        if mask is not None:
+            order = order[counts[order] > 0]
+        return dict(zip([categories[i] for i in order], counts[order].tolist()))
+    
+    def _row_count(self, mask=None):
+        return len(self.data) if mask is None else int(np.count_nonzero(mask))
     
     def get_overview(self):
         """
@@ -20,20 +533,14 @@ class DatasetAnalytics:
         NSL-KDD 2009 es un dataset de 125,973 registros de tráfico de red
         usado para entrenar modelos de detección de intrusiones.
         """
-        return {
-            'total_records': len(self.data),
-            'total_features': len(self.data.columns),
-            'numeric_features': len(self.numeric_cols),
-            'categorical_features': len(self.categorical_cols),
-            'feature_names': self.data.columns.tolist(),
-            'dataset_description': (
-                'NSL-KDD 2009: Dataset de detección de intrusiones en redes. '
-                'Contiene registros de conexiones clasificadas como Normal o Anomalía. '
-                '125,973 registros reales con 43 características de tráfico de red.'
-            )
-        }
+        return overview_payload(
+            len(self.data),
+            self.data.columns.tolist(),
+            len(self.numeric_cols),
+            len(self.categorical_cols),
+        )
     
-    def get_class_distribution(self):
+    def get_class_distribution(self, mask=None):
         """
         Distribución de clases (Normal vs Anomalía).
         Importante para entender el balance del dataset.
@@ -42,162 +549,413 @@ class DatasetAnalytics:
         Esta proporción es crucial para evaluar métricas de accuracy.
         """
         if 'class' in self.data.columns:
-            class_dist = self.data['class'].value_counts().to_dict()
-            total = len(self.data)
-            
-            percentages = {
-                k: round((v / total) * 100, 2) 
-                for k, v in class_dist.items()
-            }
-            
-            return {
-                'distribution': class_dist,
-                'percentages': percentages,
-                'total_records': total,
-                'explanation': (
-                    'Distribución de clases en el dataset. '
-                    'Normal: conexiones legítimas. '
-                    'Anomaly: conexiones con intentos de ataque.'
-                )
-            }
+            class_dist = self._value_counts('class', mask)
+            return class_distribution_payload(class_dist, self._row_count(mask))
         return {'error': 'Columna class no encontrada'}
     
-    def get_statistics(self):
+    def _positions(self, cols):
+        """Índices de cols en numeric_cols; slice si son consecutivos"""
+        idx = [self.numeric_cols.index(col) for col in cols]
+        if not idx:
+            return slice(0, 0)
+        if idx == list(range(idx[0], idx[0] + len(idx))):
+            return slice(idx[0], idx[0] + len(idx))
+        return idx
+    
+    def _column(self, col, mask=None):
+        """
+        Array de la columna numérica col, en su dtype, en las filas de mask.
+        En shared_work cada columna enmascarada se extrae una sola vez y la
+        comparten las secciones.
+        """
+        values = self.data[col].to_numpy()
+        if mask is None:
+            return values
+        return self._memoized(('column', col), mask, lambda: values[mask])
+    
+    def get_statistics(self, percentiles=None, mask=None, features=None):
         """
         Estadísticas descriptivas de características numéricas.
         Media, mediana, desviación estándar, min, max.
-        """
-        stats = {}
-        
-        for col in self.numeric_cols:
-            col_data = self.data[col].dropna()
-            stats[col] = {
-                'mean': float(col_data.mean()),
-                'median': float(col_data.median()),
-                'std': float(col_data.std()),
-                'min': float(col_data.min()),
-                'max': float(col_data.max()),
-                'q25': float(col_data.quantile(0.25)),
-                'q75': float(col_data.quantile(0.75)),
-                'explanation': f'Estadísticas de {col}: Media, mediana, rango y dispersión.'
-            }
         
-        return stats
+        Cada columna se reduce en su dtype, sin pasar el conjunto a una
+        matriz float64 (ver stats_engine.describe). percentiles: lista
+        opcional de percentiles extra en [0, 1], p.ej. [0.9, 0.99] -> 'p90', 'p99'.
+        """
+        extra = sorted(set(percentiles or ()))
+        cols = self._columns(self.numeric_cols, features)
+        summary = describe((self._column(col, mask) for col in cols), extra)
+        return statistics_payload(cols, summary, extra)
+    
+    def _correlation(self, mask=None, features=None):
+        """Columnas y matriz de correlación (ver stats_engine.correlation)"""
+        cols = self._columns(self.numeric_cols, features)
+        columns = (self._column(col, mask) for col in cols)
+        return cols, correlation(columns, self._row_count(mask))
+    
+    def _shared_correlation(self, mask=None, features=None):
+        """_correlation una sola vez para matriz y top pares en shared_work"""
+        key = ('correlation', tuple(features) if features is not None else None)
+        return self._memoized(key, mask, lambda: self._correlation(mask, features))
     
-    def get_correlation_matrix(self):
+    def get_correlation_matrix(self, mask=None, features=None):
         """
         Matriz de correlación de Pearson entre características numéricas.
         Valores cercanos a 1 o -1 indican fuerte correlación.
         
         Importante: Solo captura correlaciones LINEALES.
         """
-        corr_matrix = self.data[self.numeric_cols].corr().round(3)
-        
-        return {
-            'correlation_matrix': corr_matrix.to_dict(),
-            'explanation': (
-                'Matriz de correlación de Pearson entre características. '
-                'Valores cercanos a 1: correlación positiva fuerte. '
-                'Valores cercanos a -1: correlación negativa fuerte. '
-                'Valores cercanos a 0: sin correlación lineal.'
+        return correlation_payload(*self._shared_correlation(mask, features))
+    
+    def get_top_correlations(self, k=10, mask=None, features=None):
+        """Los k pares de características más correlacionados (en valor absoluto)"""
+        cols, corr = self._shared_correlation(mask, features)
+        return top_correlations_payload(cols, corr, k)
+    
+    def _data_bounds(self):
+        """(min, max) de cada columna numérica del dataset completo, ignorando NaN"""
+        if self._bounds is None:
+            columns = [self.data[col].to_numpy() for col in self.numeric_cols]
+            self._bounds = (
+                np.array([np.fmin.reduce(values) if len(values) else np.nan for values in columns], dtype=np.float64),
+                np.array([np.fmax.reduce(values) if len(values) else np.nan for values in columns], dtype=np.float64),
             )
-        }
+        return self._bounds
     
-    def get_feature_distributions(self):
+    def _histogram(self, cols, mask=None, bins=PYRAMID_BINS, binning='linear', bounds=None):
         """
-        Distribuciones de cada característica numérica.
-        Útil para identificar outliers y patrones.
+        FixedBinHistogram de cols en las filas de mask. Los bordes salen del
+        min/max de cada columna (o de bounds) y los conteos, de una pasada por
+        bloques de filas (vistas de los arrays, en su dtype) con un solo
+        bincount por bloque. Con binning='quantile', de la columna ordenada.
         """
-        distributions = {}
+        columns = [self._column(col, mask) for col in cols]
+        if binning == 'quantile':
+            # Bordes y conteos salen del mismo ordenamiento de cada columna
+            edges, counts = quantile_histogram(columns, bins)
+            histogram = FixedBinHistogram(None, None, bins, binning, edges)
+            histogram.counts += counts
+            return histogram
         
-        for col in self.numeric_cols[:10]:  # Limitar a 10 características por rendimiento
-            col_data = self.data[col].dropna()
-            
-            # Crear histograma con 30 bins
-            hist, bins = np.histogram(col_data, bins=30)
-            
-            distributions[col] = {
-                'values': hist.tolist(),
-                'bins': bins.tolist(),
-                'count': int(col_data.count()),
-                'explanation': f'Histograma de {col}: Distribucion de frecuencias en 30 intervalos.'
-            }
+        if bounds is None:
+            lower = [np.fmin.reduce(values) if len(values) else np.nan for values in columns]
+            upper = [np.fmax.reduce(values) if len(values) else np.nan for values in columns]
+        else:
+            lower, upper = bounds
+        histogram = FixedBinHistogram(lower, upper, bins, binning)
+        n = self._row_count(mask)
+        for start in range(0, n, HISTOGRAM_BLOCK_ROWS):
+            histogram.update([values[start:start + HISTOGRAM_BLOCK_ROWS] for values in columns])
+        return histogram
+    
+    def _pyramid(self, binning):
+        """
+        Histogramas del dataset completo en todas las resoluciones
+        (HISTOGRAM_RESOLUTIONS): se cuentan una vez a PYRAMID_BINS bins y las
+        demás resoluciones se re-agregan sumando bins vecinos. El binning
+        lineal se calcula al crear el objeto; log y quantile, al pedirse.
+        """
+        if binning not in self._pyramids:
+            with self._pyramid_lock:
+                if binning not in self._pyramids:
+                    bounds = None if binning == 'quantile' else self._data_bounds()
+                    histogram = self._histogram(self.numeric_cols, None, PYRAMID_BINS, binning, bounds)
+                    self._histograms[binning] = histogram
+                    self._pyramids[binning] = histogram.pyramid(HISTOGRAM_RESOLUTIONS)
+        return self._pyramids[binning]
+    
+    def get_drift(self, test, features=None):
+        """
+        Deriva de test (el dataset de prueba de la versión) respecto al
+        dataset cargado: PSI y KS por columna numérica, PSI y Jensen-Shannon
+        por categórica (ver api/drift.py). La primera llamada construye el
+        DriftAnalysis desde el histograma quantile de la pirámide y los
+        conteos por categoría; las siguientes solo arman el payload.
+        """
+        if self._drift is None or self._drift.current is not test:
+            with self._drift_lock:
+                if self._drift is None or self._drift.current is not test:
+                    self._pyramid('quantile')
+                    self._drift = DriftAnalysis(
+                        self.numeric_cols,
+                        self._histograms['quantile'],
+                        [self.data[col].to_numpy() for col in self.numeric_cols],
+                        {col: self._category_counts(col) for col in self.categorical_cols},
+                        test,
+                    )
+        return self._drift.report(features)
+    
+    def get_feature_distributions(self, bins=HISTOGRAM_BINS, binning='linear', mask=None, features=None):
+        """
+        Distribuciones de cada característica numérica.
+        Útil para identificar outliers y patrones.
         
-        return distributions
+        bins: número de intervalos; binning: 'linear' (igual ancho), 'log'
+        (igual ancho sobre log1p, para colas largas) o 'quantile' (igual
+        frecuencia). Sin filtro de filas y con bins en HISTOGRAM_RESOLUTIONS
+        los conteos salen de la pirámide precalculada, sin recorrer los datos.
+        """
+        cols = self._columns(self.numeric_cols, features)
+        if mask is None and bins in HISTOGRAM_RESOLUTIONS:
+            counts, edges = self._pyramid(binning)[bins]
+            positions = self._positions(cols)
+            counts, edges = counts[positions], edges[positions]
+        else:
+            histogram = self._histogram(cols, mask, bins, binning)
+            counts, edges = histogram.counts, histogram.edges
+        return distributions_payload(cols, counts, edges, binning)
     
-    def get_categorical_analysis(self):
+    def get_categorical_analysis(self, top=CATEGORY_TOP, mask=None, features=None):
         """
         Análisis de características categóricas.
         Muestra frecuencia de cada categoría.
+        
+        Todas las columnas categóricas, contadas con un bincount sobre sus
+        códigos enteros (lineal en filas, sin hashear strings). Por columna
+        se listan los top valores más frecuentes y el resto va a 'other'.
         """
-        categorical_analysis = {}
+        return {
+            col: categorical_payload(col, *self._category_counts(col, mask), top)
+            for col in self._columns(self.categorical_cols, features)
+        }
+    
+    def get_categorical_crosstab(self, column, top=CATEGORY_TOP, grouping='binary', mask=None):
+        """
+        Tabla de contingencia de una columna categórica contra class
+        (grouping como en get_anomaly_statistics). Un solo bincount sobre
+        código de valor * grupos + grupo de class; filas con nulos se omiten.
+        """
+        if 'class' not in self.data.columns:
+            return {'error': 'Columna class no encontrada'}
         
-        for col in self.categorical_cols[:5]:  # Limitar a 5 por rendimiento
-            value_counts = self.data[col].value_counts().to_dict()
-            total = sum(value_counts.values())
-            
-            categorical_analysis[col] = {
-                'counts': value_counts,
-                'total': total,
-                'explanation': f'Frecuencia de valores en {col}. Utilizado para análisis de protocolos y servicios.'
-            }
+        categories, codes = self._category_codes(column, mask)
+        labels, class_codes = self._category_codes('class', mask)
+        groups, table = class_groups(labels, grouping)
+        row_groups = np.append(table, -1)[class_codes]
         
-        return categorical_analysis
+        valid = (codes >= 0) & (row_groups >= 0)
+        cells = codes.astype(np.intp) * len(groups) + row_groups
+        counts = np.bincount(cells[valid], minlength=len(categories) * len(groups))
+        return crosstab_payload(column, categories, groups, counts.reshape(len(categories), len(groups)), top, grouping)
     
-    def get_anomaly_statistics(self):
+    def get_anomaly_statistics(self, mask=None, features=None, grouping='binary'):
         """
         Estadísticas específicas para detección de anomalías.
-        Compara características entre conexiones normales y anómalas.
+        Compara características entre conexiones normales y anómalas
+        (grouping='binary') o entre normal y cada familia de ataque
+        (grouping='family': DoS, Probe, R2L, U2R).
+        
+        Una sola reducción agrupada sobre los códigos de class (ver
+        stats_engine.grouped_moments): media, desviación y conteo de cada
+        grupo para todas las columnas, sin copiar las filas de cada clase.
         """
         if 'class' not in self.data.columns:
             return {'error': 'Columna class no encontrada'}
         
-        normal_data = self.data[self.data['class'] == 'normal']
-        anomaly_data = self.data[self.data['class'] == 'anomaly']
-        
-        comparison = {}
-        
-        for col in self.numeric_cols[:10]:
-            if col in self.data.columns:
-                normal_mean = float(normal_data[col].mean()) if len(normal_data) > 0 else 0
-                anomaly_mean = float(anomaly_data[col].mean()) if len(anomaly_data) > 0 else 0
-                
-                comparison[col] = {
-                    'normal_mean': normal_mean,
-                    'anomaly_mean': anomaly_mean,
-                    'difference': anomaly_mean - normal_mean,
-                    'explanation': f'Comparación de {col} entre conexiones normales y anómalas.'
-                }
+        cols = self._columns(self.numeric_cols, features)
+        categories, codes = self._category_codes('class', mask)
+        groups, table = class_groups(categories, grouping)
+        # Código -1 (class nula) -> sin grupo
+        row_groups = np.append(table, -1)[codes]
         
-        return {
-            'comparison': comparison,
-            'normal_count': len(normal_data),
-            'anomaly_count': len(anomaly_data),
-            'explanation': 'Análisis comparativo entre conexiones legítimas y conexiones con anomalías/ataques.'
-        }
+        count, mean, m2 = grouped_moments((self._column(col, mask) for col in cols), row_groups, len(groups))
+        rows = np.bincount(row_groups + 1, minlength=len(groups) + 1)[1:]
+        return anomaly_payload(cols, groups, rows, count, mean, m2, grouping)
     
     def get_model_metrics(self):
         """
-        Métricas de desempeño esperadas para un modelo de detección.
-        Basadas en benchmarks del dataset NSL-KDD.
+        Métricas medidas del detector entrenado (api/detector.py), con los
+        valores de referencia de NSL-KDD. El entrenamiento ocurre en segundo plano.
         """
+        return model_metrics_payload()
+
+class ApproximateAnalytics:
+    """
+    Versión aproximada de los análisis de DatasetAnalytics (?approx=): se
+    responden desde una muestra de su StratifiedSample (api/sampling.py),
+    así que la latencia depende del tamaño de la muestra y no del dataset.
+    
+    El tamaño sale de un error objetivo (semiamplitud del intervalo de una
+    media en desviaciones estándar de la columna) o de un presupuesto de
+    tiempo. Cada respuesta es {'approximation': descripción de la muestra,
+    'results': el payload del modo exacto}, con un intervalo de confianza
+    en 'ci' para medias, cuantiles y proporciones.
+    
+    Como class es una de las columnas de estratificación, las proporciones
+    de class (y de protocol_type) sin filtros son exactas.
+    """
+    
+    def __init__(self, analytics, error=None, budget_ms=None):
+        self.analytics = analytics
+        self.data = analytics.data
+        self.error = error
+        self.budget_ms = budget_ms
+    
+    def _selection(self, columns):
+        sample = self.analytics.sample
+        return sample.select(sample.size_for(self.error, self.budget_ms, columns))
+    
+    def _measured(self, selection, columns, compute):
+        """compute() midiendo su duración para el coste por valor del presupuesto de tiempo"""
+        started = time.perf_counter()
+        payload = compute()
+        self.analytics.sample.observe(time.perf_counter() - started, selection.rows * max(columns, 1))
+        return payload
+    
+    def _response(self, payload, selection, domain_rows):
+        sample = self.analytics.sample
         return {
-            'expected_metrics': {
-                'accuracy': 0.87,
-                'precision': 0.85,
-                'recall': 0.82,
-                'f1_score': 0.83,
+            'approximation': {
+                'sample_rows': selection.rows,
+                'population_rows': sample.rows,
+                'estimated_rows': int(round(domain_rows)),
+                'strata': len(sample.names),
+                'stratified_by': [col for col in STRATA_COLUMNS if col in self.data.columns],
+                'confidence': CONFIDENCE,
+                'target_error': self.error if self.budget_ms is None else None,
+                'time_budget_ms': self.budget_ms,
+                'explanation': (
+                    'Resultados estimados sobre una muestra aleatoria estratificada por class y '
+                    f'protocol_type ({selection.rows} de {sample.rows} registros). ci: intervalo '
+                    f'de confianza al {CONFIDENCE:.0%} de cada estimación.'
+                ),
             },
-            'explanation': (
-                'Métricas esperadas basadas en benchmarks del dataset NSL-KDD. '
-                'Accuracy: Proporción de predicciones correctas. '
-                'Precision: Proporción de anomalías detectadas que son reales. '
-                'Recall: Proporción de anomalías reales que fueron detectadas. '
-                'F1-Score: Media armónica de Precision y Recall.'
-            ),
-            'dataset_characteristics': {
-                'imbalanced': True,
-                'challenge': 'Dataset desbalanceado: 67% normal, 33% anomalía',
-                'real_world': 'Datos reales de traffic de red con múltiples tipos de ataques'
-            }
+            'results': payload,
         }
+    
+    def _domain(self, selection, mask):
+        return None if mask is None else mask[selection.positions]
+    
+    def _matrix(self, selection, cols, domain):
+        """Columnas cols en las filas de la muestra (float64) y su máscara de valores válidos"""
+        Y = np.empty((selection.rows, len(cols)))
+        for j, col in enumerate(cols):
+            Y[:, j] = self.data[col].to_numpy()[selection.positions]
+        valid = ~np.isnan(Y)
+        if domain is not None:
+            valid &= domain[:, None]
+        return Y, valid
+    
+    def get_statistics(self, percentiles=None, mask=None, features=None):
+        extra = sorted(set(percentiles or ()))
+        cols = self.analytics._columns(self.analytics.numeric_cols, features)
+        selection = self._selection(len(cols))
+        
+        def compute():
+            Y, valid = self._matrix(selection, cols, self._domain(selection, mask))
+            mean, half, total, std = selection.means(Y, valid)
+            quantiles = selection.quantiles(Y, valid, sorted(set(BASE_QUANTILES) | set(extra)))
+            if mask is None:
+                # Min y max exactos del dataset completo (ya calculados para los histogramas)
+                lower, upper = self.analytics._data_bounds()
+                positions = self.analytics._positions(cols)
+                col_min, col_max = lower[positions], upper[positions]
+            else:
+                with np.errstate(invalid='ignore'):
+                    col_min = np.where(valid, Y, np.inf).min(axis=0, initial=np.inf)
+                    col_max = np.where(valid, Y, -np.inf).max(axis=0, initial=-np.inf)
+                empty = ~valid.any(axis=0)
+                col_min[empty] = col_max[empty] = np.nan
+            
+            summary = {
+                'mean': mean, 'std': std, 'min': col_min, 'max': col_max,
+                'quantiles': {q: estimate for q, (estimate, _, _) in quantiles.items()},
+            }
+            payload = statistics_payload(cols, summary, extra)
+            labels = {0.25: 'q25', 0.5: 'median', 0.75: 'q75', **{q: quantile_label(q) for q in extra}}
+            for i, col in enumerate(cols):
+                ci = {'mean': [mean[i] - half[i], mean[i] + half[i]]}
+                for q, (_, low, high) in quantiles.items():
+                    ci[labels[q]] = [low[i], high[i]]
+                payload[col]['ci'] = ci
+            return self._response(payload, selection, total.max(initial=0))
+        
+        return self._measured(selection, len(cols), compute)
+    
+    def _category_estimates(self, selection, col, domain):
+        """(categorías, conteos estimados, proporción, semiamplitud, tamaño del dominio) de col"""
+        categories, codes = self.analytics._category_codes(col)
+        p, half, total = selection.proportions(codes[selection.positions], len(categories), domain)
+        counts = np.rint(np.nan_to_num(p) * total).astype(np.int64)
+        return categories, counts, p, half, total
+    
+    def get_class_distribution(self, mask=None):
+        if 'class' not in self.data.columns:
+            return {'error': 'Columna class no encontrada'}
+        selection = self._selection(1)
+        
+        def compute():
+            categories, counts, p, half, total = self._category_estimates(
+                selection, 'class', self._domain(selection, mask)
+            )
+            order = np.argsort(-counts, kind='stable')
+            if mask is not None:
+                order = order[counts[order] > 0]
+            payload = class_distribution_payload(
+                dict(zip([categories[i] for i in order], counts[order].tolist())), int(round(total))
+            )
+            payload['ci'] = {
+                categories[i]: [round(max(p[i] - half[i], 0) * 100, 2), round(min(p[i] + half[i], 1) * 100, 2)]
+                for i in order
+            }
+            return self._response(payload, selection, total)
+        
+        return self._measured(selection, 1, compute)
+    
+    def get_categorical_analysis(self, top=CATEGORY_TOP, mask=None, features=None):
+        cols = self.analytics._columns(self.analytics.categorical_cols, features)
+        selection = self._selection(len(cols))
+        
+        def compute():
+            domain = self._domain(selection, mask)
+            payload, total = {}, 0.0
+            for col in cols:
+                categories, counts, p, half, total = self._category_estimates(selection, col, domain)
+                payload[col] = categorical_payload(col, categories, counts, top)
+                shown, _ = _top_order(counts, top)
+                payload[col]['ci'] = {
+                    categories[i]: [max(round(p[i] - half[i], 4), 0.0), min(round(p[i] + half[i], 4), 1.0)]
+                    for i in shown
+                }
+            return self._response(payload, selection, total)
+        
+        return self._measured(selection, len(cols), compute)
+    
+    def get_anomaly_statistics(self, mask=None, features=None, grouping='binary'):
+        if 'class' not in self.data.columns:
+            return {'error': 'Columna class no encontrada'}
+        
+        cols = self.analytics._columns(self.analytics.numeric_cols, features)
+        selection = self._selection(len(cols))
+        
+        def compute():
+            domain = self._domain(selection, mask)
+            categories, codes = self.analytics._category_codes('class')
+            groups, table = class_groups(categories, grouping)
+            row_groups = np.append(table, -1)[codes[selection.positions]]
+            Y, valid = self._matrix(selection, cols, domain)
+            
+            count = np.zeros((len(groups), len(cols)))
+            mean = np.full((len(groups), len(cols)), np.nan)
+            m2 = np.zeros((len(groups), len(cols)))
+            half = np.full((len(groups), len(cols)), np.nan)
+            for g in range(len(groups)):
+                mean[g], half[g], count[g], std = selection.means(Y, valid & (row_groups == g)[:, None])
+                m2[g] = np.nan_to_num(std ** 2 * (count[g] - 1))
+            count = np.rint(count)
+            _, attack_half, _, _ = selection.means(Y, valid & (row_groups > 0)[:, None])
+            
+            shares, _, total = selection.proportions(row_groups, len(groups), domain)
+            rows = np.rint(np.nan_to_num(shares) * total).astype(np.int64)
+            payload = anomaly_payload(cols, groups, rows, count, mean, m2, grouping)
+            
+            for i, col in enumerate(cols):
+                entry = payload['comparison'][col]
+                for g, name in enumerate(groups):
+                    entry['groups'][name]['ci'] = [mean[g, i] - half[g, i], mean[g, i] + half[g, i]]
+                # normal y ataques no comparten estratos: estimaciones independientes
+                spread = np.hypot(half[0, i], attack_half[i])
+                entry['difference_ci'] = [entry['difference'] - spread, entry['difference'] + spread]
+            return self._response(payload, selection, total)
+        
+        return self._measured(selection, len(cols), compute)
@@ -0,0 +1,81 @@
+import logging
+from .analytics import CATEGORY_TOP
+from .metrics import phase
+
+logger = logging.getLogger(__name__)
+
+# Secciones que pide el dashboard al cargar, en orden
+DEFAULT_SECTIONS = (
+    'overview', 'class-distribution', 'statistics', 'correlation-matrix',
+    'feature-distributions', 'categorical-analysis', 'anomaly-analysis', 'model-metrics',
+)
+
+# Cada sección con el nombre de su endpoint. filters: kwargs de
+# views._dataset_filters ({} o {'mask', 'features'}); options: percentiles, k,
+# bins, binning, top y grouping.
+
+def _overview(analytics, filters, options):
+    return analytics.get_overview()
+
+def _class_distribution(analytics, filters, options):
+    rows = {key: value for key, value in filters.items() if key != 'features'}
+    return analytics.get_class_distribution(**rows)
+
+def _statistics(analytics, filters, options):
+    return analytics.get_statistics(percentiles=options.get('percentiles'), **filters)
+
+def _correlation_matrix(analytics, filters, options):
+    return analytics.get_correlation_matrix(**filters)
+
+def _top_correlations(analytics, filters, options):
+    return analytics.get_top_correlations(k=options.get('k', 10), **filters)
+
+def _feature_distributions(analytics, filters, options):
+    histogram = {name: options[name] for name in ('bins', 'binning') if name in options}
+    return analytics.get_feature_distributions(**histogram, **filters)
+
+def _categorical_analysis(analytics, filters, options):
+    return analytics.get_categorical_analysis(top=options.get('top', CATEGORY_TOP), **filters)
+
+def _anomaly_analysis(analytics, filters, options):
+    return analytics.get_anomaly_statistics(grouping=options.get('grouping', 'binary'), **filters)
+
+def _model_metrics(analytics, filters, options):
+    return analytics.get_model_metrics()
+
+SECTIONS = {
+    'overview': _overview,
+    'class-distribution': _class_distribution,
+    'statistics': _statistics,
+    'correlation-matrix': _correlation_matrix,
+    'top-correlations': _top_correlations,
+    'feature-distributions': _feature_distributions,
+    'categorical-analysis': _categorical_analysis,
+    'anomaly-analysis': _anomaly_analysis,
+    'model-metrics': _model_metrics,
+}
+
+def iter_sections(analytics, sections, filters=None, **options):
+    """
+    Calcula las secciones pedidas una tras otra y genera (sección, payload,
+    error) en cuanto cada una está lista. Un fallo en una sección no detiene
+    las demás: se genera con payload None y el mensaje en error.
+    
+    Con DatasetAnalytics todas las secciones se calculan sobre un mismo
+    shared_work: la matriz numérica, la máscara de NaN, los códigos de class y
+    la correlación se extraen una sola vez. StreamingAnalytics ya comparte su
+    pasada sobre el archivo entre secciones.
+    """
+    filters = filters or {}
+    if hasattr(analytics, 'shared_work'):
+        analytics = analytics.shared_work(filters.get('mask'))
+    
+    for name in sections:
+        try:
+            with phase(f'compute:{name}', 'batch'):
+                payload = SECTIONS[name](analytics, filters, options)
+        except Exception as e:
+            logger.error(f"Error en la sección {name} del batch: {e}")
+            yield name, None, str(e)
+        else:
+            yield name, payload, None
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Columnas categóricas por las que se puede filtrar el dashboard
+INDEXED_COLUMNS = ('class', 'protocol_type', 'service', 'flag')
+
+# Bits a 1 en cada byte, para contar filas sin desempaquetar
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+class BitmapIndex:
+    """
+    Índice de bitmaps por valor para columnas categóricas.
+    
+    Cada valor de cada columna indexada tiene un bitmap empaquetado
+    (np.packbits, 1 bit por fila). Un filtro como
+    class=anomaly & protocol_type=tcp & service in (http, ftp) se resuelve
+    con OR dentro de cada columna y AND entre columnas sobre n/8 bytes,
+    sin crear copias del DataFrame.
+    """
+    
+    def __init__(self, data, columns=INDEXED_COLUMNS):
+        self.n_rows = len(data)
+        self.bitmaps = {}
+        
+        for col in columns:
+            if col not in data.columns:
+                continue
+            categorical = pd.Categorical(data[col])
+            codes = np.asarray(categorical.codes)
+            self.bitmaps[col] = {
+                str(value): np.packbits(codes == code)
+                for code, value in enumerate(categorical.categories)
+            }
+    
+    def appended(self, tail):
+        """
+        Índice de las filas actuales más las de tail, añadidas al final, sin
+        volver a codificar las existentes: los bytes completos de cada bitmap
+        se conservan y solo el último byte parcial se desempaqueta para
+        continuar con los bits de las filas nuevas.
+        """
+        index = BitmapIndex.__new__(BitmapIndex)
+        index.n_rows = self.n_rows + len(tail)
+        index.bitmaps = {}
+        full, partial = divmod(self.n_rows, 8)
+        
+        for col, bitmaps in self.bitmaps.items():
+            categorical = pd.Categorical(tail[col])
+            codes = np.asarray(categorical.codes)
+            tail_codes = {str(value): code for code, value in enumerate(categorical.categories)}
+            empty = np.zeros(len(tail), dtype=bool)
+            
+            column_bitmaps = {}
+            for value in sorted(set(bitmaps) | set(tail_codes)):
+                old = bitmaps.get(value)
+                if old is None:
+                    old = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+                bits = codes == tail_codes[value] if value in tail_codes else empty
+                if partial:
+                    bits = np.concatenate([np.unpackbits(old[full:full + 1], count=partial).view(bool), bits])
+                column_bitmaps[value] = np.concatenate([old[:full], np.packbits(bits)])
+            index.bitmaps[col] = column_bitmaps
+        return index
+    
+    def values(self, col):
+        return list(self.bitmaps.get(col, {}))
+    
+    def lookup(self, filters):
+        """
+        filters: {columna: [valores]}. Retorna el bitmap empaquetado de las filas
+        que cumplen todos los filtros, o None si no hay filtros.
+        """
+        result = None
+        for col, values in filters.items():
+            column_bitmaps = self.bitmaps[col]
+            selected = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+            for value in values:
+                np.bitwise_or(selected, column_bitmaps[value], out=selected)
+            result = selected if result is None else np.bitwise_and(result, selected, out=result)
+        return result
+    
+    def to_mask(self, bitmap):
+        """Bitmap empaquetado -> máscara booleana de n_rows"""
+        return np.unpackbits(bitmap, count=self.n_rows).view(bool)
+    
+    def count(self, bitmap):
+        """Número de filas seleccionadas (popcount)"""
+        return int(_POPCOUNT[bitmap].sum(dtype=np.int64))
@@ -0,0 +1,501 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+logger = logging.getLogger(__name__)
+
+# Versión del formato en disco. Incrementar invalida todas las cachés existentes.
+FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+# Caracteres del hash SHA-256 de la fuente en el nombre de cada store (<nombre>-<hash>)
+STORE_DIGEST_CHARS = 12
+
+def file_digest(path, block_size=1 << 20):
+    """Hash SHA-256 del contenido de un archivo, leído por bloques"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def file_digests(path, prefix_size, block_size=1 << 20):
+    """
+    (hash de los primeros prefix_size bytes, hash del archivo completo) en
+    una sola lectura. Si el primero coincide con el hash de una versión
+    anterior de prefix_size bytes, el archivo solo creció por el final.
+    """
+    digest = hashlib.sha256()
+    prefix = None
+    remaining = prefix_size
+    with open(path, 'rb') as fh:
+        while remaining > 0:
+            block = fh.read(min(block_size, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+        if remaining == 0:
+            prefix = digest.copy().hexdigest()
+        for block in iter(lambda: fh.read(block_size), b''):
+            digest.update(block)
+    return prefix, digest.hexdigest()
+
+def file_signature(path):
+    """Tamaño y mtime (ns) del archivo: comprobación rápida antes del hash"""
+    st = os.stat(path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+def frame_fingerprint(data):
+    """
+    Huella (BLAKE2b) del contenido de un DataFrame: nombres, tipos y bytes
+    de cada columna. Las columnas category se hashean por códigos + categorías.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(len(data)).encode())
+    
+    for col in data.columns:
+        series = data[col]
+        digest.update(f'{col}\0{series.dtype}\0'.encode())
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            digest.update('\0'.join(map(str, series.cat.categories)).encode())
+            values = series.cat.codes.to_numpy()
+        elif series.dtype == object:
+            values = pd.util.hash_pandas_object(series, index=False).to_numpy()
+        else:
+            values = series.to_numpy()
+        digest.update(np.ascontiguousarray(values).tobytes())
+    
+    return digest.hexdigest()
+
+def _is_categorical(series):
+    return series.dtype == object or isinstance(series.dtype, pd.CategoricalDtype)
+
+def write_store(directory, data, report=None):
+    """
+    Escribe un DataFrame en formato columnar binario: un .npy por columna
+    y un manifest.json con nombres, tipos y categorías (y report, el informe
+    de optimize_dtypes de la carga que lo generó).
+    
+    Las columnas de texto se guardan como códigos enteros + lista de categorías,
+    de modo que la lectura no crea un objeto Python por fila.
+    La escritura es atómica: se construye en un directorio temporal y se renombra.
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+    
+    try:
+        columns = []
+        for i, col in enumerate(data.columns):
+            series = data[col]
+            filename = f'col_{i:03d}.npy'
+            entry = {'name': col, 'file': filename}
+            
+            if _is_categorical(series):
+                categorical = pd.Categorical(series)
+                categories = [str(c) for c in categorical.categories]
+                np.save(os.path.join(tmp_dir, filename), np.asarray(categorical.codes))
+                entry.update({'kind': 'categorical', 'categories': categories})
+            else:
+                values = series.to_numpy()
+                np.save(os.path.join(tmp_dir, filename), values)
+                entry.update({'kind': 'numeric', 'dtype': values.dtype.str})
+            
+            columns.append(entry)
+        
+        manifest = {
+            'version': FORMAT_VERSION,
+            'rows': len(data),
+            'columns': columns,
+        }
+        if report:
+            manifest['memory_report'] = report
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w') as fh:
+            json.dump(manifest, fh)
+        
+        try:
+            os.rename(tmp_dir, directory)
+        except OSError:
+            # Otro proceso escribió el mismo contenido primero
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+class StoreWriter:
+    """
+    Escritura incremental de un store columnar (mismo formato que write_store)
+    por bloques de filas, sin tener el DataFrame completo en memoria.
+    
+    Cada columna es un .npy abierto con open_memmap para n_rows filas; los
+    bloques se copian en orden con write(). El tipo y las categorías de cada
+    columna se fijan con el primer bloque: los siguientes deben coincidir.
+    close() escribe el manifest; el directorio se publica después con
+    ColumnarCache.adopt.
+    """
+    
+    def __init__(self, directory, n_rows):
+        self.directory = directory
+        self.n_rows = n_rows
+        self.offset = 0
+        self._columns = None
+        self._arrays = None
+        os.makedirs(directory, exist_ok=True)
+    
+    def _open(self, chunk):
+        self._columns = []
+        self._arrays = []
+        for i, col in enumerate(chunk.columns):
+            series = chunk[col]
+            filename = f'col_{i:03d}.npy'
+            entry = {'name': col, 'file': filename}
+            if _is_categorical(series):
+                categorical = pd.Categorical(series)
+                dtype = np.asarray(categorical.codes).dtype
+                entry.update({'kind': 'categorical', 'categories': [str(c) for c in categorical.categories]})
+            else:
+                dtype = series.to_numpy().dtype
+                entry.update({'kind': 'numeric', 'dtype': dtype.str})
+            self._columns.append(entry)
+            self._arrays.append(np.lib.format.open_memmap(
+                os.path.join(self.directory, filename), mode='w+', dtype=dtype, shape=(self.n_rows,)
+            ))
+    
+    def write(self, chunk):
+        if self._arrays is None:
+            self._open(chunk)
+        
+        start, stop = self.offset, self.offset + len(chunk)
+        if stop > self.n_rows:
+            raise ValueError(f"Más filas de las declaradas ({self.n_rows})")
+        
+        for entry, array in zip(self._columns, self._arrays):
+            series = chunk[entry['name']]
+            if entry['kind'] == 'categorical':
+                values = pd.Categorical(series, categories=entry['categories']).codes
+            else:
+                values = series.to_numpy()
+            array[start:stop] = values
+        self.offset = stop
+    
+    def close(self):
+        if self.offset != self.n_rows:
+            raise ValueError(f"Se escribieron {self.offset} de {self.n_rows} filas")
+        for array in self._arrays or []:
+            array.flush()
+        self._arrays = None
+        
+        manifest = {
+            'version': FORMAT_VERSION,
+            'rows': self.n_rows,
+            'columns': self._columns or [],
+        }
+        with open(os.path.join(self.directory, MANIFEST_NAME), 'w') as fh:
+            json.dump(manifest, fh)
+        return self.directory
+
+def _append_npy(path, values, rows):
+    """
+    Añade values al final de un .npy 1-D de rows filas sin reescribirlo: los
+    datos crecen por el final y la forma se actualiza en la cabecera, que
+    np.save deja con espacio para ello. Retorna False si la cabecera no
+    admite el cambio en el sitio (p.ej. escrita por un numpy antiguo).
+    """
+    with open(path, 'r+b') as fh:
+        version = np.lib.format.read_magic(fh)
+        if version != (1, 0):
+            return False
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fh)
+        offset = fh.tell()
+        header = io.BytesIO()
+        np.lib.format.write_array_header_1_0(header, {
+            'descr': np.lib.format.dtype_to_descr(dtype),
+            'fortran_order': False,
+            'shape': (rows + len(values),),
+        })
+        if shape != (rows,) or dtype != values.dtype or len(header.getvalue()) != offset:
+            return False
+        
+        # Datos primero: si se interrumpe, la cabecera sigue describiendo rows filas
+        fh.seek(offset + rows * dtype.itemsize)
+        fh.write(np.ascontiguousarray(values).tobytes())
+        fh.truncate()
+        fh.seek(0)
+        fh.write(header.getvalue())
+    return True
+
+def _replace_npy(path, values):
+    """Reescribe un .npy en un archivo nuevo: los mapeos abiertos del anterior siguen válidos"""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as fh:
+        np.save(fh, values)
+    os.replace(tmp_path, path)
+
+def extend_store(directory, tail):
+    """
+    Añade las filas de tail al final de un store escrito por write_store, en
+    el sitio y sin copiar las filas existentes. Resultado igual al de
+    write_store sobre el DataFrame completo, unido como en una recarga por
+    anexado (categorías unidas y ordenadas, tipo numérico promovido).
+    
+    Las columnas que conservan tipo y categorías crecen por el final (ver
+    _append_npy). Las demás se reescriben en un archivo nuevo que reemplaza
+    al anterior: quien tenga mapeadas las columnas antiguas no se ve afectado.
+    tail debe tener las columnas del store con los tipos ya normalizados.
+    """
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    with open(manifest_path) as fh:
+        manifest = json.load(fh)
+    if manifest.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Versión de caché columnar no soportada: {manifest.get('version')}")
+    if [entry['name'] for entry in manifest['columns']] != list(tail.columns):
+        raise ValueError("Las columnas nuevas no coinciden con las del store")
+    
+    rows = manifest['rows']
+    for entry in manifest['columns']:
+        path = os.path.join(directory, entry['file'])
+        series = tail[entry['name']]
+        old = np.load(path, mmap_mode='r')
+        
+        if entry['kind'] == 'categorical':
+            if not _is_categorical(series):
+                raise ValueError(f"Tipo incompatible en la columna {entry['name']}")
+            new = pd.Categorical(series)
+            categories = sorted(set(entry['categories']) | {str(c) for c in new.categories})
+            if categories == entry['categories']:
+                values = np.asarray(pd.Categorical(series, categories=categories).codes).astype(old.dtype)
+                if _append_npy(path, values, rows):
+                    continue
+            merged = union_categoricals(
+                [pd.Categorical.from_codes(old, entry['categories']), new], sort_categories=True
+            )
+            _replace_npy(path, np.asarray(merged.codes))
+            entry['categories'] = [str(c) for c in merged.categories]
+        else:
+            if _is_categorical(series):
+                raise ValueError(f"Tipo incompatible en la columna {entry['name']}")
+            values = series.to_numpy()
+            dtype = np.promote_types(old.dtype, values.dtype)
+            if dtype == old.dtype and _append_npy(path, values.astype(dtype, copy=False), rows):
+                continue
+            _replace_npy(path, np.concatenate([old.astype(dtype, copy=False), values.astype(dtype, copy=False)]))
+            entry['dtype'] = dtype.str
+    
+    manifest['rows'] = rows + len(tail)
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+    with os.fdopen(fd, 'w') as fh:
+        json.dump(manifest, fh)
+    os.replace(tmp_path, manifest_path)
+
+def read_store(directory, mmap=True):
+    """
+    Lee un directorio escrito por write_store.
+    Con mmap=True los .npy se mapean en memoria en lugar de leerse completos.
+    """
+    with open(os.path.join(directory, MANIFEST_NAME)) as fh:
+        manifest = json.load(fh)
+    
+    if manifest.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Versión de caché columnar no soportada: {manifest.get('version')}")
+    
+    mmap_mode = 'r' if mmap else None
+    columns = {}
+    for entry in manifest['columns']:
+        values = np.load(os.path.join(directory, entry['file']), mmap_mode=mmap_mode)
+        if entry['kind'] == 'categorical':
+            columns[entry['name']] = pd.Categorical.from_codes(values, entry['categories'])
+        else:
+            columns[entry['name']] = values
+    
+    return pd.DataFrame(columns, copy=False)
+
+class ColumnarCache:
+    """
+    Caché columnar de un archivo fuente (ARFF/CSV).
+    
+    Estructura en disco:
+        <cache_dir>/<nombre>.json          puntero: firma y hash de la fuente
+        <cache_dir>/<nombre>-<hash12>/     columnas .npy + manifest.json
+    
+    La caché es válida si el tamaño y mtime de la fuente coinciden con el
+    puntero. Si solo cambió el mtime (copia, touch), se verifica el hash
+    SHA-256 antes de descartarla.
+    """
+    
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+    
+    def _pointer_path(self, source_path):
+        name = os.path.splitext(os.path.basename(source_path))[0]
+        return os.path.join(self.cache_dir, f'{name}.json')
+    
+    def _store_path(self, source_path, digest):
+        name = os.path.splitext(os.path.basename(source_path))[0]
+        return os.path.join(self.cache_dir, f'{name}-{digest[:STORE_DIGEST_CHARS]}')
+    
+    def _read_pointer(self, source_path):
+        try:
+            with open(self._pointer_path(source_path)) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+    
+    def _write_pointer(self, source_path, pointer):
+        path = self._pointer_path(source_path)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=self.cache_dir)
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(pointer, fh)
+        os.replace(tmp_path, path)
+    
+    def load(self, source_path):
+        """Retorna el DataFrame cacheado o None si no existe o está desactualizado"""
+        pointer = self._read_pointer(source_path)
+        if pointer is None or pointer.get('version') != FORMAT_VERSION:
+            return None
+        
+        signature = file_signature(source_path)
+        if signature['size'] != pointer['size']:
+            return None
+        
+        if signature['mtime_ns'] != pointer['mtime_ns']:
+            if file_digest(source_path) != pointer['sha256']:
+                return None
+            # Mismo contenido con otro mtime: actualizar el puntero
+            pointer.update(signature)
+            self._write_pointer(source_path, pointer)
+        
+        store = self._store_path(source_path, pointer['sha256'])
+        try:
+            return read_store(store)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Caché columnar inválida en {store}: {e}")
+            return None
+    
+    def digest(self, source_path):
+        """Hash SHA-256 registrado para la fuente si su firma coincide con el puntero"""
+        pointer = self._read_pointer(source_path)
+        if pointer is None or pointer.get('version') != FORMAT_VERSION:
+            return None
+        signature = file_signature(source_path)
+        if signature['size'] != pointer['size'] or signature['mtime_ns'] != pointer['mtime_ns']:
+            return None
+        return pointer['sha256']
+    
+    def save(self, source_path, data, report=None, digest=None, signature=None):
+        """
+        Convierte el DataFrame a formato columnar y actualiza el puntero.
+        digest y signature (hash y firma de la fuente) se calculan si no se dan.
+        """
+        return self._publish(source_path, lambda store: write_store(store, data, report), digest, signature)
+    
+    def save_mapped(self, source_path, data, report=None, digest=None, signature=None):
+        """
+        save() y retorna (DataFrame mapeado desde el store escrito, hash de la
+        fuente): los procesos que cargan la misma fuente comparten así las
+        páginas de sus columnas en lugar de tener cada uno una copia.
+        """
+        digest = self.save(source_path, data, report, digest, signature)
+        return read_store(self._store_path(source_path, digest)), digest
+    
+    def extend_mapped(self, source_path, tail, old_digest, digest, signature):
+        """
+        Store de source_path después de añadir tail al final de la fuente:
+        en lugar de escribirlo completo, se extiende el de old_digest (ver
+        extend_store) y se publica con digest y signature, los de la fuente
+        ya calculados al detectar el anexado (sin volver a leerla). Retorna
+        el DataFrame mapeado desde el store, o None si no hay store de
+        old_digest que extender.
+        
+        El store anterior se reclama renombrándolo: si otro proceso lo
+        extiende a la vez, el rename falla (OSError) y quien llama escribe
+        el store completo.
+        """
+        store = self._store_path(source_path, digest)
+        old = self._store_path(source_path, old_digest)
+        if not os.path.isdir(store) and not os.path.isdir(old):
+            return None
+        
+        def extend(store):
+            tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=self.cache_dir)
+            claimed = os.path.join(tmp_dir, 'store')
+            try:
+                os.rename(old, claimed)
+                extend_store(claimed, tail)
+                try:
+                    os.rename(claimed, store)
+                except OSError:
+                    pass  # Otro proceso publicó el mismo contenido primero
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        
+        self._publish(source_path, extend, digest, signature)
+        return read_store(store)
+    
+    def memory_report(self, source_path):
+        """Informe de optimize_dtypes guardado con el store vigente de la fuente ({} si no hay)"""
+        pointer = self._read_pointer(source_path)
+        if pointer is None:
+            return {}
+        manifest = os.path.join(self._store_path(source_path, pointer['sha256']), MANIFEST_NAME)
+        try:
+            with open(manifest) as fh:
+                return json.load(fh).get('memory_report', {})
+        except (OSError, ValueError):
+            return {}
+    
+    def adopt(self, source_path, directory):
+        """
+        Registra como caché de source_path un store ya escrito (p.ej. con
+        StoreWriter mientras se generaba la fuente). El directorio se mueve.
+        """
+        def move(store):
+            try:
+                os.rename(directory, store)
+            except OSError:
+                pass  # Otro proceso publicó el mismo contenido primero
+        
+        digest = self._publish(source_path, move)
+        # Si ya existía un store con el mismo hash, el directorio sobra
+        shutil.rmtree(directory, ignore_errors=True)
+        return digest
+    
+    def _publish(self, source_path, write, digest=None, signature=None):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if digest is None or signature is None:
+            signature = file_signature(source_path)
+            digest = file_digest(source_path)
+        store = self._store_path(source_path, digest)
+        
+        if not os.path.isdir(store):
+            write(store)
+        
+        self._write_pointer(source_path, {
+            'version': FORMAT_VERSION,
+            'sha256': digest,
+            **signature,
+        })
+        self._remove_stale(source_path, keep=store)
+        return digest
+    
+    def _remove_stale(self, source_path, keep):
+        """
+        Elimina versiones anteriores de la misma fuente (best-effort). El
+        nombre debe ser exactamente <nombre>-<hash>: los stores de otra fuente
+        cuyo nombre empieza igual (foo-bar.arff junto a foo.arff) se conservan.
+        """
+        name = os.path.splitext(os.path.basename(source_path))[0]
+        pattern = re.compile(re.escape(name) + '-[0-9a-f]{%d}' % STORE_DIGEST_CHARS)
+        for entry in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, entry)
+            if pattern.fullmatch(entry) and path != keep and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
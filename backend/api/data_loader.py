@@ -1,126 +1,539 @@
+import contextlib
+import contextvars
 import numpy as np
 import pandas as pd
 import logging
+from pandas.api.types import union_categoricals
 from scipy.io import arff
 import os
+import threading
+import time
+from .columnar import ColumnarCache, file_digest, file_digests, file_signature, frame_fingerprint
+from .dtypes import optimize_dtypes, log_report
+from .metrics import phase
+from .synthetic import DEMO_SAMPLES, generate as generate_synthetic
 
 logger = logging.getLogger(__name__)
 
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+CACHE_DIR = os.getenv('DATASET_CACHE_DIR', os.path.join(DATA_DIR, '.cache'))
+DATASET_PATH = os.getenv('DATASET_PATH', os.path.join(DATA_DIR, 'NSL_KDD_Train.arff'))
+# Dataset de prueba (KDDTest+ o tráfico reciente) con el que se compara el de
+# entrenamiento en /api/drift/; opcional
+TEST_DATASET_PATH = os.getenv('TEST_DATASET_PATH', os.path.join(DATA_DIR, 'NSL_KDD_Test.arff'))
+
+# 'memory': todo el dataset en un DataFrame. 'streaming': lectura por bloques
+# con memoria acotada (ver api/streaming.py), para KDD'99 completo o capturas propias
+DATASET_MODE = os.getenv('DATASET_MODE', 'memory')
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', '100000'))
+
+# Segundos entre comprobaciones de cambios en DATASET_PATH (0 = sin recarga en caliente)
+DATASET_WATCH_INTERVAL = float(os.getenv('DATASET_WATCH_INTERVAL', '10'))
+
+# Versión fijada para la petición en curso (ver DatasetLoader.pinned)
+_pinned = contextvars.ContextVar('dataset_version', default=None)
+
+def _parse_arff_header(fh):
+    """
+    Lee la cabecera de un ARFF hasta @data.
+    Retorna [(nombre, tipo)] con tipo 'numeric' o 'nominal'; deja fh en los datos.
+    """
+    attributes = []
+    for line in fh:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        lower = line.lower()
+        if not line or line.startswith('%'):
+            continue
+        if lower.startswith('@data'):
+            return attributes
+        if lower.startswith('@attribute'):
+            rest = line[len('@attribute'):].strip()
+            if rest[0] in '\'"':
+                end = rest.index(rest[0], 1)
+                name, kind = rest[1:end], rest[end + 1:].strip()
+            else:
+                name, _, kind = rest.partition(' ')
+                kind = kind.strip()
+            numeric = kind.lower() in ('real', 'numeric', 'integer')
+            attributes.append((name, 'numeric' if numeric else 'nominal'))
+    raise ValueError("Sección @data no encontrada en el ARFF")
+
+def iter_arff_chunks(path, chunksize=STREAM_CHUNK_SIZE, offset=None):
+    """
+    Itera un ARFF (denso) en DataFrames de chunksize filas.
+    Con offset (en bytes, inicio de una línea de datos) solo lee desde ahí.
+    """
+    with open(path, 'rb') as fh:
+        attributes = _parse_arff_header(fh)
+        if offset is not None:
+            fh.seek(offset)
+        names = [name for name, _ in attributes]
+        dtypes = {
+            name: np.float64 if kind == 'numeric' else str
+            for name, kind in attributes
+        }
+        reader = pd.read_csv(
+            fh, header=None, names=names, dtype=dtypes, chunksize=chunksize,
+            quotechar="'", skipinitialspace=True, comment='%',
+            na_values=['?'], keep_default_na=False, float_precision='round_trip',
+        )
+        for chunk in reader:
+            yield chunk
+
+def iter_csv_chunks(path, chunksize=STREAM_CHUNK_SIZE, offset=None):
+    """
+    Itera un CSV con cabecera en DataFrames de chunksize filas.
+    Los tipos se fijan con el primer bloque para que todos coincidan.
+    Con offset (en bytes, inicio de una línea) solo lee desde ahí.
+    """
+    head = pd.read_csv(path, nrows=1000)
+    dtypes = {
+        col: np.float64 if pd.api.types.is_numeric_dtype(head[col]) else str
+        for col in head.columns
+    }
+    if offset is None:
+        yield from pd.read_csv(path, dtype=dtypes, chunksize=chunksize, float_precision='round_trip')
+        return
+    
+    with open(path, 'rb') as fh:
+        fh.seek(offset)
+        yield from pd.read_csv(
+            fh, header=None, names=list(head.columns), dtype=dtypes,
+            chunksize=chunksize, float_precision='round_trip',
+        )
+
+def iter_chunks(path, chunksize=STREAM_CHUNK_SIZE, offset=None):
+    """Itera un ARFF o CSV por bloques según su extensión"""
+    if path.lower().endswith('.arff'):
+        return iter_arff_chunks(path, chunksize, offset)
+    return iter_csv_chunks(path, chunksize, offset)
+
+def _append_rows(data, tail):
+    """
+    data + tail (con los tipos ya normalizados) con los tipos que tendría el
+    conjunto normalizado de una vez: categorías unidas (ordenadas, como
+    astype('category')) y el tipo numérico más pequeño que contiene ambos rangos.
+    """
+    columns = {}
+    for col in data.columns:
+        old, new = data[col], tail[col]
+        if isinstance(old.dtype, pd.CategoricalDtype):
+            merged = union_categoricals([old, new.astype('category')], sort_categories=True)
+            columns[col] = pd.Series(merged, name=col)
+        elif old.dtype == object or new.dtype == object:
+            columns[col] = pd.Series(np.concatenate([old.to_numpy(object), new.to_numpy(object)]), name=col)
+        else:
+            dtype = np.promote_types(old.dtype, new.dtype)
+            columns[col] = pd.Series(np.concatenate([
+                old.to_numpy().astype(dtype, copy=False), new.to_numpy().astype(dtype, copy=False),
+            ]), name=col)
+    return pd.DataFrame(columns)
+
+class DatasetVersion:
+    """
+    Una versión inmutable del dataset: datos, huella y el motor de analytics
+    construido sobre ellos. Las peticiones trabajan siempre con una sola
+    versión (ver DatasetLoader.pinned) y una recarga publica la siguiente con
+    una única asignación, sin bloquear a los lectores.
+    
+    kind es 'full' (carga completa) o 'append' (filas añadidas al final del
+    archivo: offset es el tamaño anterior y appended_rows las filas nuevas).
+    """
+    __slots__ = (
+        'number', 'data', 'test', 'fingerprint', 'signature', 'sha256',
+        'kind', 'appended_rows', 'offset', 'loaded_at', 'engine', 'test_sha256',
+    )
+    
+    def __init__(self, number, data, fingerprint, signature, sha256, kind='full',
+                 appended_rows=0, offset=None, test=None, test_sha256=None):
+        self.number = number
+        self.data = data
+        self.test = test
+        self.test_sha256 = test_sha256
+        self.fingerprint = fingerprint
+        self.signature = signature
+        self.sha256 = sha256
+        self.kind = kind
+        self.appended_rows = appended_rows
+        self.offset = offset
+        self.loaded_at = time.time()
+        self.engine = None
+    
+    def describe(self):
+        return {
+            'version': self.number,
+            'fingerprint': self.fingerprint,
+            'sha256': self.sha256,
+            'kind': self.kind,
+            'rows': len(self.data) if self.data is not None else None,
+            'appended_rows': self.appended_rows,
+            'size': self.signature['size'] if self.signature else None,
+            'loaded_at': self.loaded_at,
+            'test_rows': len(self.test) if self.test is not None else None,
+            'test_sha256': self.test_sha256,
+        }
+
 class DatasetLoader:
     """Cargador de dataset NSL-KDD con patrón Singleton"""
     _instance = None
-    _data = None
-    _test_data = None
+    _version = None
+    _memory_report = None
+    _lock = threading.RLock()
+    # Serializa recargas (watcher y llamadas manuales a refresh)
+    _refresh_lock = threading.Lock()
+    _watcher = None
+    _watcher_pid = None
     
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(DatasetLoader, cls).__new__(cls)
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super(DatasetLoader, cls).__new__(cls)
         return cls._instance
     
+    def current(self):
+        """
+        Versión del dataset de la petición en curso: la fijada con pinned() o,
+        si no hay, la última publicada (cargándola la primera vez).
+        """
+        version = _pinned.get()
+        if version is not None:
+            return version
+        version = self._version
+        if version is not None:
+            return version
+        
+        # Con workers gthread varias peticiones en frío pueden llegar a la vez:
+        # solo una carga el dataset, el resto espera y reutiliza el resultado
+        with self._lock:
+            if self._version is None:
+                with phase('load'):
+                    self._version = self._load()
+        return self._version
+    
+    @contextlib.contextmanager
+    def pinned(self, version=None):
+        """
+        Fija una versión (la actual por defecto) para el contexto: una recarga
+        publicada a mitad de una petición no cambia los datos que esta ve.
+        """
+        token = _pinned.set(version or self.current())
+        try:
+            yield _pinned.get()
+        finally:
+            _pinned.reset(token)
+    
     def load_dataset(self):
         """
         Carga el dataset NSL-KDD. Si no existe, genera datos de demostración.
         El dataset real tiene 125,973 registros con 43 características.
+        El segundo elemento es el dataset de prueba (TEST_DATASET_PATH) o None.
+        En modo streaming no se carga nada y retorna (None, None).
         """
-        if self._data is not None:
-            return self._data, self._test_data
+        version = self.current()
+        return version.data, version.test
+    
+    def reset(self):
+        """Descarta la versión cargada: la próxima consulta vuelve a cargar DATASET_PATH"""
+        with self._lock:
+            self._version = None
+    
+    def _load(self, number=1):
+        """Carga y normaliza el dataset (llamar con self._lock adquirido)"""
+        exists = os.path.exists(DATASET_PATH)
+        signature = file_signature(DATASET_PATH) if exists else None
         
+        if self.is_streaming():
+            # Hash del archivo por bloques: no requiere cargar el dataset
+            digest = file_digest(DATASET_PATH)
+            return DatasetVersion(number, None, digest, signature, digest)
+        
+        digest = None
         try:
-            # Intentar cargar archivo ARFF real
-            arff_path = os.path.join(os.path.dirname(__file__), 'data', 'NSL_KDD_Train.arff')
-            if os.path.exists(arff_path):
-                data, meta = arff.loadarff(arff_path)
-                self._data = pd.DataFrame(data)
+            # Intentar cargar archivo ARFF real (o el CSV/ARFF de DATASET_PATH)
+            if exists:
+                # Ya normalizado: al parsear o, desde la caché, con los tipos compactos
+                data, digest = self._load_source_cached(DATASET_PATH)
             else:
                 logger.warning("Dataset ARFF no encontrado. Usando datos de demostración.")
-                self._data = self._generate_demo_data()
+                data = self._normalize_dtypes(generate_synthetic(DEMO_SAMPLES))
         except Exception as e:
             logger.error(f"Error cargando dataset: {e}. Usando datos de demostración.")
-            self._data = self._generate_demo_data()
+            data = self._normalize_dtypes(generate_synthetic(DEMO_SAMPLES))
         
-        return self._data, self._test_data
+        test, test_digest = self._load_test()
+        return DatasetVersion(
+            number, data, frame_fingerprint(data), signature, digest,
+            test=test, test_sha256=test_digest,
+        )
     
-    def _generate_demo_data(self):
+    def _load_test(self):
+        """
+        Carga TEST_DATASET_PATH por el mismo camino que el de entrenamiento
+        (caché columnar y normalización de tipos). Retorna (data, sha256), o
+        (None, None) si no existe o no se pudo leer.
         """
-        Genera datos de demostración que simulan el dataset NSL-KDD 2009.
-        Dataset real: 125,973 registros de conexiones de red clasificadas como
-        Normal (normal) o Anomalía (anomaly) con ataques diversos.
+        if not os.path.exists(TEST_DATASET_PATH):
+            return None, None
+        report = self._memory_report
+        try:
+            test, digest = self._load_source_cached(TEST_DATASET_PATH)
+            logger.info(f"Dataset de prueba cargado ({len(test)} registros)")
+            return test, digest
+        except Exception as e:
+            logger.warning(f"No se pudo cargar el dataset de prueba {TEST_DATASET_PATH}: {e}")
+            return None, None
+        finally:
+            # El informe de memoria es el del dataset de entrenamiento
+            self._memory_report = report
+    
+    def refresh(self, build_engine=None):
         """
-        np.random.seed(42)
-        n_samples = 5000  # Demo con 5000 registros
+        Comprueba si DATASET_PATH cambió desde la versión publicada y, si es
+        así, carga la nueva en este hilo mientras las peticiones siguen
+        usando la anterior. Retorna la nueva versión o None si no hubo cambios.
         
-        # Protocolo de red (tcp, udp, icmp)
-        protocols = np.random.choice(['tcp', 'udp', 'icmp'], n_samples, p=[0.7, 0.2, 0.1])
+        Si el archivo solo creció por el final (mismo hash en los bytes que ya
+        tenía y terminados en salto de línea) se leen únicamente las filas
+        nuevas. build_engine(version, previous) construye el motor de analytics
+        antes de publicar; previous es la versión anterior en las recargas por
+        anexado (para actualizar sus agregados) y None en las completas.
+        """
+        with self._refresh_lock:
+            previous = self._version or self.current()
+            if not os.path.exists(DATASET_PATH):
+                return None
+            signature = file_signature(DATASET_PATH)
+            old = previous.signature
+            if old is not None and signature['size'] == old['size'] and signature['mtime_ns'] == old['mtime_ns']:
+                return None
+            
+            prefix, digest = file_digests(DATASET_PATH, old['size'] if old else 0)
+            if old is not None and digest == previous.sha256:
+                # Solo cambió el mtime (touch, copia idéntica)
+                previous.signature = signature
+                return None
+            
+            append = (
+                old is not None and previous.sha256 is not None
+                and signature['size'] > old['size'] and prefix == previous.sha256
+                and self._ends_line(old['size'])
+            )
+            with phase('reload'):
+                if append:
+                    version = self._load_appended(previous, signature, digest)
+                else:
+                    with self._lock:
+                        version = self._load(previous.number + 1)
+                if build_engine is not None:
+                    version.engine = build_engine(version, previous if append else None)
+            
+            self._version = version
+            logger.info(f"Dataset recargado ({version.kind}): versión {version.number}")
+            return version
+    
+    def _ends_line(self, size):
+        """True si el byte size-1 del archivo es un salto de línea (anexado limpio)"""
+        with open(DATASET_PATH, 'rb') as fh:
+            fh.seek(size - 1)
+            return fh.read(1) == b'\n'
+    
+    def _load_appended(self, previous, signature, digest):
+        """Nueva versión con las filas añadidas desde el final de la anterior"""
+        offset = previous.signature['size']
+        if previous.data is None:
+            # Streaming: el motor lee el tramo nuevo (ver StreamingAnalytics.appended)
+            return DatasetVersion(
+                previous.number + 1, None, digest, signature, digest,
+                kind='append', appended_rows=None, offset=offset,
+            )
         
-        # Servicio (http, ssh, ftp, etc.)
-        services = np.random.choice(['http', 'ssh', 'ftp', 'dns', 'smtp'], n_samples, p=[0.4, 0.3, 0.15, 0.1, 0.05])
+        chunks = list(iter_chunks(DATASET_PATH, offset=offset))
+        tail = pd.concat(chunks, ignore_index=True) if chunks else previous.data.iloc[:0]
+        tail, _ = optimize_dtypes(tail.reset_index(drop=True))
+        data = self._map_appended(DATASET_PATH, previous, tail, signature, digest)
+        return DatasetVersion(
+            previous.number + 1, data, frame_fingerprint(data), signature, digest,
+            kind='append', appended_rows=len(tail), offset=offset,
+            test=previous.test, test_sha256=previous.test_sha256,
+        )
+    
+    def watch(self, build_engine, on_swap=None, interval=None):
+        """
+        Inicia (una vez por proceso, después del fork de gunicorn) el hilo que
+        comprueba DATASET_PATH cada interval segundos y llama a refresh cuando
+        su tamaño/mtime cambió y se mantuvo igual en dos comprobaciones
+        seguidas (así no se lee un archivo a medio copiar). on_swap(version,
+        previous) se llama después de publicar cada versión nueva.
+        """
+        interval = DATASET_WATCH_INTERVAL if interval is None else interval
+        if interval <= 0 or self._watcher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._watcher_pid == os.getpid():
+                return
+            DatasetLoader._watcher_pid = os.getpid()
+            DatasetLoader._watcher = threading.Thread(
+                target=self._watch, args=(build_engine, on_swap, interval),
+                name='dataset-watcher', daemon=True,
+            )
+            DatasetLoader._watcher.start()
+    
+    def _watch(self, build_engine, on_swap, interval):
+        seen = None
+        while True:
+            time.sleep(interval)
+            try:
+                signature = file_signature(DATASET_PATH) if os.path.exists(DATASET_PATH) else None
+                current = self.current().signature
+                stable = signature is not None and signature == seen
+                seen = signature
+                if not stable or signature == current:
+                    continue
+                previous = self._version
+                version = self.refresh(build_engine)
+                if version is not None and on_swap is not None:
+                    on_swap(version, previous)
+            except Exception as e:
+                logger.error(f"Error recargando el dataset: {e}")
+    
+    def _normalize_dtypes(self, data):
+        """
+        Etapa de normalización posterior a la carga: category para texto,
+        enteros pequeños para flags/contadores y float32 para tasas.
+        """
+        data, report = optimize_dtypes(data)
+        log_report(report)
+        self._memory_report = report
+        return data
+    
+    def is_streaming(self):
+        """True si el dataset se analiza por bloques en lugar de cargarse entero"""
+        return DATASET_MODE == 'streaming'
+    
+    def iter_chunks(self, chunksize=STREAM_CHUNK_SIZE, offset=None):
+        """Itera el archivo fuente por bloques (modo streaming)"""
+        return iter_chunks(DATASET_PATH, chunksize, offset)
+    
+    def get_fingerprint(self):
+        """Huella del dataset cargado; cambia si cambia cualquier valor"""
+        return self.current().fingerprint
+    
+    def get_memory_usage(self):
+        """Bytes de las columnas del dataset cargado (0 si aún no se cargó)"""
+        version = self._version
+        if version is None or version.data is None:
+            return 0
+        return int(version.data.memory_usage(index=True, deep=True).sum())
+    
+    def get_row_count(self):
+        version = self._version
+        return len(version.data) if version is not None and version.data is not None else 0
+    
+    def get_memory_report(self):
+        """Bytes antes/después por columna de la última normalización de tipos"""
+        return self._memory_report or {}
+    
+    def _load_source_cached(self, source_path):
+        """
+        Carga un ARFF o CSV usando la caché columnar binaria.
         
-        # Duración de la conexión (en segundos)
-        duration = np.random.exponential(scale=50, size=n_samples)
+        La primera carga parsea el texto (lento) y guarda un .npy por columna.
+        Las siguientes mapean esos archivos en memoria, validados contra el
+        mtime y el hash SHA-256 de la fuente, sin volver a parsear el texto.
+        También la primera: lo parseado se reabre desde el store recién escrito
+        (ver _map_shared).
         
-        # Bytes enviados/recibidos
-        src_bytes = np.random.exponential(scale=1000, size=n_samples)
-        dst_bytes = np.random.exponential(scale=1000, size=n_samples)
+        Retorna (data, sha256 de la fuente), el hash tomado del puntero de la
+        caché cuando es posible para no volver a leer el archivo.
+        """
+        cache = ColumnarCache(CACHE_DIR)
         
-        # Banderas de red (S0, S1, SF, REJ, etc.)
-        flags = np.random.choice(['S0', 'S1', 'SF', 'REJ', 'SH'], n_samples, p=[0.1, 0.2, 0.6, 0.05, 0.05])
+        try:
+            data = cache.load(source_path)
+            if data is not None:
+                logger.info(f"Dataset cargado desde caché columnar ({len(data)} registros)")
+                # Los tipos ya son compactos: el informe es el guardado al parsear
+                self._memory_report = cache.memory_report(source_path)
+                return data, cache.digest(source_path) or file_digest(source_path)
+        except Exception as e:
+            logger.warning(f"No se pudo leer la caché columnar: {e}")
         
-        # Clases: Normal vs Anomalía
-        # En el dataset real: 67% Normal, 33% Ataques
-        class_labels = np.random.choice(['normal', 'anomaly'], n_samples, p=[0.67, 0.33])
+        # Normalizar antes de guardar: la caché queda con los tipos compactos
+        data = self._normalize_dtypes(self._read_source(source_path))
+        data, digest = self._map_shared(source_path, data, self._memory_report)
+        return data, digest or file_digest(source_path)
+    
+    def _map_shared(self, source_path, data, report=None):
+        """
+        Guarda data en la caché columnar y la retorna mapeada desde el store:
+        los workers de gunicorn (y los procesos de ParallelAnalytics) que
+        cargan la misma fuente comparten las páginas de cada columna en la
+        caché de páginas del sistema, en lugar de tener cada uno una copia en
+        su heap. Con CACHE_DIR en /dev/shm el store vive en memoria compartida.
         
-        # Características adicionales simuladas
-        land = np.random.choice([0, 1], n_samples, p=[0.95, 0.05])  # Conexión a mismo host
-        wrong_fragment = np.random.choice([0, 1], n_samples, p=[0.98, 0.02])
-        urgent = np.random.choice([0, 1], n_samples, p=[0.99, 0.01])
+        report (el informe de optimize_dtypes) se guarda en el manifest del
+        store para las cargas siguientes. Retorna (data, sha256 de la fuente);
+        si no se puede escribir o reabrir el store, (data en el heap, None).
+        """
+        try:
+            return ColumnarCache(CACHE_DIR).save_mapped(source_path, data, report)
+        except Exception as e:
+            logger.warning(f"No se pudo escribir la caché columnar: {e}")
+            return data, None
+    
+    def _map_appended(self, source_path, previous, tail, signature, digest):
+        """
+        _map_shared para una recarga por anexado: el store de la versión
+        anterior se extiende con tail (ColumnarCache.extend_mapped) en lugar
+        de escribirse completo, y se publica con el hash calculado en refresh
+        en lugar de volver a leer el archivo. Sin store que extender, se
+        escribe completo como en _map_shared.
+        """
+        cache = ColumnarCache(CACHE_DIR)
+        try:
+            data = cache.extend_mapped(source_path, tail, previous.sha256, digest, signature)
+            if data is not None:
+                return data
+        except Exception as e:
+            logger.warning(f"No se pudo extender la caché columnar, se escribe completa: {e}")
         
-        data = pd.DataFrame({
-            'protocol_type': protocols,
-            'service': services,
-            'duration': duration,
-            'src_bytes': src_bytes,
-            'dst_bytes': dst_bytes,
-            'flag': flags,
-            'land': land,
-            'wrong_fragment': wrong_fragment,
-            'urgent': urgent,
-            'hot': np.random.randint(0, 20, n_samples),
-            'num_compromised': np.random.randint(0, 5, n_samples),
-            'root_shell': np.random.choice([0, 1], n_samples, p=[0.95, 0.05]),
-            'su_attempted': np.random.choice([0, 1], n_samples, p=[0.95, 0.05]),
-            'num_root': np.random.randint(0, 10, n_samples),
-            'num_file_creations': np.random.randint(0, 50, n_samples),
-            'num_shells': np.random.randint(0, 5, n_samples),
-            'num_access_files': np.random.randint(0, 20, n_samples),
-            'num_outbound_cmds': np.random.randint(0, 10, n_samples),
-            'is_host_login': np.random.choice([0, 1], n_samples, p=[0.95, 0.05]),
-            'is_guest_login': np.random.choice([0, 1], n_samples, p=[0.99, 0.01]),
-            'count': np.random.randint(1, 100, n_samples),
-            'srv_count': np.random.randint(1, 100, n_samples),
-            'serror_rate': np.random.uniform(0, 1, n_samples),
-            'srv_serror_rate': np.random.uniform(0, 1, n_samples),
-            'rerror_rate': np.random.uniform(0, 1, n_samples),
-            'srv_rerror_rate': np.random.uniform(0, 1, n_samples),
-            'same_srv_rate': np.random.uniform(0, 1, n_samples),
-            'diff_srv_rate': np.random.uniform(0, 1, n_samples),
-            'srv_diff_host_rate': np.random.uniform(0, 1, n_samples),
-            'dst_host_count': np.random.randint(1, 255, n_samples),
-            'dst_host_srv_count': np.random.randint(1, 255, n_samples),
-            'dst_host_same_srv_rate': np.random.uniform(0, 1, n_samples),
-            'dst_host_diff_srv_rate': np.random.uniform(0, 1, n_samples),
-            'dst_host_same_src_port_rate': np.random.uniform(0, 1, n_samples),
-            'dst_host_srv_diff_host_rate': np.random.uniform(0, 1, n_samples),
-            'dst_host_serror_rate': np.random.uniform(0, 1, n_samples),
-            'dst_host_srv_serror_rate': np.random.uniform(0, 1, n_samples),
-            'dst_host_rerror_rate': np.random.uniform(0, 1, n_samples),
-            'dst_host_srv_rerror_rate': np.random.uniform(0, 1, n_samples),
-            'class': class_labels,
-        })
+        data = _append_rows(previous.data, tail)
+        try:
+            return cache.save_mapped(source_path, data, self._memory_report, digest, signature)[0]
+        except Exception as e:
+            logger.warning(f"No se pudo escribir la caché columnar: {e}")
+            return data
+    
+    def _read_source(self, source_path):
+        if source_path.lower().endswith('.arff'):
+            return self._read_arff(source_path)
+        return pd.read_csv(source_path, float_precision='round_trip')
+    
+    def _read_arff(self, arff_path):
+        """
+        Parsea un ARFF con scipy. Los atributos nominales llegan como bytes,
+        por lo que se decodifican a texto (comparaciones y claves JSON).
+        """
+        records, meta = arff.loadarff(arff_path)
+        data = pd.DataFrame(records)
+        
+        for col in data.select_dtypes(include=['object']).columns:
+            data[col] = data[col].str.decode('utf-8')
         
-        self._data = data
         return data
 
 def get_dataset():
     """Obtener instancia del dataset"""
     loader = DatasetLoader()
     return loader.load_dataset()
+
+def get_dataset_fingerprint():
+    """Huella del dataset, usada como clave de la caché de respuestas"""
+    return DatasetLoader().get_fingerprint()
+
+def get_dataset_version():
+    """Versión del dataset de la petición en curso (ver DatasetLoader.current)"""
+    return DatasetLoader().current()
@@ -0,0 +1,372 @@
+import glob
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.metrics import accuracy_score, confusion_matrix, precision_recall_fscore_support, roc_auc_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import OrdinalEncoder
+
+from . import data_loader
+from .data_loader import DatasetLoader, get_dataset_fingerprint, get_dataset_version
+
+try:
+    import fcntl
+except ImportError:  # fcntl solo existe en Unix: sin él cada proceso entrena por su cuenta
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Versión del formato del modelo en disco. Incrementar obliga a reentrenar.
+MODEL_FORMAT = 1
+
+# Filas máximas para entrenar (muestra aleatoria si el dataset es mayor)
+DETECTOR_MAX_ROWS = int(os.getenv('DETECTOR_MAX_ROWS', '500000'))
+DETECTOR_TEST_SIZE = 0.2
+DETECTOR_SEED = 42
+
+# Segundos tras un entrenamiento fallido antes de reintentarlo con el mismo
+# dataset (con otro dataset se reintenta al momento)
+DETECTOR_RETRY_SECONDS = float(os.getenv('DETECTOR_RETRY_SECONDS', '300'))
+
+# Registros máximos por petición a /api/score/
+SCORE_MAX_RECORDS = int(os.getenv('SCORE_MAX_RECORDS', '10000'))
+
+# Columnas que no se usan como características: class es la etiqueta y el
+# nivel de dificultad de algunas versiones de NSL-KDD se deriva de ella
+EXCLUDED_COLUMNS = ('class', 'difficulty', 'difficulty_level')
+
+# Cardinalidad máxima de las categóricas (límite de HistGradientBoosting);
+# las categorías menos frecuentes se agrupan en una sola
+MAX_CATEGORIES = 255
+
+def model_dir():
+    """Directorio de los modelos, junto a la caché columnar del dataset"""
+    return os.getenv('MODEL_DIR', os.path.join(data_loader.CACHE_DIR, 'models'))
+
+def _model_path(fingerprint):
+    return os.path.join(model_dir(), f'detector-{fingerprint}.joblib')
+
+@contextmanager
+def _file_lock(path):
+    """
+    Lock entre procesos sobre path + '.lock': con varios workers de gunicorn
+    solo uno entrena y el resto espera y carga el modelo que dejó en disco.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.lock', 'w') as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+def _categorical_frame(frame, columns):
+    """
+    Columnas categóricas como texto (NaN si faltan), que es lo que espera el
+    encoder: los registros de /api/score/ pueden traer números o nulos.
+    """
+    values = {}
+    for col in columns:
+        if col in frame:
+            series = frame[col]
+            values[col] = series.astype(str).where(series.notna(), np.nan).astype(object)
+        else:
+            values[col] = np.full(len(frame), np.nan, dtype=object)
+    return pd.DataFrame(values, index=frame.index)
+
+def feature_matrix(frame, numeric, categorical, encoder):
+    """
+    Matriz float64 (n, numéricas + categóricas) en el orden del modelo.
+    
+    Las numéricas se convierten con to_numeric (valores no numéricos -> NaN) y
+    las categóricas con el OrdinalEncoder entrenado (desconocidas -> NaN).
+    HistGradientBoosting trata NaN como valor faltante, así que un registro
+    incompleto se puntúa igualmente.
+    """
+    X = np.empty((len(frame), len(numeric) + len(categorical)), dtype=np.float64)
+    for i, col in enumerate(numeric):
+        if col in frame:
+            X[:, i] = pd.to_numeric(frame[col], errors='coerce')
+        else:
+            X[:, i] = np.nan
+    if categorical:
+        X[:, len(numeric):] = encoder.transform(_categorical_frame(frame, categorical))
+    return X
+
+def _training_frame(version):
+    """
+    Registros para entrenar: los datos de la versión del dataset o, en modo
+    streaming, los primeros DETECTOR_MAX_ROWS del archivo (memoria acotada).
+    """
+    loader = DatasetLoader()
+    if version.data is not None:
+        return version.data
+    
+    chunks, rows = [], 0
+    for chunk in loader.iter_chunks():
+        chunks.append(chunk)
+        rows += len(chunk)
+        if rows >= DETECTOR_MAX_ROWS:
+            break
+    return pd.concat(chunks, ignore_index=True)
+
+def train(data, fingerprint):
+    """
+    Entrena el detector binario (normal / anomalía) sobre data y mide su
+    desempeño en un 20% de registros reservados, estratificado por clase.
+    Retorna el bundle que se guarda en disco: modelo, encoder, columnas y métricas.
+    """
+    if 'class' not in data.columns:
+        raise ValueError('Columna class no encontrada')
+    
+    rows = np.flatnonzero(data['class'].notna().to_numpy())
+    if len(rows) > DETECTOR_MAX_ROWS:
+        rng = np.random.default_rng(DETECTOR_SEED)
+        rows = np.sort(rng.choice(rows, DETECTOR_MAX_ROWS, replace=False))
+    y = (data['class'].to_numpy()[rows] != 'normal').astype(np.int8)
+    if y.min() == y.max():
+        raise ValueError('Se necesitan registros normales y anómalos para entrenar')
+    
+    numeric = [col for col in data.select_dtypes(include=[np.number]).columns if col not in EXCLUDED_COLUMNS]
+    categorical = [
+        col for col in data.select_dtypes(include=['object', 'category']).columns
+        if col not in EXCLUDED_COLUMNS
+    ]
+    
+    train_rows, test_rows, y_train, y_test = train_test_split(
+        rows, y, test_size=DETECTOR_TEST_SIZE, stratify=y, random_state=DETECTOR_SEED
+    )
+    
+    start = time.perf_counter()
+    encoder = OrdinalEncoder(
+        handle_unknown='use_encoded_value', unknown_value=np.nan,
+        encoded_missing_value=np.nan, max_categories=MAX_CATEGORIES,
+    )
+    encoder.fit(_categorical_frame(data.iloc[train_rows], categorical))
+    model = HistGradientBoostingClassifier(
+        categorical_features=np.arange(len(numeric) + len(categorical)) >= len(numeric),
+        max_iter=200,
+        early_stopping=True,
+        random_state=DETECTOR_SEED,
+    )
+    model.fit(feature_matrix(data.iloc[train_rows], numeric, categorical, encoder), y_train)
+    training_seconds = time.perf_counter() - start
+    
+    # Métricas sobre los registros reservados; el tiempo de puntuación incluye
+    # la codificación, igual que en /api/score/
+    start = time.perf_counter()
+    scores = model.predict_proba(feature_matrix(data.iloc[test_rows], numeric, categorical, encoder))[:, 1]
+    scoring_seconds = time.perf_counter() - start
+    predicted = (scores >= 0.5).astype(np.int8)
+    
+    precision, recall, f1, _ = precision_recall_fscore_support(
+        y_test, predicted, average='binary', zero_division=0
+    )
+    metrics = {
+        'accuracy': float(accuracy_score(y_test, predicted)),
+        'precision': float(precision),
+        'recall': float(recall),
+        'f1_score': float(f1),
+        'roc_auc': float(roc_auc_score(y_test, scores)),
+    }
+    
+    return {
+        'format': MODEL_FORMAT,
+        'sklearn': sklearn.__version__,
+        'fingerprint': fingerprint,
+        'model': model,
+        'encoder': encoder,
+        'numeric': numeric,
+        'categorical': categorical,
+        'metrics': metrics,
+        'confusion_matrix': confusion_matrix(y_test, predicted, labels=[0, 1]).tolist(),
+        'info': {
+            'algorithm': 'HistGradientBoostingClassifier',
+            'features': len(numeric) + len(categorical),
+            'iterations': int(model.n_iter_),
+            'train_rows': len(train_rows),
+            'test_rows': len(test_rows),
+            'training_seconds': training_seconds,
+            'scoring_records_per_second': len(test_rows) / scoring_seconds if scoring_seconds else None,
+            'trained_at': time.time(),
+        },
+    }
+
+def save(bundle, path):
+    """
+    Guarda el bundle sin compresión (requisito para cargarlo mapeado en
+    memoria). Escritura atómica: archivo temporal + rename.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.joblib', dir=directory)
+    os.close(fd)
+    try:
+        joblib.dump(bundle, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    _remove_stale(keep=path)
+
+def _remove_stale(keep):
+    """Elimina modelos de versiones anteriores del dataset (best-effort)"""
+    for path in glob.glob(os.path.join(os.path.dirname(keep), 'detector-*.joblib')):
+        if path != keep:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+def load(path, fingerprint):
+    """
+    Carga un bundle guardado con los arrays del modelo mapeados en memoria
+    (mmap_mode='c': copy-on-write, las páginas se comparten entre workers).
+    None si no existe, está dañado o es de otro formato o versión de scikit-learn.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        bundle = joblib.load(path, mmap_mode='c')
+    except Exception as e:
+        logger.warning(f"No se pudo leer el modelo {path}: {e}")
+        return None
+    if (bundle.get('format') != MODEL_FORMAT or bundle.get('sklearn') != sklearn.__version__
+            or bundle.get('fingerprint') != fingerprint):
+        return None
+    return bundle
+
+class Detector:
+    """
+    Detector de anomalías entrenado sobre el dataset cargado.
+    
+    ensure() carga el modelo guardado para la huella actual del dataset o, si
+    no existe, lo entrena en un hilo en segundo plano y lo guarda en disco.
+    Estados: idle, training, ready y failed. Un fallo se reintenta cuando
+    cambia el dataset o pasados DETECTOR_RETRY_SECONDS. Al quedar listo se
+    descartan de la caché de respuestas las entradas que incluyen sus métricas.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bundle = None
+        self._state = 'idle'
+        self._error = None
+        self._failure = None  # (huella, time.monotonic()) del último fallo
+        self._pid = None
+    
+    def ensure(self):
+        """Inicia la carga o el entrenamiento si hace falta; retorna el estado"""
+        version = get_dataset_version()
+        fingerprint = version.fingerprint
+        with self._lock:
+            if self._state == 'training' and self._pid != os.getpid():
+                # Proceso hijo (fork de gunicorn): el hilo de entrenamiento
+                # quedó en el padre. Se espera a su modelo con el lock de archivo.
+                self._state = 'idle'
+            if self._state == 'ready' and self._bundle['fingerprint'] != fingerprint:
+                # El dataset cambió: el modelo cargado ya no corresponde
+                self._state, self._bundle = 'idle', None
+            if self._state == 'failed' and (
+                self._failure[0] != fingerprint
+                or time.monotonic() - self._failure[1] >= DETECTOR_RETRY_SECONDS
+            ):
+                # Otro dataset o pasó el tiempo de espera: se vuelve a intentar
+                self._state = 'idle'
+            if self._state != 'idle':
+                return self._state
+            
+            self._pid = os.getpid()
+            path = _model_path(fingerprint)
+            bundle = load(path, fingerprint)
+            if bundle is not None:
+                self._publish(bundle)
+                logger.info(f"Modelo cargado desde {path}")
+                return self._state
+            
+            self._state, self._error = 'training', None
+            threading.Thread(
+                target=self._train, args=(version, path), name='detector-training', daemon=True
+            ).start()
+            return self._state
+    
+    def _train(self, version, path):
+        fingerprint = version.fingerprint
+        try:
+            with _file_lock(path):
+                bundle = load(path, fingerprint)
+                if bundle is None:
+                    logger.info("Entrenando el detector en segundo plano")
+                    bundle = train(_training_frame(version), fingerprint)
+                    save(bundle, path)
+                    logger.info(
+                        f"Detector entrenado en {bundle['info']['training_seconds']:.1f} s "
+                        f"(accuracy {bundle['metrics']['accuracy']:.4f})"
+                    )
+                    # Recargar mapeado: el proceso que entrena usa las mismas páginas que el resto
+                    bundle = load(path, fingerprint) or bundle
+        except Exception as e:
+            logger.error(f"Error entrenando el detector: {e}")
+            with self._lock:
+                self._state, self._error = 'failed', str(e)
+                self._failure = (fingerprint, time.monotonic())
+            return
+        
+        with self._lock:
+            # Sin versión fijada: se compara con la última publicada
+            if bundle['fingerprint'] == get_dataset_fingerprint():
+                self._publish(bundle)
+            else:
+                self._state = 'idle'
+    
+    def _publish(self, bundle):
+        """Deja el modelo listo (llamar con self._lock adquirido)"""
+        from .response_cache import invalidate
+        self._bundle, self._state = bundle, 'ready'
+        invalidate(('model_metrics', 'batch'))
+    
+    def describe(self):
+        """Estado del detector y, si está listo, métricas medidas y datos del modelo"""
+        state = self.ensure()
+        bundle = self._bundle if state == 'ready' else None
+        if bundle is None:
+            return {'status': state, 'error': self._error}
+        return {
+            'status': state,
+            'error': None,
+            'metrics': bundle['metrics'],
+            'confusion_matrix': bundle['confusion_matrix'],
+            'info': bundle['info'],
+        }
+    
+    def score(self, frame, threshold=0.5):
+        """
+        Probabilidad de anomalía de cada registro de frame en una sola llamada
+        vectorizada. Retorna (probabilidades, predicción booleana) o None si el
+        modelo no está listo.
+        """
+        if self.ensure() != 'ready':
+            return None
+        bundle = self._bundle
+        X = feature_matrix(frame, bundle['numeric'], bundle['categorical'], bundle['encoder'])
+        scores = bundle['model'].predict_proba(X)[:, 1]
+        return scores, scores >= threshold
+    
+    @property
+    def features(self):
+        """Columnas que usa el modelo cargado ([] si no está listo)"""
+        bundle = self._bundle
+        return bundle['numeric'] + bundle['categorical'] if bundle is not None else []
+
+detector = Detector()
@@ -0,0 +1,208 @@
+import math
+import numpy as np
+from scipy.special import kolmogorov
+from .aggregates import FixedBinHistogram, PYRAMID_BINS
+
+# Bins de igual frecuencia (cuantiles del dataset de referencia) del PSI
+# numérico: una resolución de la pirámide quantile de DatasetAnalytics
+PSI_BINS = 10
+
+# Proporción mínima por bin o categoría en el PSI: un lado vacío no da log(0)
+PSI_EPSILON = 1e-4
+
+# PSI por debajo de 0.1: sin deriva relevante; hasta 0.25: moderada; más: significativa
+PSI_THRESHOLDS = (0.1, 0.25)
+
+# Categorías con mayor cambio de frecuencia listadas por columna
+DRIFT_TOP_SHIFTS = 5
+
+def drift_level(psi):
+    """none, moderate o significant según PSI_THRESHOLDS"""
+    if not np.isfinite(psi) or psi < PSI_THRESHOLDS[0]:
+        return 'none'
+    return 'moderate' if psi < PSI_THRESHOLDS[1] else 'significant'
+
+def _proportions(counts):
+    """Conteos (..., bins) -> proporciones por fila (NaN si la fila no tiene valores)"""
+    counts = np.asarray(counts, dtype=np.float64)
+    total = counts.sum(axis=-1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return counts / total
+
+def population_stability(expected, actual):
+    """
+    PSI = Σ (a - e) ln(a / e) entre las proporciones de dos conteos por bin
+    (por filas si son matrices), con las proporciones acotadas a PSI_EPSILON.
+    """
+    e = np.maximum(_proportions(expected), PSI_EPSILON)
+    a = np.maximum(_proportions(actual), PSI_EPSILON)
+    return ((a - e) * np.log(a / e)).sum(axis=-1)
+
+def jensen_shannon(expected, actual):
+    """Divergencia de Jensen-Shannon en bits (0 = iguales, 1 = disjuntas)"""
+    p, q = _proportions(expected), _proportions(actual)
+    m = (p + q) / 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        kl = lambda x: np.where(x > 0, x * np.log2(x / m), 0.0).sum()
+        return float((kl(p) + kl(q)) / 2)
+
+class SortedValues:
+    """
+    Valores distintos ordenados de cada columna numérica y su conteo
+    acumulado: la función de distribución empírica sin guardar la columna
+    ordenada entera (las columnas de NSL-KDD repiten mucho sus valores).
+    Se construye una vez con un np.unique por columna; los NaN se excluyen.
+    """
+    
+    def __init__(self, columns):
+        self.values = []
+        self.cumulative = []
+        for values in columns:
+            distinct, counts = np.unique(values, return_counts=True)
+            if distinct.dtype.kind == 'f':
+                valid = ~np.isnan(distinct)
+                distinct, counts = distinct[valid], counts[valid]
+            self.values.append(distinct.astype(np.float64, copy=False))
+            self.cumulative.append(np.cumsum(counts))
+    
+    def count(self, j):
+        return int(self.cumulative[j][-1]) if len(self.cumulative[j]) else 0
+    
+    def cdf(self, j, points):
+        """Proporción de valores de la columna j menores o iguales a cada punto"""
+        positions = np.searchsorted(self.values[j], points, side='right')
+        return np.concatenate([[0], self.cumulative[j]])[positions] / self.count(j)
+
+def kolmogorov_smirnov(reference, current, j, k=None):
+    """
+    Estadístico D de Kolmogorov-Smirnov de dos muestras entre la columna j de
+    reference y la k de current (SortedValues): la máxima distancia entre sus
+    distribuciones empíricas, evaluadas en los valores distintos de ambas.
+    Retorna (D, p-valor asintótico).
+    """
+    k = j if k is None else k
+    n, m = reference.count(j), current.count(k)
+    if n == 0 or m == 0:
+        return math.nan, math.nan
+    points = np.concatenate([reference.values[j], current.values[k]])
+    d = float(np.abs(reference.cdf(j, points) - current.cdf(k, points)).max())
+    return d, float(kolmogorov(d * math.sqrt(n * m / (n + m))))
+
+class DriftAnalysis:
+    """
+    Deriva de un dataset (current, p.ej. KDDTest+ o tráfico reciente)
+    respecto al cargado (referencia), por característica:
+    - numéricas: PSI sobre PSI_BINS bins de igual frecuencia de la referencia
+      y estadístico KS.
+    - categóricas: PSI y divergencia de Jensen-Shannon de las frecuencias,
+      categorías nuevas o ausentes y las de mayor cambio.
+    
+    Todo lo costoso se hace al construir el objeto (una vez por versión del
+    dataset): el histograma quantile de la referencia es el de la pirámide de
+    /api/feature-distributions/, y current se cuenta con sus mismos bordes
+    (los valores fuera del rango de la referencia caen en los bins extremos).
+    report() solo combina arrays pequeños.
+    """
+    
+    def __init__(self, numeric_cols, histogram, reference_columns, categories, current):
+        """
+        numeric_cols y reference_columns: columnas numéricas de la referencia
+        y sus arrays; histogram: su FixedBinHistogram quantile a PYRAMID_BINS;
+        categories: {columna: (categorías, conteos)} de la referencia.
+        """
+        self.current = current
+        self.reference_rows = len(reference_columns[0]) if reference_columns else 0
+        current_numeric = set(current.select_dtypes(include=[np.number]).columns)
+        positions = [j for j, col in enumerate(numeric_cols) if col in current_numeric]
+        self.numeric_cols = [numeric_cols[j] for j in positions]
+        self.categorical_cols = [col for col in categories if col in current.columns]
+        self.missing_cols = [
+            col for col in list(numeric_cols) + list(categories)
+            if col not in self.numeric_cols and col not in self.categorical_cols
+        ]
+        
+        # Bordes de la referencia (sin la ampliación de las columnas constantes)
+        edges = histogram.edges[positions]
+        self.edges = histogram.coarsen(PSI_BINS)[1][positions]
+        self.reference_counts = histogram.coarsen(PSI_BINS)[0][positions]
+        counter = FixedBinHistogram(None, None, PYRAMID_BINS, 'quantile', edges)
+        counter.update([
+            np.clip(current[col].to_numpy(), edges[i, 0], edges[i, -1])
+            for i, col in enumerate(self.numeric_cols)
+        ])
+        self.current_counts = counter.coarsen(PSI_BINS)[0]
+        self.psi = population_stability(self.reference_counts, self.current_counts)
+        
+        self.reference_sorted = SortedValues([reference_columns[j] for j in positions])
+        self.current_sorted = SortedValues([current[col].to_numpy() for col in self.numeric_cols])
+        self.ks = [kolmogorov_smirnov(self.reference_sorted, self.current_sorted, i) for i in range(len(positions))]
+        
+        self.categories = {}
+        for col in self.categorical_cols:
+            labels, counts = categories[col]
+            frequencies = current[col].value_counts(dropna=True)
+            frequencies = frequencies[frequencies > 0]
+            labels = [str(label) for label in labels]
+            known = set(labels)
+            new = [str(label) for label in frequencies.index if str(label) not in known]
+            observed = dict(zip(map(str, frequencies.index), frequencies.to_numpy()))
+            self.categories[col] = (
+                labels + new,
+                np.concatenate([counts, np.zeros(len(new), dtype=np.int64)]),
+                np.array([observed.get(label, 0) for label in labels + new], dtype=np.int64),
+                new,
+            )
+    
+    def report(self, features=None):
+        """Payload de /api/drift/ (features: columnas a incluir, por defecto todas)"""
+        wanted = set(features) if features is not None else None
+        numeric = {}
+        for i, col in enumerate(self.numeric_cols):
+            if wanted is not None and col not in wanted:
+                continue
+            psi = float(self.psi[i])
+            ks, pvalue = self.ks[i]
+            numeric[col] = {
+                'psi': psi,
+                'ks': ks,
+                'ks_pvalue': pvalue,
+                'drift': drift_level(psi),
+                'edges': self.edges[i],
+                'reference': _proportions(self.reference_counts[i]),
+                'current': _proportions(self.current_counts[i]),
+            }
+        
+        categorical = {}
+        for col in self.categorical_cols:
+            if wanted is not None and col not in wanted:
+                continue
+            labels, reference, current, new = self.categories[col]
+            psi = float(population_stability(reference, current))
+            p, q = _proportions(reference), _proportions(current)
+            shifts = np.argsort(-np.abs(q - p), kind='stable')[:DRIFT_TOP_SHIFTS]
+            categorical[col] = {
+                'psi': psi,
+                'js_divergence': jensen_shannon(reference, current),
+                'drift': drift_level(psi),
+                'new_categories': new,
+                'missing_categories': [label for label, count, seen in zip(labels, reference, current) if count and not seen],
+                'top_shifts': [
+                    {'value': labels[i], 'reference': float(p[i]), 'current': float(q[i])}
+                    for i in shifts
+                ],
+            }
+        
+        drifted = sorted(
+            (col for col, values in {**numeric, **categorical}.items() if values['drift'] != 'none'),
+            key=lambda col: -(numeric.get(col) or categorical[col])['psi'],
+        )
+        return {
+            'reference_rows': self.reference_rows,
+            'current_rows': len(self.current),
+            'psi_bins': PSI_BINS,
+            'psi_thresholds': list(PSI_THRESHOLDS),
+            'numeric': numeric,
+            'categorical': categorical,
+            'drifted': drifted,
+            'missing_columns': self.missing_cols,
+        }
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Columnas de tasas (0.0 - 1.0): float32 conserva de sobra los 2 decimales del dataset
+RATE_SUFFIX = '_rate'
+
+# Máxima proporción de valores distintos para convertir texto a category
+MAX_CATEGORY_RATIO = 0.5
+
+def _smallest_int_dtype(values):
+    """Tipo entero más pequeño (int8/int16/int32/int64) que contiene el rango"""
+    if len(values) == 0:
+        return np.dtype(np.int8)
+    lo, hi = values.min(), values.max()
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+def _is_integral(values):
+    """True si un array flotante solo contiene enteros finitos (p.ej. ARFF 'real')"""
+    return bool(np.isfinite(values).all() and (values == np.floor(values)).all())
+
+def _target_dtype(name, series):
+    """Tipo compacto para una columna, o None si se deja como está"""
+    dtype = series.dtype
+    
+    if isinstance(dtype, pd.CategoricalDtype) or dtype == bool:
+        return None
+    
+    if dtype == object:
+        n_unique = series.nunique(dropna=True)
+        if len(series) and n_unique / len(series) <= MAX_CATEGORY_RATIO:
+            return 'category'
+        return None
+    
+    values = series.to_numpy()
+    
+    if np.issubdtype(dtype, np.integer):
+        return _smallest_int_dtype(values)
+    
+    if np.issubdtype(dtype, np.floating):
+        if name.endswith(RATE_SUFFIX):
+            return np.dtype(np.float32)
+        if _is_integral(values):
+            return _smallest_int_dtype(values)
+    
+    return None
+
+def optimize_dtypes(data):
+    """
+    Normaliza los tipos del DataFrame para reducir memoria:
+    - Texto con baja cardinalidad (protocol_type, service, flag, class) -> category
+    - Enteros y flotantes enteros (land, urgent, root_shell, ...) -> int8/int16/int32
+    - Columnas *_rate -> float32
+    
+    Retorna (data, report) donde report tiene, por columna modificada,
+    el tipo original, el nuevo y los bytes ahorrados.
+    """
+    report = {}
+    converted = {}
+    
+    for col in data.columns:
+        series = data[col]
+        target = _target_dtype(col, series)
+        if target is None or (target != 'category' and series.dtype == target):
+            continue
+        
+        new_series = series.astype(target)
+        before = int(series.memory_usage(index=False, deep=True))
+        after = int(new_series.memory_usage(index=False, deep=True))
+        
+        converted[col] = new_series
+        report[col] = {
+            'from': str(series.dtype),
+            'to': str(new_series.dtype),
+            'bytes_before': before,
+            'bytes_after': after,
+            'bytes_saved': before - after,
+        }
+    
+    if converted:
+        data = data.copy(deep=False)
+        for col, new_series in converted.items():
+            data[col] = new_series
+    
+    return data, report
+
+def log_report(report):
+    """Registra el ahorro de memoria por columna y total"""
+    if not report:
+        return
+    
+    for col, entry in report.items():
+        logger.debug(
+            f"{col}: {entry['from']} -> {entry['to']}, "
+            f"{entry['bytes_saved']} bytes ahorrados"
+        )
+    
+    before = sum(e['bytes_before'] for e in report.values())
+    after = sum(e['bytes_after'] for e in report.values())
+    logger.info(
+        f"Tipos optimizados en {len(report)} columnas: "
+        f"{before / 1e6:.1f} MB -> {after / 1e6:.1f} MB"
+    )
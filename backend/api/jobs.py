@@ -0,0 +1,227 @@
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.serializers import BooleanField
+
+from .data_loader import DatasetLoader
+from .models import AnalyticsJob
+
+logger = logging.getLogger(__name__)
+
+# Endpoints que se ejecutan como job por defecto cuando el dataset tiene al
+# menos ANALYTICS_JOBS_MIN_ROWS filas (el resto solo con ?async=true)
+ASYNC_ENDPOINTS = {
+    'statistics', 'correlation_matrix', 'top_correlations', 'feature_distributions',
+    'anomaly_analysis', 'batch',
+}
+
+ACTIVE = (AnalyticsJob.PENDING, AnalyticsJob.RUNNING)
+
+# Intervalo de consulta a la base de datos en el long-poll de un job de otro worker
+POLL_INTERVAL = 0.2
+
+# Latido de los jobs en curso, como fracción de ANALYTICS_JOB_TIMEOUT
+HEARTBEAT_FRACTION = 1 / 3
+
+_executor = None
+_executor_lock = threading.Lock()
+_submit_lock = threading.Lock()
+_warned = False
+# Jobs de este proceso: id -> Event que se activa al terminar (long-poll sin consultar la base)
+_finished = {}
+
+def _pool():
+    """Pool de hilos de los jobs, creado en el primer uso (después del fork de gunicorn)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'ANALYTICS_JOB_WORKERS', 2),
+                    thread_name_prefix='analytics-job',
+                )
+    return _executor
+
+def job_key(key):
+    """Clave de caché de respuestas (huella, endpoint, query) -> hash para la tabla de jobs"""
+    return hashlib.blake2b(repr(key).encode(), digest_size=32).hexdigest()
+
+def wants_async(request, endpoint):
+    """
+    ?async=true (o false) decide explícitamente; sin el parámetro, los
+    endpoints de ASYNC_ENDPOINTS van como job si el dataset cargado tiene al
+    menos ANALYTICS_JOBS_MIN_ROWS filas (0 = nunca).
+    """
+    raw = request.GET.get('async')
+    if raw is not None:
+        return raw in BooleanField.TRUE_VALUES
+    min_rows = getattr(settings, 'ANALYTICS_JOBS_MIN_ROWS', 0)
+    return endpoint in ASYNC_ENDPOINTS and min_rows > 0 and DatasetLoader().get_row_count() >= min_rows
+
+def may_have_result(request, endpoint):
+    """
+    ¿Puede haber un job guardado para esta petición? Solo si se pidió ?async
+    o si el endpoint va como job en datasets grandes (ASYNC_ENDPOINTS con
+    ANALYTICS_JOBS_MIN_ROWS > 0). Evita consultar la base en cada fallo de
+    caché cuando los jobs no se usan.
+    """
+    if 'async' in request.GET:
+        return True
+    return endpoint in ASYNC_ENDPOINTS and getattr(settings, 'ANALYTICS_JOBS_MIN_ROWS', 0) > 0
+
+def stored_result(key):
+    """
+    Cuerpo JSON del último job terminado con esta clave (de cualquier worker),
+    o None. Sin la tabla de jobs (migraciones sin aplicar) retorna None.
+    """
+    global _warned
+    try:
+        job = (AnalyticsJob.objects.filter(key=job_key(key), status=AnalyticsJob.DONE)
+               .only('result').first())
+    except DatabaseError as e:
+        if not _warned:
+            _warned = True
+            logger.warning(f"No se pudo consultar la tabla de jobs (¿falta manage.py migrate?): {e}")
+        return None
+    return bytes(job.result) if job is not None else None
+
+def discard(endpoints):
+    """Elimina los resultados guardados de los endpoints dados (ver response_cache.invalidate)"""
+    try:
+        AnalyticsJob.objects.filter(endpoint__in=endpoints, status=AnalyticsJob.DONE).delete()
+    except DatabaseError as e:
+        logger.warning(f"No se pudieron descartar los jobs de {', '.join(endpoints)}: {e}")
+
+def _is_stale(job):
+    """
+    Job activo sin latido en ANALYTICS_JOB_TIMEOUT: su proceso murió o se
+    reinició (mientras corre, _heartbeat renueva updated_at)
+    """
+    timeout = getattr(settings, 'ANALYTICS_JOB_TIMEOUT', 600)
+    return job.updated_at < timezone.now() - timedelta(seconds=timeout)
+
+def _heartbeat(job_id, stop):
+    """
+    Renueva updated_at del job cada HEARTBEAT_FRACTION de
+    ANALYTICS_JOB_TIMEOUT hasta que se activa stop, para que un cálculo
+    largo no se dé por perdido y se repita en otro worker.
+    """
+    interval = getattr(settings, 'ANALYTICS_JOB_TIMEOUT', 600) * HEARTBEAT_FRACTION
+    try:
+        while not stop.wait(interval):
+            AnalyticsJob.objects.filter(id=job_id, status=AnalyticsJob.RUNNING).update(updated_at=timezone.now())
+    except DatabaseError as e:
+        logger.warning(f"No se pudo renovar el job {job_id}: {e}")
+    finally:
+        connection.close()
+
+def submit(request, key, endpoint, compute):
+    """
+    Encola compute() como job (o reutiliza uno activo con la misma clave) y
+    responde 202 con su id y la URL de consulta en Location.
+    
+    compute() retorna la CachedResponse si el endpoint respondió 200, o la
+    Response de error (400, 500...) en otro caso.
+    """
+    digest = job_key(key)
+    with _submit_lock:
+        job = AnalyticsJob.objects.filter(key=digest, status__in=ACTIVE).first()
+        if job is None or _is_stale(job):
+            _prune()
+            job = AnalyticsJob.objects.create(key=digest, endpoint=endpoint, query=request.GET.urlencode())
+            _finished[job.id] = threading.Event()
+            _pool().submit(_run, job.id, compute)
+    
+    url = request.build_absolute_uri(reverse('job_detail', args=[job.id]))
+    return Response(describe(job), status=status.HTTP_202_ACCEPTED, headers={'Location': url})
+
+def _run(job_id, compute):
+    """Ejecuta un job en un hilo del pool y guarda su resultado"""
+    from .response_cache import CachedResponse, render_json
+    close_old_connections()
+    try:
+        now = timezone.now()
+        AnalyticsJob.objects.filter(id=job_id).update(
+            status=AnalyticsJob.RUNNING, started_at=now, updated_at=now
+        )
+        stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=_heartbeat, args=(job_id, stop), name=f'analytics-job-heartbeat-{job_id}', daemon=True
+        )
+        heartbeat.start()
+        try:
+            outcome = compute()
+        except Exception as e:
+            logger.error(f"Error en el job {job_id}: {e}")
+            outcome = Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        finally:
+            stop.set()
+            heartbeat.join()
+        
+        if isinstance(outcome, CachedResponse):
+            state, code, body = AnalyticsJob.DONE, status.HTTP_200_OK, outcome.body
+        elif isinstance(outcome, Response):
+            state, code, body = AnalyticsJob.FAILED, outcome.status_code, render_json(outcome.data)
+        else:
+            # p.ej. StreamingHttpResponse de /api/batch/?stream=true
+            state, code = AnalyticsJob.FAILED, status.HTTP_400_BAD_REQUEST
+            body = render_json({'error': 'La respuesta de este endpoint no puede ejecutarse como job'})
+        
+        now = timezone.now()
+        AnalyticsJob.objects.filter(id=job_id).update(
+            status=state, status_code=code, result=body, finished_at=now, updated_at=now
+        )
+    except DatabaseError as e:
+        logger.error(f"No se pudo guardar el job {job_id}: {e}")
+    finally:
+        event = _finished.pop(job_id, None)
+        if event is not None:
+            event.set()
+        connection.close()
+
+def _prune():
+    """Elimina los jobs terminados hace más de ANALYTICS_JOB_RETENTION segundos"""
+    retention = getattr(settings, 'ANALYTICS_JOB_RETENTION', 7 * 24 * 3600)
+    cutoff = timezone.now() - timedelta(seconds=retention)
+    AnalyticsJob.objects.filter(finished_at__lt=cutoff).delete()
+
+def wait(job_id, timeout):
+    """
+    Long-poll: espera hasta timeout segundos a que el job termine.
+    Los jobs de este proceso avisan con un Event; los de otros workers se
+    consultan en la base cada POLL_INTERVAL. Retorna el job (None si no existe).
+    """
+    deadline = time.monotonic() + timeout
+    event = _finished.get(job_id)
+    if event is not None:
+        event.wait(timeout)
+    
+    while True:
+        job = AnalyticsJob.objects.filter(id=job_id).first()
+        remaining = deadline - time.monotonic()
+        if job is None or job.status not in ACTIVE or remaining <= 0:
+            return job
+        time.sleep(min(POLL_INTERVAL, remaining))
+
+def describe(job):
+    """Metadatos del job (sin el resultado)"""
+    return {
+        'id': str(job.id),
+        'endpoint': job.endpoint,
+        'query': job.query,
+        'status': job.status,
+        'status_code': job.status_code,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
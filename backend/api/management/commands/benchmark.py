@@ -0,0 +1,283 @@
+import gc
+import json
+import os
+import platform
+import re
+import resource
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from api import data_loader, views
+from api.analytics import DatasetAnalytics
+from api.columnar import ColumnarCache
+from api.data_loader import DatasetLoader
+from api.detector import detector
+from api.response_cache import render_json, response_cache
+from api.synthetic import write_dataset
+from api.urls import urlpatterns
+
+DEFAULT_SIZES = '5000,125000,1000000,5000000'
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json')
+
+# Por debajo de estas diferencias absolutas no se considera regresión (ruido)
+MIN_SECONDS_DELTA = 0.01
+MIN_RSS_DELTA_MB = 5.0
+
+# Argumentos de los métodos de analytics que los necesitan
+METHOD_ARGS = {
+    'get_statistics': {'percentiles': [0.9, 0.99]},
+    'get_categorical_crosstab': {'column': 'service'},
+}
+
+# Dependen del detector del dataset cargado: se miden por las vistas
+# (detector.train y view.model_metrics)
+SKIP_METHODS = {'get_model_metrics'}
+
+class PeakRSS:
+    """
+    Pico de memoria residente (MB) de un tramo de código.
+    
+    En Linux se reinicia el pico del proceso (VmHWM) escribiendo 5 en
+    /proc/self/clear_refs; en otros sistemas solo existe el pico de toda la
+    vida del proceso (ru_maxrss), que sirve como cota superior.
+    """
+    
+    def __init__(self):
+        self.resettable = os.path.exists('/proc/self/clear_refs')
+    
+    def reset(self):
+        if self.resettable:
+            try:
+                with open('/proc/self/clear_refs', 'w') as fh:
+                    fh.write('5')
+            except OSError:
+                self.resettable = False
+    
+    def peak_mb(self):
+        if self.resettable:
+            with open('/proc/self/status') as fh:
+                match = re.search(r'VmHWM:\s+(\d+) kB', fh.read())
+            if match:
+                return int(match.group(1)) / 1024
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return kb / 1024 / (1024 if platform.system() == 'Darwin' else 1)
+
+class Command(BaseCommand):
+    help = (
+        'Mide carga del ARFF, métodos de DatasetAnalytics y endpoints DRF sobre '
+        'datasets sintéticos de varios tamaños. Guarda tiempo, pico de RSS y '
+        'bytes de respuesta en un baseline JSON y falla si hay regresiones.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                            help=f'Tamaños en filas separados por comas (por defecto {DEFAULT_SIZES})')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                            help='Archivo JSON con el baseline')
+        parser.add_argument('--update', action='store_true',
+                            help='Reescribir el baseline con los resultados actuales')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Regresión tolerada en tiempo y RSS (0.25 = +25%%)')
+        parser.add_argument('--bytes-threshold', type=float, default=0.05,
+                            help='Regresión tolerada en bytes de respuesta')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Repeticiones por medición de analytics y vistas (se toma la mínima)')
+        parser.add_argument('--workdir', default=None,
+                            help='Directorio para los ARFF sintéticos (se reutilizan entre ejecuciones)')
+        parser.add_argument('--seed', type=int, default=42)
+    
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        workdir = options['workdir'] or os.path.join(tempfile.gettempdir(), 'nslkdd-benchmarks')
+        os.makedirs(workdir, exist_ok=True)
+        
+        self.repeat = max(1, options['repeat'])
+        self.rss = PeakRSS()
+        if not self.rss.resettable:
+            self.stderr.write('Aviso: el pico de RSS es el de todo el proceso (sin /proc/self/clear_refs)')
+        
+        results = {}
+        for size in sizes:
+            self.stdout.write(f'== {size} filas ==')
+            results[str(size)] = self._run_size(size, workdir, options['seed'])
+            gc.collect()
+        
+        report = {
+            'meta': {
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'pandas': pd.__version__,
+                'machine': platform.machine(),
+                'cpus': os.cpu_count(),
+                'repeat': self.repeat,
+            },
+            'results': results,
+        }
+        
+        baseline = self._read_baseline(options['baseline'])
+        if baseline is None or options['update']:
+            self._write_baseline(options['baseline'], baseline, report)
+            return
+        
+        regressions = self._compare(baseline, report, options['threshold'], options['bytes_threshold'])
+        if regressions:
+            for line in regressions:
+                self.stderr.write(line)
+            raise CommandError(f'{len(regressions)} métricas con regresión respecto al baseline')
+        self.stdout.write(self.style.SUCCESS('Sin regresiones respecto al baseline'))
+    
+    # Datos sintéticos
+    
+    def _synthetic_arff(self, size, workdir, seed):
+        """ARFF de size filas generado por bloques; se reutiliza si ya existe"""
+        path = os.path.join(workdir, f'synthetic-{size}-{seed}.arff')
+        if not os.path.exists(path):
+            self.stdout.write(f'Generando {path}')
+            write_dataset(size, arff_path=path, seed=seed, workers=os.cpu_count() or 1)
+        return path
+    
+    # Medición
+    
+    def _measure(self, results, name, func, repeat=1):
+        """Ejecuta func repeat veces; guarda el tiempo mínimo y el pico de RSS"""
+        best = None
+        peak = 0.0
+        value = None
+        for _ in range(repeat):
+            gc.collect()
+            self.rss.reset()
+            start = time.perf_counter()
+            value = func()
+            elapsed = time.perf_counter() - start
+            peak = max(peak, self.rss.peak_mb())
+            best = elapsed if best is None else min(best, elapsed)
+        
+        results[name] = {'seconds': round(best, 6), 'peak_rss_mb': round(peak, 1)}
+        self.stdout.write(f'  {name:<45} {best * 1000:>10.1f} ms {peak:>9.1f} MB')
+        return value
+    
+    def _run_size(self, size, workdir, seed):
+        results = {}
+        path = self._synthetic_arff(size, workdir, seed)
+        loader = DatasetLoader()
+        cache_dir = tempfile.mkdtemp(prefix='benchmark-cache-', dir=workdir)
+        
+        try:
+            # Carga: parseo, normalización de tipos y caché columnar
+            raw = self._measure(results, 'load.parse', lambda: loader._read_source(path))
+            data = self._measure(results, 'load.normalize', lambda: loader._normalize_dtypes(raw))
+            del raw
+            cache = ColumnarCache(cache_dir)
+            self._measure(results, 'load.cache_write', lambda: cache.save(path, data))
+            self._measure(results, 'load.cache_read', lambda: cache.load(path), self.repeat)
+            
+            # Cada método público de DatasetAnalytics
+            analytics = self._measure(results, 'analytics.init', lambda: DatasetAnalytics(data), self.repeat)
+            # Recarga por anexado: el 1% final de las filas sobre el motor del resto
+            base = DatasetAnalytics(data.iloc[:len(data) - max(1, len(data) // 100)])
+            self._measure(results, 'analytics.appended', lambda: base.appended(data), self.repeat)
+            del base
+            for name in sorted(dir(DatasetAnalytics)):
+                if not name.startswith('get_') or name in SKIP_METHODS:
+                    continue
+                method = getattr(analytics, name)
+                kwargs = METHOD_ARGS.get(name, {})
+                payload = self._measure(results, f'analytics.{name}', lambda: method(**kwargs), self.repeat)
+                results[f'analytics.{name}']['bytes'] = len(render_json(payload))
+            del analytics, data
+            
+            # Petición completa por las vistas DRF (carga desde la caché columnar)
+            self._run_views(results, path, cache_dir)
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+        
+        return results
+    
+    def _use_dataset(self, path, cache_dir):
+        """Apunta el loader y las vistas a otro dataset, descartando el estado cargado"""
+        data_loader.DATASET_PATH = path
+        data_loader.CACHE_DIR = cache_dir
+        DatasetLoader().reset()
+        response_cache.clear()
+    
+    def _run_views(self, results, path, cache_dir):
+        original = (data_loader.DATASET_PATH, data_loader.CACHE_DIR)
+        self._use_dataset(path, cache_dir)
+        client = Client(SERVER_NAME='localhost')
+        endpoints = [
+            (pattern.name, f'/api/{pattern.pattern}')
+            for pattern in urlpatterns if pattern.callback in views.WARMUP_VIEWS
+        ]
+        
+        try:
+            # Primera petición: incluye la carga del dataset y la inicialización
+            self._measure(results, 'view.first_request', lambda: client.get(endpoints[0][1]))
+            # Entrenamiento del detector en segundo plano, hasta que queda listo
+            self._measure(results, 'detector.train', self._train_detector)
+            
+            for name, url in endpoints:
+                def cold():
+                    response_cache.clear()
+                    return client.get(url)
+                
+                response = self._measure(results, f'view.{name}', cold, self.repeat)
+                if response.status_code != 200:
+                    raise CommandError(f'{url} respondió {response.status_code}')
+                results[f'view.{name}']['bytes'] = len(response.content)
+                self._measure(results, f'view.{name}.cached', lambda: client.get(url), self.repeat)
+        finally:
+            self._use_dataset(*original)
+    
+    def _train_detector(self):
+        while detector.ensure() == 'training':
+            time.sleep(0.05)
+        if detector.ensure() != 'ready':
+            raise CommandError(f'El detector no pudo entrenarse: {detector.describe()["error"]}')
+    
+    # Baseline
+    
+    def _read_baseline(self, path):
+        if not os.path.exists(path):
+            return None
+        with open(path) as fh:
+            return json.load(fh)
+    
+    def _write_baseline(self, path, baseline, report):
+        """Combina con el baseline existente: los tamaños no medidos se conservan"""
+        merged = dict(report)
+        if baseline is not None:
+            merged['results'] = {**baseline.get('results', {}), **report['results']}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as fh:
+            json.dump(merged, fh, indent=2, sort_keys=True)
+            fh.write('\n')
+        self.stdout.write(self.style.SUCCESS(f'Baseline guardado en {path}'))
+    
+    def _compare(self, baseline, report, threshold, bytes_threshold):
+        """Métricas que empeoran más que el umbral (y más que el ruido mínimo)"""
+        limits = {
+            'seconds': (threshold, MIN_SECONDS_DELTA),
+            'peak_rss_mb': (threshold, MIN_RSS_DELTA_MB),
+            'bytes': (bytes_threshold, 0),
+        }
+        regressions = []
+        
+        for size, metrics in report['results'].items():
+            previous_metrics = baseline.get('results', {}).get(size, {})
+            for name, values in metrics.items():
+                previous = previous_metrics.get(name, {})
+                for metric, (ratio, min_delta) in limits.items():
+                    if metric not in values or metric not in previous:
+                        continue
+                    old, new = previous[metric], values[metric]
+                    if new > old * (1 + ratio) and new - old > min_delta:
+                        regressions.append(
+                            f'{size} filas, {name}.{metric}: {old} -> {new} '
+                            f'(+{(new / old - 1) * 100 if old else float("inf"):.0f}%)'
+                        )
+        return regressions
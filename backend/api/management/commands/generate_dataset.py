@@ -0,0 +1,69 @@
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from api import data_loader
+from api.synthetic import CHUNK_ROWS, DEFAULT_CORRELATION, write_dataset
+
+def parse_class_mix(raw):
+    """'normal=0.67,anomaly=0.33' -> {'normal': 0.67, 'anomaly': 0.33}"""
+    mix = {}
+    for item in raw.split(','):
+        label, sep, weight = item.partition('=')
+        if not sep or not label.strip():
+            raise ValueError(f"Formato esperado etiqueta=peso: {item!r}")
+        mix[label.strip()] = float(weight)
+    return mix
+
+class Command(BaseCommand):
+    help = (
+        'Genera un dataset sintético con el esquema de NSL-KDD, por bloques y en '
+        'varios procesos, escribiendo ARFF/CSV y la caché columnar del loader.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, required=True, help='Número de registros')
+        parser.add_argument('--arff', help='Ruta del ARFF de salida')
+        parser.add_argument('--csv', help='Ruta del CSV de salida')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--class-mix', default='normal=0.67,anomaly=0.33',
+                            help='Proporción de clases, p.ej. normal=0.5,dos=0.3,probe=0.2')
+        parser.add_argument('--correlation', type=float, default=DEFAULT_CORRELATION,
+                            help='Correlación latente dentro de cada grupo de características [0, 1]')
+        parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--cache-dir', default=data_loader.CACHE_DIR,
+                            help='Directorio de la caché columnar del loader')
+        parser.add_argument('--no-cache', action='store_true',
+                            help='No escribir la caché columnar')
+    
+    def handle(self, *args, **options):
+        if not options['arff'] and not options['csv']:
+            raise CommandError('Indica --arff y/o --csv')
+        if options['rows'] <= 0 or options['chunk_rows'] <= 0:
+            raise CommandError('--rows y --chunk-rows deben ser positivos')
+        
+        try:
+            class_mix = parse_class_mix(options['class_mix'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        
+        start = time.perf_counter()
+        try:
+            paths = write_dataset(
+                options['rows'],
+                arff_path=options['arff'],
+                csv_path=options['csv'],
+                cache_dir=None if options['no_cache'] else options['cache_dir'],
+                seed=options['seed'],
+                class_mix=class_mix,
+                correlation=options['correlation'],
+                chunk_rows=options['chunk_rows'],
+                workers=options['workers'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['rows']} registros en {elapsed:.1f} s: {', '.join(paths)}"
+        ))
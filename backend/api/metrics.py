@@ -0,0 +1,237 @@
+import bisect
+import contextvars
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+# Límites de los buckets (segundos): desde aciertos de caché (<1 ms) hasta
+# cargas completas del dataset
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+# Contexto de la petición en curso: endpoint y tiempos por fase (Server-Timing)
+_request_context = contextvars.ContextVar('metrics_request_context', default=None)
+_active_phase = contextvars.ContextVar('metrics_active_phase', default=None)
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """Base de las métricas: nombre, ayuda, etiquetas y series por valores de etiquetas"""
+    kind = None
+    
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self.samples())
+        return lines
+
+class Counter(Metric):
+    kind = 'counter'
+    
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+    
+    def samples(self):
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, value in series:
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+class Gauge(Metric):
+    """
+    Gauge calculado al exportar: func() retorna un número o, con etiquetas,
+    un dict {tupla de valores de etiquetas: número}.
+    """
+    kind = 'gauge'
+    
+    def __init__(self, name, documentation, func, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.func = func
+    
+    def samples(self):
+        values = self.func()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in sorted(values.items()):
+            if value is not None:
+                yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+class Histogram(Metric):
+    """Histograma acumulativo con buckets fijos, como el de Prometheus"""
+    kind = 'histogram'
+    
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+    
+    def samples(self):
+        with self._lock:
+            series = sorted((key, (list(counts), total, n)) for key, (counts, total, n) in self._series.items())
+        for key, (counts, total, n) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = (('le', _format_value(bound)),)
+                yield f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}'
+            yield f'{self.name}_count{_format_labels(self.labelnames, key)} {n}'
+
+REGISTRY = []
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+def render():
+    """Todas las métricas en formato de texto de Prometheus (versión 0.0.4)"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+# Métricas de la API
+
+REQUEST_LATENCY = register(Histogram(
+    'http_request_duration_seconds',
+    'Latencia total de la petición por endpoint',
+    ('endpoint', 'method', 'status'),
+))
+
+PHASE_LATENCY = register(Histogram(
+    'analytics_phase_duration_seconds',
+    'Tiempo por fase (load, compute, serialize, cache_hit, cache_miss, coalesced) y endpoint',
+    ('endpoint', 'phase'),
+))
+
+CACHE_REQUESTS = register(Counter(
+    'analytics_cache_requests_total',
+    'Consultas a la caché de respuestas por endpoint y resultado (hit/miss/coalesced)',
+    ('endpoint', 'result'),
+))
+
+def _resident_memory():
+    """RSS actual del proceso (bytes); sin /proc, el pico (ru_maxrss)"""
+    try:
+        with open('/proc/self/statm') as fh:
+            return int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+register(Gauge(
+    'process_resident_memory_bytes',
+    'Memoria residente del worker',
+    lambda: {(os.getpid(),): _resident_memory()},
+    ('pid',),
+))
+
+def _dataset_gauge(attribute):
+    def value():
+        from .data_loader import DatasetLoader
+        return getattr(DatasetLoader(), attribute)()
+    return value
+
+register(Gauge(
+    'dataset_memory_bytes',
+    'Memoria del dataset cargado (columnas, incluidas las mapeadas desde disco)',
+    _dataset_gauge('get_memory_usage'),
+))
+
+register(Gauge(
+    'dataset_rows',
+    'Registros del dataset cargado',
+    _dataset_gauge('get_row_count'),
+))
+
+def _response_cache_bytes():
+    from .response_cache import response_cache
+    return response_cache.size
+
+register(Gauge(
+    'analytics_response_cache_bytes',
+    'Bytes ocupados por la caché de respuestas (JSON + variantes comprimidas)',
+    _response_cache_bytes,
+))
+
+# Temporizadores
+
+@contextmanager
+def request_context(endpoint):
+    """Contexto de una petición: fija el endpoint y acumula los tiempos por fase"""
+    token = _request_context.set({'endpoint': endpoint, 'phases': {}})
+    try:
+        yield _request_context.get()
+    finally:
+        _request_context.reset(token)
+
+def set_endpoint(endpoint):
+    context = _request_context.get()
+    if context is not None:
+        context['endpoint'] = endpoint
+
+@contextmanager
+def phase(name, endpoint=None):
+    """
+    Mide una fase y la registra en PHASE_LATENCY con el endpoint de la
+    petición en curso ('startup' fuera de una petición, p.ej. en el warm-up).
+    
+    El tiempo es exclusivo: si dentro de 'compute' ocurre un 'load', el load
+    se descuenta del compute, así las fases de una petición no se solapan.
+    El nombre puede cambiarse dentro del bloque (frame['name']), p.ej. cuando
+    el resultado de una consulta a la caché se conoce después de empezar.
+    """
+    frame = {'name': name, 'nested': 0.0}
+    parent = _active_phase.get()
+    token = _active_phase.set(frame)
+    start = time.perf_counter()
+    try:
+        yield frame
+    finally:
+        elapsed = time.perf_counter() - start
+        _active_phase.reset(token)
+        if parent is not None:
+            parent['nested'] += elapsed
+        exclusive = max(elapsed - frame['nested'], 0.0)
+        
+        context = _request_context.get()
+        if endpoint is None:
+            endpoint = context['endpoint'] if context is not None else 'startup'
+        name = frame['name']
+        PHASE_LATENCY.observe(exclusive, endpoint=endpoint, phase=name)
+        if context is not None:
+            context['phases'][name] = context['phases'].get(name, 0.0) + exclusive
@@ -0,0 +1,59 @@
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from .metrics import REQUEST_LATENCY, request_context, set_endpoint
+
+class TimingMiddleware:
+    """
+    Latencia total por endpoint (nombre de la URL) y cabecera Server-Timing
+    con el desglose por fase de la petición (load, compute, serialize,
+    cache_hit/cache_miss). Debe ir el primero en MIDDLEWARE.
+    
+    En respuestas en streaming se mide hasta que la respuesta está lista,
+    no hasta el envío del último byte.
+    
+    Funciona en WSGI y en ASGI: con una cadena async no fuerza a Django a
+    ejecutar el resto de la petición en su hilo síncrono (ver api/offload.py).
+    """
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with request_context('unmatched') as context:
+            response = self.get_response(request)
+        return self._finish(request, response, context, start)
+    
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with request_context('unmatched') as context:
+            response = await self.get_response(request)
+        return self._finish(request, response, context, start)
+    
+    def _finish(self, request, response, context, start):
+        elapsed = time.perf_counter() - start
+        
+        REQUEST_LATENCY.observe(
+            elapsed,
+            endpoint=context['endpoint'],
+            method=request.method,
+            status=response.status_code,
+        )
+        
+        timings = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in context['phases'].items()]
+        timings.append(f'total;dur={elapsed * 1000:.2f}')
+        response['Server-Timing'] = ', '.join(timings)
+        return response
+    
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        if match is not None and match.url_name:
+            set_endpoint(match.url_name)
+        return None
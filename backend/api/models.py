@@ -0,0 +1,40 @@
+import uuid
+from django.db import models
+
+class AnalyticsJob(models.Model):
+    """
+    Cálculo de un endpoint de analytics en segundo plano (ver api/jobs.py).
+    
+    key identifica la consulta (huella del dataset + endpoint + query), así
+    que un job terminado sirve a cualquier petición igual, desde cualquier
+    worker y también tras reiniciar el servicio.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pendiente'),
+        (RUNNING, 'En ejecución'),
+        (DONE, 'Terminado'),
+        (FAILED, 'Fallido'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    key = models.CharField(max_length=64, db_index=True)
+    endpoint = models.CharField(max_length=64)
+    query = models.TextField(blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    # Status HTTP y cuerpo JSON de la respuesta del endpoint (también si falló)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    result = models.BinaryField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f'{self.endpoint} {self.id} ({self.status})'
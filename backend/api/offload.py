@@ -0,0 +1,73 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_executor_lock = threading.Lock()
+_exhausted = object()
+
+def _pool():
+    """Pool acotado para el trabajo de CPU de las vistas async (ANALYTICS_ASYNC_WORKERS hilos)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'ANALYTICS_ASYNC_WORKERS', 4),
+                    thread_name_prefix='analytics-async',
+                )
+    return _executor
+
+async def run_sync(func, *args):
+    """
+    Ejecuta func(*args) en el pool sin bloquear el event loop, con el contexto
+    (contextvars) de la petición: versión fijada del dataset y tiempos por fase.
+    """
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(_pool(), context.run, func, *args)
+
+def _call_view(view, request, args, kwargs):
+    """Vista síncrona completa en un hilo del pool, incluido el render de la Response de DRF"""
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)) and not response.is_rendered:
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+async def _stream(iterator):
+    """Iterador async sobre uno síncrono: cada bloque se genera en el pool"""
+    iterator = iter(iterator)
+    while True:
+        chunk = await run_sync(next, iterator, _exhausted)
+        if chunk is _exhausted:
+            return
+        yield chunk
+
+def offload(view):
+    """
+    Versión async de una vista de analytics para el despliegue ASGI
+    (config/asgi.py): la vista se ejecuta entera en el pool acotado, así el
+    event loop sigue atendiendo /health/ y los endpoints baratos mientras se
+    calculan estadísticas o correlaciones. Con más peticiones que hilos, las
+    demás esperan en la cola del pool sin ocupar el event loop.
+    
+    Las respuestas en streaming (NDJSON de batch, /api/records/) se envían
+    bloque a bloque: Django consumiría un iterador síncrono entero antes de
+    enviarlo.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        response = await run_sync(_call_view, view, request, args, kwargs)
+        if response.streaming and not response.is_async:
+            response.streaming_content = _stream(response.streaming_content)
+        return response
+    
+    return wrapper
@@ -0,0 +1,256 @@
+import numpy as np
+import pandas as pd
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from .aggregates import Moments, Comoments
+from .analytics import (
+    DatasetAnalytics, class_groups,
+    statistics_payload, anomaly_payload,
+)
+from .shared_arrays import attach, share
+from .stats_engine import BASE_QUANTILES, column_quantiles, grouped_moments, pool_moments
+
+logger = logging.getLogger(__name__)
+
+# Filas por bloque dentro de cada shard: acota la copia float64 por worker
+BLOCK_ROWS = 65536
+
+# Estado de cada proceso worker: columnas adjuntas desde memoria compartida
+_worker_columns = None
+_worker_codes = None
+
+def _attach(column_specs, codes_spec):
+    """Inicializador del pool: adjunta las columnas compartidas (sin copia)"""
+    global _worker_columns, _worker_codes
+    _worker_columns = [attach(spec) for spec in column_specs]
+    _worker_codes = attach(codes_spec) if codes_spec else None
+
+def _blocks(start, stop):
+    """Bloques (a, b) de hasta BLOCK_ROWS filas, como matriz float64 (filas, k)"""
+    for a in range(start, stop, BLOCK_ROWS):
+        b = min(a + BLOCK_ROWS, stop)
+        X = np.empty((b - a, len(_worker_columns)))
+        for j, column in enumerate(_worker_columns):
+            X[:, j] = column.array[a:b]
+        yield a, b, X
+
+def _partial_moments(start, stop):
+    moments = Moments(len(_worker_columns))
+    for _, _, X in _blocks(start, stop):
+        moments.update(X)
+    return moments
+
+def _partial_comoments(start, stop):
+    comoments = Comoments(len(_worker_columns))
+    for _, _, X in _blocks(start, stop):
+        comoments.update(X)
+    return comoments
+
+def _partial_class_moments(table, n_groups, start, stop):
+    """
+    Momentos por grupo (table: grupo de cada código de clase, -1 al final
+    para class nula) y número de filas de cada grupo, en un rango de filas
+    """
+    rows = np.zeros(n_groups, dtype=np.int64)
+    partials = []
+    for a, b, X in _blocks(start, stop):
+        groups = table[_worker_codes.array[a:b]]
+        partials.append(grouped_moments(X.T, groups, n_groups))
+        rows += np.bincount(groups + 1, minlength=n_groups + 1)[1:]
+    count, mean, m2 = (np.stack(parts) for parts in zip(*partials))
+    return pool_moments(count, mean, m2), rows
+
+def _column_quantiles(columns, quantiles):
+    """
+    Mín, máx y cuantiles exactos de un subconjunto de columnas (filas
+    completas), una columna cada vez y en su dtype compacto: la memoria
+    extra por tarea es la de una columna, no la del subconjunto en float64.
+    """
+    col_min = np.full(len(columns), np.nan)
+    col_max = np.full(len(columns), np.nan)
+    col_q = {q: np.full(len(columns), np.nan) for q in quantiles}
+    for i, j in enumerate(columns):
+        col_min[i], col_max[i], values = column_quantiles(_worker_columns[j].array, quantiles)
+        for q in quantiles:
+            col_q[q][i] = values[q]
+    return columns, col_min, col_max, col_q
+
+class _PoolResources:
+    """
+    Pool de procesos y arrays compartidos de un ParallelAnalytics. Van
+    aparte del motor para que weakref.finalize los libere sin mantener vivo
+    el motor ni su DataFrame: al descartarse el motor o al salir del proceso.
+    """
+    
+    def __init__(self):
+        self.executor = None
+        self.pid = None
+        self.shared = None
+        self.codes = None
+    
+    def close(self):
+        if self.executor is not None and self.pid == os.getpid():
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+        for shared in (self.shared or []) + ([self.codes] if self.codes else []):
+            shared.close()
+        self.shared = None
+        self.codes = None
+
+class ParallelAnalytics(DatasetAnalytics):
+    """
+    DatasetAnalytics con ejecución multi-núcleo para get_statistics,
+    la correlación (matriz y top-k) y get_anomaly_statistics.
+    
+    Las columnas numéricas (en su dtype compacto) y los códigos de clase se
+    comparten con los procesos del pool sin serializarlos: las mapeadas desde
+    la caché columnar se mapean de los mismos archivos y el resto se copia una
+    sola vez a memoria compartida (ver shared_arrays.share). Cada tarea
+    calcula agregados parciales sobre un rango de filas (momentos,
+    co-momentos, momentos por clase) que se combinan de forma exacta con
+    merge. Los cuantiles exactos no son combinables por filas, así que se
+    reparten por columnas: cada tarea particiona sus columnas completas.
+    
+    Con menos de min_rows filas se usa la implementación secuencial: el coste
+    de coordinar el pool supera la ganancia.
+    """
+    
+    def __init__(self, data, workers, min_rows=200000):
+        super().__init__(data)
+        self.workers = workers
+        self.min_rows = min_rows
+        self._resources = _PoolResources()
+        self._class_labels = []
+        self._lock = threading.Lock()
+        weakref.finalize(self, self._resources.close)
+    
+    def appended(self, data):
+        """
+        Como DatasetAnalytics.appended: el índice y las pirámides solo procesan
+        las filas nuevas. El pool y los arrays compartidos son del motor
+        anterior (se liberan al retirarlo): el nuevo los crea en el primer uso,
+        y las columnas mapeadas desde la caché columnar no se copian.
+        """
+        engine = super().appended(data)
+        if engine._resources is self._resources:
+            engine._resources = _PoolResources()
+            engine._class_labels = []
+            engine._lock = threading.Lock()
+            weakref.finalize(engine, engine._resources.close)
+        return engine
+    
+    def _fresh(self, data):
+        return ParallelAnalytics(data, self.workers, self.min_rows)
+    
+    def _pool(self):
+        """Pool de procesos (uno por proceso padre: tras un fork se recrea)"""
+        resources = self._resources
+        with self._lock:
+            if resources.shared is None:
+                # Columnas mapeadas desde la caché columnar: los procesos del
+                # pool mapean los mismos archivos; el resto se copia a memoria compartida
+                resources.shared = [share(self.data[col].to_numpy()) for col in self.numeric_cols]
+                if 'class' in self.data.columns:
+                    classes = pd.Categorical(self.data['class'])
+                    self._class_labels = [str(c) for c in classes.categories]
+                    resources.codes = share(np.asarray(classes.codes))
+            
+            if resources.executor is None or resources.pid != os.getpid():
+                resources.executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_attach,
+                    initargs=(
+                        [shared.spec for shared in resources.shared],
+                        resources.codes.spec if resources.codes is not None else None,
+                    ),
+                )
+                resources.pid = os.getpid()
+            return resources.executor
+    
+    def _row_shards(self):
+        bounds = np.linspace(0, len(self.data), self.workers + 1).astype(int)
+        return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+    
+    def _map_rows(self, func):
+        """Ejecuta func(start, stop) en cada shard de filas y retorna los parciales"""
+        pool = self._pool()
+        futures = [pool.submit(func, a, b) for a, b in self._row_shards()]
+        return [future.result() for future in futures]
+    
+    def _use_parallel(self, mask=None, features=None):
+        # Las consultas filtradas usan la ruta secuencial: sus máscaras no están en memoria compartida
+        return (
+            self.workers > 1 and len(self.data) >= self.min_rows
+            and mask is None and features is None
+        )
+    
+    def shared_work(self, mask=None):
+        # El pool se crea antes de copiar para que la copia use el mismo
+        if self._use_parallel(mask):
+            self._pool()
+        return super().shared_work(mask)
+    
+    def get_statistics(self, percentiles=None, mask=None, features=None):
+        if not self._use_parallel(mask, features):
+            return super().get_statistics(percentiles, mask, features)
+        
+        extra = sorted(set(percentiles or ()))
+        quantiles = sorted(set(BASE_QUANTILES) | set(extra))
+        k = len(self.numeric_cols)
+        pool = self._pool()
+        
+        # Cuantiles por columnas y momentos por filas, en paralelo
+        column_groups = [g.tolist() for g in np.array_split(np.arange(k), self.workers) if len(g)]
+        quantile_futures = [pool.submit(_column_quantiles, g, quantiles) for g in column_groups]
+        moments = Moments(k)
+        for partial in self._map_rows(_partial_moments):
+            moments.merge(partial)
+        
+        summary = {
+            'count': moments.count,
+            'mean': moments.means,
+            'std': moments.std,
+            'min': np.full(k, np.nan),
+            'max': np.full(k, np.nan),
+            'quantiles': {q: np.full(k, np.nan) for q in quantiles},
+        }
+        for future in quantile_futures:
+            columns, col_min, col_max, col_q = future.result()
+            summary['min'][columns] = col_min
+            summary['max'][columns] = col_max
+            for q in quantiles:
+                summary['quantiles'][q][columns] = col_q[q]
+        
+        return statistics_payload(self.numeric_cols, summary, extra)
+    
+    def _correlation(self, mask=None, features=None):
+        if not self._use_parallel(mask, features):
+            return super()._correlation(mask, features)
+        
+        comoments = Comoments(len(self.numeric_cols))
+        for partial in self._map_rows(_partial_comoments):
+            comoments.merge(partial)
+        return self.numeric_cols, comoments.correlation()
+    
+    def get_anomaly_statistics(self, mask=None, features=None, grouping='binary'):
+        if not self._use_parallel(mask, features) or 'class' not in self.data.columns:
+            return super().get_anomaly_statistics(mask, features, grouping)
+        
+        self._pool()
+        groups, table = class_groups(self._class_labels, grouping)
+        partials = self._map_rows(functools.partial(_partial_class_moments, np.append(table, -1), len(groups)))
+        
+        moments, rows = zip(*partials)
+        count, mean, m2 = pool_moments(*(np.stack(parts) for parts in zip(*moments)))
+        return anomaly_payload(self.numeric_cols, groups, sum(rows), count, mean, m2, grouping)
+    
+    def close(self):
+        """Detiene el pool y libera la memoria compartida"""
+        with self._lock:
+            self._resources.close()
@@ -0,0 +1,133 @@
+import base64
+import hashlib
+import io
+import numpy as np
+import pandas as pd
+from .renderers import json_values
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow es opcional: sin él solo se sirve NDJSON
+    pa = None
+
+# Filas que se serializan de una vez: la memoria de una exportación depende
+# de este tamaño, no del número de filas pedidas
+RECORDS_CHUNK_ROWS = 10000
+
+# Máximo de filas por página de /api/records/
+RECORDS_MAX_LIMIT = 1000000
+
+RECORDS_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+def _tag(version):
+    """Etiqueta corta de la versión del dataset (igual en todos los workers)"""
+    return hashlib.blake2b(str(version.fingerprint).encode(), digest_size=6).hexdigest()
+
+def encode_cursor(version, position):
+    """Cursor opaco: versión del dataset y posición de la primera fila de la página"""
+    return base64.urlsafe_b64encode(f'{_tag(version)}:{position}'.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, version):
+    """
+    Posición de un cursor de encode_cursor. ValueError si está mal formado o
+    es de otra versión del dataset (las posiciones ya no corresponden).
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        tag, position = raw.split(':')
+        position = int(position)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Cursor inválido')
+    if tag != _tag(version):
+        raise ValueError('El cursor es de otra versión del dataset: volver a empezar sin cursor')
+    if position < 0:
+        raise ValueError('Cursor inválido')
+    return position
+
+def _json_column(series):
+    """Valores de una columna como JSON (lista de bytes); código -1 de una categórica -> null"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = json_values(np.asarray(series.cat.categories, dtype=object))
+        return np.array(categories + [b'null'], dtype=object)[series.cat.codes.to_numpy()].tolist()
+    return json_values(series.to_numpy())
+
+class RecordPage:
+    """
+    Una página de registros de un DataFrame: filas desde la posición start
+    (solo las de mask, si se da) hasta limit, con las columnas pedidas.
+    
+    No copia la página entera: chunks() extrae RECORDS_CHUNK_ROWS filas cada
+    vez, y ndjson() y arrow() las serializan a medida que se envían.
+    """
+    
+    def __init__(self, frame, columns, start, limit, mask=None):
+        self.frame = frame
+        self.columns = frame.columns.get_indexer(columns)
+        if mask is None:
+            end = min(start + limit, len(frame))
+            self.positions = None
+            self.bounds = (start, max(end, start))
+            self.next = end if end < len(frame) else None
+        else:
+            positions = np.flatnonzero(mask)
+            first = np.searchsorted(positions, start)
+            self.positions = positions[first:first + limit]
+            self.bounds = None
+            self.next = int(positions[first + limit]) if first + limit < len(positions) else None
+    
+    @property
+    def rows(self):
+        if self.positions is None:
+            return self.bounds[1] - self.bounds[0]
+        return len(self.positions)
+    
+    def chunks(self):
+        """DataFrames de hasta RECORDS_CHUNK_ROWS filas con las columnas de la página"""
+        for offset in range(0, self.rows, RECORDS_CHUNK_ROWS):
+            if self.positions is None:
+                start = self.bounds[0] + offset
+                rows = slice(start, min(start + RECORDS_CHUNK_ROWS, self.bounds[1]))
+            else:
+                rows = self.positions[offset:offset + RECORDS_CHUNK_ROWS]
+            yield self.frame.iloc[rows, self.columns]
+    
+    def ndjson(self):
+        """
+        Un objeto JSON por línea y registro, con los valores escritos como en
+        las respuestas JSON (ver renderers.json_values): float32 sin el ruido
+        de pasarlo a float64 y los nulos como null. Cada columna del chunk se
+        codifica de una vez; las categóricas, una vez por categoría.
+        """
+        names = np.array([str(col) for col in self.frame.columns[self.columns]], dtype=object)
+        keys = [name + b':' for name in json_values(names)]
+        for chunk in self.chunks():
+            columns = [_json_column(chunk.iloc[:, i]) for i in range(chunk.shape[1])]
+            yield b''.join(
+                b'{' + b','.join([key + value for key, value in zip(keys, row)]) + b'}\n'
+                for row in zip(*columns)
+            )
+    
+    def arrow(self):
+        """
+        Stream IPC de Arrow: el esquema y un record batch por chunk. Las
+        columnas categóricas van como diccionario (un solo diccionario por
+        columna, igual en todos los batches).
+        """
+        empty = self.frame.iloc[:0, self.columns]
+        schema = pa.Schema.from_pandas(empty, preserve_index=False)
+        sink = io.BytesIO()
+        
+        def drain():
+            data = sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+            return data
+        
+        with pa.ipc.new_stream(sink, schema) as writer:
+            for chunk in self.chunks():
+                writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+                yield drain()
+        yield drain()
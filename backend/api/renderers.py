@@ -0,0 +1,151 @@
+import json
+import math
+import numpy as np
+import pandas as pd
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa json de la librería estándar
+    orjson = None
+
+def _array(values):
+    """ndarray que orjson no serializa directamente (no contiguo, float16, object...)"""
+    if values.dtype.kind == 'f' and values.dtype.itemsize < 4:
+        return np.ascontiguousarray(values, dtype=np.float32)
+    if values.dtype.kind in 'biuf' and not values.flags.c_contiguous:
+        return np.ascontiguousarray(values)
+    return values.tolist()
+
+def _numpy_default(obj):
+    """
+    Tipos que orjson no conoce: se convierten a algo que sí serializa
+    (arrays contiguos siempre que se pueda, para no crear objetos Python).
+    """
+    if isinstance(obj, np.ndarray):
+        return _array(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, pd.Series):
+        return dict(zip(obj.index.tolist(), obj.tolist()))
+    if isinstance(obj, pd.DataFrame):
+        return {str(col): obj[col].to_numpy() for col in obj.columns}
+    if isinstance(obj, pd.Index):
+        return obj.to_numpy()
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    raise TypeError
+
+def to_builtin(obj):
+    """
+    Convierte recursivamente arrays, escalares NumPy y objetos pandas a tipos
+    de Python, con NaN/Inf -> None (mismo resultado que la ruta de orjson).
+    """
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {to_builtin(k) if isinstance(k, np.generic) else k: to_builtin(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_builtin(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind == 'f' and obj.dtype.itemsize < 8:
+            # float32/float16 con su representación más corta, como orjson
+            obj = np.array([float(str(v)) for v in obj.flat]).reshape(obj.shape)
+        if obj.dtype.kind == 'f':
+            return np.where(np.isfinite(obj), obj, None).tolist()
+        return to_builtin(obj.tolist())
+    if isinstance(obj, np.floating) and obj.dtype.itemsize < 8:
+        return to_builtin(float(str(obj)))
+    if isinstance(obj, np.generic):
+        return to_builtin(obj.item())
+    if isinstance(obj, pd.Series):
+        return to_builtin(dict(zip(obj.index.tolist(), obj.tolist())))
+    if isinstance(obj, pd.DataFrame):
+        return {str(col): to_builtin(obj[col].to_numpy()) for col in obj.columns}
+    if isinstance(obj, pd.Index):
+        return to_builtin(obj.tolist())
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    return obj
+
+def _builtin_keys(obj):
+    """
+    Copia de los dicts (y listas) de obj con las claves NumPy como tipos de
+    Python: orjson no acepta np.generic como clave ni con OPT_NON_STR_KEYS.
+    Los valores no se tocan (los arrays siguen yendo por la ruta rápida).
+    """
+    if isinstance(obj, dict):
+        return {_builtin_key(k) if isinstance(k, np.generic) else k: _builtin_keys(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_builtin_keys(v) for v in obj]
+    return obj
+
+def _builtin_key(key):
+    # to_builtin deja np.float64 tal cual (es un float para json, no para orjson)
+    key = to_builtin(key)
+    return key.item() if isinstance(key, np.generic) else key
+
+def json_values(values):
+    """
+    Cada elemento de un array 1-D codificado como JSON (lista de bytes), con
+    la misma representación que NumpyJSONRenderer: float32 con su forma más
+    corta y NaN/Inf como null. Con orjson, un array numérico se codifica de
+    una vez en C y se parte por las comas.
+    """
+    if orjson is None:
+        return [json.dumps(value, ensure_ascii=False, allow_nan=False).encode() for value in to_builtin(values)]
+    if values.dtype.kind in 'biuf':
+        if not len(values):
+            return []
+        if values.dtype.kind == 'f' and values.dtype.itemsize < 4:
+            values = values.astype(np.float32)
+        return orjson.dumps(np.ascontiguousarray(values), option=orjson.OPT_SERIALIZE_NUMPY)[1:-1].split(b',')
+    return [orjson.dumps(value, default=_numpy_default, option=orjson.OPT_SERIALIZE_NUMPY) for value in values]
+
+class NumpyJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer que serializa ndarrays, escalares NumPy y Series/DataFrame
+    directamente, así los métodos de analytics no tienen que pasar todo a
+    listas y floats de Python. NaN e Inf se emiten siempre como null.
+    
+    Con orjson los arrays numéricos se codifican en C sin crear objetos
+    Python por elemento (y float32 con su representación más corta); sin
+    orjson se convierten con to_builtin y se usa json estándar.
+    """
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        
+        if orjson is not None:
+            option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            try:
+                ret = orjson.dumps(data, default=self._default, option=option)
+            except orjson.JSONEncodeError:
+                # Claves NumPy (p.ej. {np.int64(1): ...}): mismas claves que to_builtin
+                ret = orjson.dumps(_builtin_keys(data), default=self._default, option=option)
+        else:
+            ret = json.dumps(
+                to_builtin(data),
+                cls=self.encoder_class,
+                indent=indent,
+                ensure_ascii=self.ensure_ascii,
+                allow_nan=False,
+                separators=(',', ':') if self.compact and not indent else None,
+            ).encode()
+        
+        # Igual que DRF: U+2028/U+2029 escapados para que el JSON sea JavaScript válido
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    
+    def _default(self, obj):
+        try:
+            return _numpy_default(obj)
+        except TypeError:
+            # Fechas, Decimal, UUID, cadenas diferidas... como el JSONRenderer de DRF
+            return self.encoder_class().default(obj)
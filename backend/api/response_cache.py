@@ -0,0 +1,295 @@
+import functools
+import gzip
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.http import HttpResponse, HttpResponseNotModified
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from . import jobs
+from .data_loader import DatasetLoader
+from .metrics import CACHE_REQUESTS, phase
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se sirve gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Cuerpos más pequeños no compensan la compresión
+MIN_COMPRESS_BYTES = 512
+
+class CachedResponse:
+    """Cuerpo JSON renderizado con sus variantes gzip/brotli y su ETag"""
+    __slots__ = ('etag', 'body', 'gzip_body', 'br_body')
+    
+    def __init__(self, body):
+        self.body = body
+        self.etag = 'W/"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.gzip_body = None
+        self.br_body = None
+        
+        if len(body) >= MIN_COMPRESS_BYTES:
+            self.gzip_body = gzip.compress(body, compresslevel=9)
+            if brotli is not None:
+                self.br_body = brotli.compress(body, quality=11)
+    
+    @property
+    def size(self):
+        return len(self.body) + len(self.gzip_body or b'') + len(self.br_body or b'')
+
+class ResponseCache:
+    """
+    Caché LRU de respuestas renderizadas, acotada por bytes totales.
+    Las claves incluyen la huella del dataset, así que una recarga de datos
+    deja las entradas antiguas sin uso hasta que el LRU las expulsa.
+    """
+    
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+    
+    def put(self, key, entry):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+    
+    def discard(self, endpoints):
+        """Elimina las entradas de los endpoints dados, de cualquier huella"""
+        with self._lock:
+            for key in [key for key in self._entries if key[1] in endpoints]:
+                self._bytes -= self._entries.pop(key).size
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    @property
+    def size(self):
+        """Bytes ocupados por todas las entradas"""
+        return self._bytes
+
+response_cache = ResponseCache(getattr(settings, 'RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+def invalidate(endpoints):
+    """
+    Descarta las respuestas guardadas de los endpoints dados, en memoria y
+    como resultados de jobs, cuando cambian sin que cambie el dataset (p.ej.
+    al terminar de entrenarse el detector).
+    """
+    response_cache.discard(endpoints)
+    jobs.discard(endpoints)
+
+class _Flight:
+    """Cálculo en curso de una clave: los que llegan después esperan su resultado"""
+    __slots__ = ('done', 'result')
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+def single_flight(key, compute):
+    """
+    Ejecuta compute() una sola vez por clave entre las peticiones
+    concurrentes del proceso: la primera lo calcula y las que llegan mientras
+    tanto esperan y reciben el mismo resultado (None si compute falló).
+    Retorna (resultado, True si esta llamada lo calculó).
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+    
+    if not leader:
+        flight.done.wait()
+        return flight.result, False
+    
+    try:
+        flight.result = compute()
+        return flight.result, True
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+def render_json(data):
+    """Renderiza con el primer renderer configurado en REST_FRAMEWORK"""
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    return renderer.render(data)
+
+def make_key(name, request, version=None):
+    """
+    Clave de caché: huella del dataset (y hash del de prueba) + endpoint +
+    query string canónica.
+    async no forma parte de la clave: el resultado es el mismo con o sin job.
+    """
+    version = version or DatasetLoader().current()
+    query = tuple(sorted((k, tuple(v)) for k, v in request.GET.lists() if k != 'async'))
+    return ((version.fingerprint, version.test_sha256), name, query)
+
+def _accepted_encodings(request):
+    """Codificaciones aceptadas en Accept-Encoding (ignora las de q=0)"""
+    accepted = set()
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        token, _, params = item.strip().partition(';')
+        params = params.replace(' ', '')
+        if token and params not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(token.lower())
+    return accepted
+
+def _etag_matches(request, etag):
+    """Comparación débil de If-None-Match contra el ETag de la entrada"""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    bare = etag[2:] if etag.startswith('W/') else etag
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+def _set_cache_headers(response, etag):
+    response['ETag'] = etag
+    response['Vary'] = 'Accept-Encoding'
+    # Los clientes deben revalidar siempre (barato gracias a If-None-Match)
+    response['Cache-Control'] = 'no-cache'
+
+def build_response(request, entry):
+    """HttpResponse (o 304) para una entrada, con la mejor codificación aceptada"""
+    if _etag_matches(request, entry.etag):
+        response = HttpResponseNotModified()
+        _set_cache_headers(response, entry.etag)
+        return response
+    
+    accepted = _accepted_encodings(request)
+    body, encoding = entry.body, None
+    if entry.br_body is not None and 'br' in accepted:
+        body, encoding = entry.br_body, 'br'
+    elif entry.gzip_body is not None and ('gzip' in accepted or '*' in accepted):
+        body, encoding = entry.gzip_body, 'gzip'
+    
+    response = HttpResponse(body, content_type='application/json')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    _set_cache_headers(response, entry.etag)
+    return response
+
+def cache_response(view):
+    """
+    Decorador para vistas GET de analytics (bajo @api_view).
+    
+    Si hay entrada para (huella, endpoint, query) se sirve sin recalcular;
+    si no, se busca un job terminado con la misma clave (api/jobs.py, de
+    cualquier worker; solo si los jobs están en uso, ver
+    jobs.may_have_result) y, si tampoco existe, se ejecuta la vista y, cuando
+    responde 200, se guarda el JSON renderizado con sus variantes
+    comprimidas. Responde 304 si el cliente envía un If-None-Match que coincide.
+    
+    Con ?async=true (o en endpoints costosos sobre datasets grandes, ver
+    jobs.wants_async) la vista se ejecuta como job y se responde 202 con su id.
+    
+    Los fallos de caché concurrentes con la misma clave se agrupan
+    (single_flight): tras un deploy, N clientes pidiendo el mismo endpoint
+    en frío esperan un único cálculo en lugar de repetirlo N veces.
+    
+    La versión del dataset se fija al entrar (DatasetLoader.pinned): la
+    clave y el cálculo usan los mismos datos aunque una recarga publique otra
+    versión mientras tanto, también cuando el cálculo corre como job.
+    
+    Fases medidas (api/metrics.py): cache_hit (consulta + respuesta desde
+    caché), o bien cache_miss (consulta + compresión + inserción), compute
+    (la vista) y serialize (render del JSON); coalesced es la espera al
+    cálculo de otra petición.
+    """
+    endpoint = view.__name__
+    
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        loader = DatasetLoader()
+        with phase('cache_miss', endpoint) as timer, loader.pinned() as version:
+            key = make_key(endpoint, request, version)
+            entry = response_cache.get(key)
+            
+            if entry is None and jobs.may_have_result(request, endpoint):
+                body = jobs.stored_result(key)
+                if body is not None:
+                    entry = CachedResponse(body)
+                    response_cache.put(key, entry)
+            
+            if entry is not None:
+                timer['name'] = 'cache_hit'
+                CACHE_REQUESTS.inc(endpoint=endpoint, result='hit')
+                return build_response(request, entry)
+            
+            def compute():
+                with phase('compute', endpoint), loader.pinned(version):
+                    response = view(request, *args, **kwargs)
+                if not isinstance(response, Response) or response.status_code != 200:
+                    return response
+                
+                with phase('serialize', endpoint):
+                    body = render_json(response.data)
+                entry = CachedResponse(body)
+                response_cache.put(key, entry)
+                return entry
+            
+            if jobs.wants_async(request, endpoint):
+                CACHE_REQUESTS.inc(endpoint=endpoint, result='miss')
+                try:
+                    return jobs.submit(request, key, endpoint, compute)
+                except DatabaseError as e:
+                    logger.warning(f"No se pudo crear el job de {endpoint}, se calcula en línea: {e}")
+                result = compute()
+            else:
+                result, leader = single_flight(key, compute)
+                CACHE_REQUESTS.inc(endpoint=endpoint, result='miss' if leader else 'coalesced')
+                if not leader:
+                    timer['name'] = 'coalesced'
+                    if isinstance(result, Response):
+                        # Cada petición renderiza su propia Response
+                        result = Response(result.data, status=result.status_code)
+                    elif not isinstance(result, CachedResponse):
+                        # Falló o es una respuesta en streaming: se calcula aparte
+                        result = compute()
+            
+            if isinstance(result, CachedResponse):
+                return build_response(request, result)
+            return result
+    
+    return wrapper
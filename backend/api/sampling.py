@@ -0,0 +1,197 @@
+import math
+import os
+import numpy as np
+
+# Filas máximas de la muestra guardada al cargar el dataset; las muestras
+# más pequeñas que pide el modo aproximado son prefijos de esta
+SAMPLE_ROWS = int(os.getenv('ANALYTICS_SAMPLE_ROWS', '100000'))
+
+# Columnas por las que se estratifica (cada combinación de valores es un estrato)
+STRATA_COLUMNS = ('class', 'protocol_type')
+
+# Intervalos de confianza al 95% (aproximación normal)
+CONFIDENCE = 0.95
+Z = 1.959963984540054
+
+# Filas mínimas por estrato (o todas si tiene menos): la varianza dentro del
+# estrato necesita al menos 2 y los estratos raros (u2r) no deben quedar vacíos
+MIN_STRATUM_ROWS = 10
+
+# Error objetivo por defecto de ?approx=true: semiamplitud del intervalo de
+# una media como fracción de la desviación estándar de la columna
+DEFAULT_ERROR = float(os.getenv('ANALYTICS_APPROX_ERROR', '0.02'))
+MIN_SAMPLE_ROWS = 1000
+
+# Segundos por valor procesado (fila x columna) antes de la primera medición
+INITIAL_SECONDS_PER_VALUE = 5e-8
+
+class StratifiedSample:
+    """
+    Muestra aleatoria estratificada de las filas de un dataset, sorteada una
+    vez al cargarlo.
+    
+    Cada estrato guarda sus filas elegidas en orden aleatorio: los primeros
+    n_h son una muestra aleatoria simple de n_h filas del estrato, así que
+    una muestra de cualquier tamaño (select) sale de la misma sin volver a
+    sortear y el coste de responder depende de su tamaño, no del dataset.
+    La asignación es proporcional al tamaño de cada estrato, con un mínimo
+    de MIN_STRATUM_ROWS filas.
+    """
+    
+    def __init__(self, strata, names, capacity=SAMPLE_ROWS, seed=0):
+        """strata: código de estrato de cada fila (0..len(names)-1); names: etiqueta de cada código"""
+        strata = np.asarray(strata, dtype=np.intp)
+        population = np.bincount(strata, minlength=len(names))
+        present = np.flatnonzero(population)
+        self.names = [names[i] for i in present]
+        self.population = population[present].astype(np.int64)
+        self.rows = int(self.population.sum())
+        self.capacity = self.allocate(capacity)
+        self._seconds_per_value = INITIAL_SECONDS_PER_VALUE
+        
+        rng = np.random.default_rng(seed)
+        order = np.argsort(strata, kind='stable')
+        starts = np.concatenate([[0], np.cumsum(self.population)[:-1]])
+        self._chosen = [
+            rng.choice(order[start:start + size], size=count, replace=False)
+            for start, size, count in zip(starts, self.population, self.capacity)
+        ]
+    
+    def allocate(self, n):
+        """Filas por estrato para una muestra de n filas"""
+        share = np.ceil(n * self.population / max(self.rows, 1))
+        floor = np.minimum(self.population, MIN_STRATUM_ROWS)
+        return np.minimum(self.population, np.maximum(share, floor)).astype(np.int64)
+    
+    def size_for(self, error=None, budget_ms=None, columns=1):
+        """
+        Filas de muestra para una semiamplitud objetivo (error, en
+        desviaciones estándar: n = (z / error)² con corrección por población
+        finita) o para un presupuesto de tiempo (budget_ms, con el coste por
+        valor medido en los cálculos anteriores).
+        """
+        if budget_ms is not None:
+            n = budget_ms / 1000 / (self._seconds_per_value * max(columns, 1))
+        else:
+            n0 = (Z / (error or DEFAULT_ERROR)) ** 2
+            n = n0 / (1 + n0 / max(self.rows, 1))
+        return int(min(max(math.ceil(n), MIN_SAMPLE_ROWS), self.capacity.sum()))
+    
+    def observe(self, seconds, values):
+        """Actualiza el coste por valor (media móvil) con un cálculo medido"""
+        if values > 0:
+            self._seconds_per_value = 0.7 * self._seconds_per_value + 0.3 * seconds / values
+    
+    def select(self, n):
+        """Selection con las primeras filas de cada estrato para una muestra de n filas"""
+        sizes = np.minimum(self.allocate(n), self.capacity)
+        positions = np.concatenate([chosen[:size] for chosen, size in zip(self._chosen, sizes)])
+        return Selection(self.population, sizes, positions)
+
+class Selection:
+    """
+    Una muestra concreta: posiciones de sus filas (agrupadas por estrato) y
+    estimadores estratificados con su varianza.
+    
+    Los subconjuntos (filtros, grupos de class, valores válidos) se tratan
+    como dominios: la media es un estimador de razón y su varianza sale por
+    linealización, sumando dentro de cada estrato la varianza de
+    z_i = d_i (y_i - media) con corrección por población finita.
+    """
+    
+    def __init__(self, population, sizes, positions):
+        self.population = population
+        self.sizes = sizes
+        self.positions = positions
+        self.strata = np.repeat(np.arange(len(sizes)), sizes)
+        self.weights = (population / sizes)[self.strata]
+        self._starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        # N_h² (1 - n_h / N_h) / n_h: varianza del total de cada estrato por unidad de s²
+        self._factor = population.astype(np.float64) ** 2 * (1 - sizes / population) / sizes
+    
+    @property
+    def rows(self):
+        return int(self.sizes.sum())
+    
+    def _variance(self, sum_z, sum_z2):
+        """Varianza del total estimado a partir de Σz y Σz² por estrato (S, m)"""
+        n = self.sizes[:, None].astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            s2 = np.where(n > 1, (sum_z2 - sum_z ** 2 / n) / np.maximum(n - 1, 1), 0.0)
+        return (self._factor[:, None] * np.maximum(s2, 0.0)).sum(axis=0)
+    
+    def means(self, Y, valid):
+        """
+        Media de cada columna de Y (n, k) en las filas valid, con la
+        semiamplitud de su intervalo, el tamaño estimado del dominio y la
+        desviación estándar estimada. Retorna (mean, half_width, total, std).
+        """
+        w = self.weights[:, None]
+        Yz = np.where(valid, Y, 0.0)
+        total = (w * valid).sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = (w * Yz).sum(axis=0) / total
+            z = np.where(valid, Yz - mean, 0.0)
+            variance = self._variance(
+                np.add.reduceat(z, self._starts, axis=0), np.add.reduceat(z * z, self._starts, axis=0)
+            ) / total ** 2
+            std = np.sqrt((w * z * z).sum(axis=0) / (total - 1))
+        return mean, Z * np.sqrt(variance), total, np.where(total > 1, std, np.nan)
+    
+    def proportions(self, codes, n_categories, domain=None):
+        """
+        Proporción de cada categoría (codes: 0..n_categories-1, -1 = nulo) en
+        las filas de domain. Retorna (proporción, semiamplitud, tamaño estimado del dominio).
+        """
+        selected = codes >= 0 if domain is None else domain & (codes >= 0)
+        S = len(self.sizes)
+        strata = self.strata[selected]
+        a = np.bincount(strata * n_categories + codes[selected], minlength=S * n_categories)
+        a = a.reshape(S, n_categories).astype(np.float64)
+        m = np.bincount(strata, minlength=S).astype(np.float64)[:, None]
+        
+        ratio = (self.population / self.sizes)[:, None]
+        total = float((ratio * m).sum())
+        with np.errstate(invalid='ignore', divide='ignore'):
+            p = (ratio * a).sum(axis=0) / total
+            variance = self._variance(a - p * m, a * (1 - p) ** 2 + (m - a) * p ** 2) / total ** 2
+        return p, Z * np.sqrt(variance), total
+    
+    def quantiles(self, Y, valid, quantiles):
+        """
+        Cuantiles ponderados de cada columna y su intervalo por el método de
+        Woodruff: la semiamplitud de la proporción acumulada F(x) en el
+        cuantil se traslada al eje de valores. Retorna {q: (estimación, inferior, superior)}.
+        """
+        k = Y.shape[1]
+        result = {q: tuple(np.full(k, np.nan) for _ in range(3)) for q in quantiles}
+        S = len(self.sizes)
+        ratio = self.population / self.sizes
+        # Un solo argsort de todas las columnas: los valores no válidos (NaN) quedan al final
+        orders = np.argsort(np.where(valid, Y, np.nan), axis=0)
+        counts = valid.sum(axis=0)
+        
+        for j in range(k):
+            if counts[j] == 0:
+                continue
+            order = orders[:counts[j], j]
+            values = Y[order, j]
+            strata = self.strata[order]
+            cumulative = np.cumsum(self.weights[order])
+            total = cumulative[-1]
+            m = np.bincount(strata, minlength=S).astype(np.float64)[:, None]
+            
+            def at(p):
+                i = np.searchsorted(cumulative, min(max(p, 0.0), 1.0) * total, side='left')
+                return values[min(i, len(values) - 1)]
+            
+            for q in quantiles:
+                estimate = at(q)
+                below = np.searchsorted(values, estimate, side='right')
+                a = np.bincount(strata[:below], minlength=S).astype(np.float64)[:, None]
+                p = float((ratio[:, None] * a).sum() / total)
+                se = math.sqrt(self._variance(a - p * m, a * (1 - p) ** 2 + (m - a) * p ** 2)[0]) / total
+                result[q][0][j] = estimate
+                result[q][1][j] = at(q - Z * se)
+                result[q][2][j] = at(q + Z * se)
+        return result
@@ -1,4 +1,10 @@
 from rest_framework import serializers
+from .aggregates import HISTOGRAM_BINNINGS, HISTOGRAM_RESOLUTIONS
+from .analytics import ANOMALY_GROUPINGS, CATEGORY_TOP, HISTOGRAM_BINS
+from .batch import DEFAULT_SECTIONS, SECTIONS
+from .detector import SCORE_MAX_RECORDS
+from .records import RECORDS_FORMATS, RECORDS_MAX_LIMIT
+from .sampling import DEFAULT_ERROR
 
 class FeatureFilterSerializer(serializers.Serializer):
     """Validador para filtros de características"""
@@ -14,9 +20,220 @@ class FeatureFilterSerializer(serializers.Serializer):
         help_text='Límite de registros a retornar'
     )
 
+class RecordsSerializer(FeatureFilterSerializer):
+    """Validador para la paginación y el formato de /api/records/"""
+    limit = serializers.IntegerField(
+        default=1000,
+        min_value=1,
+        max_value=RECORDS_MAX_LIMIT,
+        help_text='Registros por página (se envían en streaming, sin límite de memoria)'
+    )
+    cursor = serializers.CharField(
+        required=False,
+        help_text='Cursor de la página siguiente (cabecera X-Next-Cursor de la respuesta anterior)'
+    )
+    output = serializers.ChoiceField(
+        choices=list(RECORDS_FORMATS),
+        default='ndjson',
+        help_text='ndjson (un registro JSON por línea) o arrow (stream IPC de Apache Arrow)'
+    )
+
 class ClassFilterSerializer(serializers.Serializer):
     """Validador para filtros por clase"""
-    class_name = serializers.ChoiceField(
-        choices=['normal', 'anomaly'],
-        help_text='Clase a filtrar: normal o anomaly'
+    class_name = serializers.CharField(
+        max_length=100,
+        help_text='Clase a filtrar: normal, anomaly, una familia de ataque (dos, probe, r2l, u2r) '
+                  'o una etiqueta de la columna class (p.ej. neptune)'
+    )
+
+class StatisticsFilterSerializer(serializers.Serializer):
+    """Validador para percentiles extra en estadísticas descriptivas"""
+    percentiles = serializers.ListField(
+        child=serializers.FloatField(min_value=0.0, max_value=1.0),
+        required=False,
+        max_length=20,
+        help_text='Percentiles adicionales en [0, 1], p.ej. 0.9,0.99'
+    )
+
+class SegmentFilterSerializer(serializers.Serializer):
+    """Validador para filtros por protocolo, servicio y flag (valores separados por comas)"""
+    protocol_type = serializers.ListField(
+        child=serializers.CharField(),
+        required=False,
+        max_length=10,
+        help_text='Protocolos a incluir, p.ej. tcp,udp'
+    )
+    service = serializers.ListField(
+        child=serializers.CharField(),
+        required=False,
+        max_length=100,
+        help_text='Servicios a incluir, p.ej. http,ftp_data'
+    )
+    flag = serializers.ListField(
+        child=serializers.CharField(),
+        required=False,
+        max_length=20,
+        help_text='Flags de conexión a incluir, p.ej. SF,S0'
+    )
+
+class ApproxField(serializers.CharField):
+    """
+    ?approx=: true (error objetivo por defecto), un error objetivo en (0, 1)
+    como 0.01, o un presupuesto de tiempo como 200ms. false o 0 = resultado
+    exacto. Retorna los kwargs de DatasetAnalytics.approximate, o None.
+    """
+    
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data).strip().lower()
+        if value in serializers.BooleanField.TRUE_VALUES:
+            return {'error': DEFAULT_ERROR}
+        if value in serializers.BooleanField.FALSE_VALUES:
+            return None
+        try:
+            if value.endswith('ms'):
+                budget = float(value[:-2])
+                if 0 < budget <= 60000:
+                    return {'budget_ms': budget}
+            else:
+                error = float(value)
+                if 0 < error < 1:
+                    return {'error': error}
+        except ValueError:
+            pass
+        raise serializers.ValidationError(
+            'Usar true, un error objetivo mayor que 0 y menor que 1 (p.ej. 0.01), '
+            'un tiempo como 200ms, o false/0 para el resultado exacto'
+        )
+
+class ApproxSerializer(serializers.Serializer):
+    """Validador para el modo aproximado (muestra estratificada con intervalos de confianza)"""
+    approx = ApproxField(
+        required=False,
+        allow_null=True,
+        help_text='true, error objetivo en desviaciones estándar (0.01) o presupuesto de tiempo (200ms)'
+    )
+
+class TopCorrelationSerializer(serializers.Serializer):
+    """Validador para el número de pares en el top de correlaciones"""
+    k = serializers.IntegerField(
+        default=10,
+        min_value=1,
+        max_value=1000,
+        help_text='Número de pares con mayor correlación absoluta'
+    )
+
+class DistributionSerializer(serializers.Serializer):
+    """Validador para la resolución y el tipo de bins de los histogramas"""
+    bins = serializers.ChoiceField(
+        choices=list(HISTOGRAM_RESOLUTIONS),
+        default=HISTOGRAM_BINS,
+        help_text='Número de intervalos (divisor de 960: 10, 15, 20, 30, 60, 120...)'
+    )
+    binning = serializers.ChoiceField(
+        choices=list(HISTOGRAM_BINNINGS),
+        default='linear',
+        help_text='linear (igual ancho), log (igual ancho en escala log) o quantile (igual frecuencia)'
+    )
+
+class CategoricalSerializer(serializers.Serializer):
+    """Validador para el número de valores por columna categórica"""
+    top = serializers.IntegerField(
+        default=CATEGORY_TOP,
+        min_value=1,
+        max_value=1000,
+        help_text='Valores más frecuentes a listar; el resto se suma en other'
+    )
+
+class CrosstabSerializer(CategoricalSerializer):
+    """Validador para la tabla de contingencia de una columna contra class"""
+    column = serializers.CharField(
+        help_text='Columna categórica, p.ej. service'
+    )
+    grouping = serializers.ChoiceField(
+        choices=list(ANOMALY_GROUPINGS),
+        default='binary',
+        help_text='binary (normal/anomaly) o family (normal, DoS, Probe, R2L, U2R)'
+    )
+
+class AnomalyGroupingSerializer(serializers.Serializer):
+    """Validador para la agrupación de clases en el análisis de anomalías"""
+    grouping = serializers.ChoiceField(
+        choices=list(ANOMALY_GROUPINGS),
+        default='binary',
+        help_text='binary (normal/anomaly) o family (normal, DoS, Probe, R2L, U2R)'
+    )
+
+class ScoreSerializer(serializers.Serializer):
+    """Validador para los registros a puntuar con el detector"""
+    records = serializers.ListField(
+        min_length=1,
+        max_length=SCORE_MAX_RECORDS,
+        help_text='Registros de conexión: objetos {característica: valor}'
+    )
+    threshold = serializers.FloatField(
+        default=0.5,
+        min_value=0.0,
+        max_value=1.0,
+        help_text='Probabilidad a partir de la cual un registro se marca como anomalía'
+    )
+    
+    def validate_records(self, records):
+        if not all(isinstance(record, dict) for record in records):
+            raise serializers.ValidationError('Cada registro debe ser un objeto JSON')
+        return records
+
+class JobWaitSerializer(serializers.Serializer):
+    """Validador para el long-poll de /api/jobs/<id>/"""
+    wait = serializers.FloatField(
+        default=0,
+        min_value=0,
+        max_value=60,
+        help_text='Segundos a esperar a que el job termine antes de responder'
+    )
+
+class BatchSerializer(serializers.Serializer):
+    """Validador para las secciones de /api/batch/ y sus opciones"""
+    sections = serializers.ListField(
+        child=serializers.ChoiceField(choices=list(SECTIONS)),
+        default=list(DEFAULT_SECTIONS),
+        min_length=1,
+        max_length=len(SECTIONS),
+        help_text='Secciones a calcular, p.ej. overview,statistics,correlation-matrix'
+    )
+    stream = serializers.BooleanField(
+        default=False,
+        help_text='Enviar cada sección como una línea NDJSON en cuanto está lista'
+    )
+    percentiles = serializers.ListField(
+        child=serializers.FloatField(min_value=0.0, max_value=1.0),
+        required=False,
+        max_length=20,
+        help_text='Percentiles adicionales de la sección statistics'
+    )
+    k = serializers.IntegerField(
+        default=10,
+        min_value=1,
+        max_value=1000,
+        help_text='Número de pares de la sección top-correlations'
+    )
+    grouping = serializers.ChoiceField(
+        choices=list(ANOMALY_GROUPINGS),
+        default='binary',
+        help_text='Agrupación de clases de la sección anomaly-analysis'
+    )
+    bins = serializers.ChoiceField(
+        choices=list(HISTOGRAM_RESOLUTIONS),
+        default=HISTOGRAM_BINS,
+        help_text='Número de intervalos de la sección feature-distributions'
+    )
+    binning = serializers.ChoiceField(
+        choices=list(HISTOGRAM_BINNINGS),
+        default='linear',
+        help_text='Tipo de bins de la sección feature-distributions'
+    )
+    top = serializers.IntegerField(
+        default=CATEGORY_TOP,
+        min_value=1,
+        max_value=1000,
+        help_text='Valores por columna de la sección categorical-analysis'
     )
@@ -0,0 +1,99 @@
+import numpy as np
+import logging
+import os
+from multiprocessing import shared_memory
+
+logger = logging.getLogger(__name__)
+
+class SharedArray:
+    """
+    Array NumPy en un segmento de multiprocessing.shared_memory.
+    
+    El proceso que lo crea (owner) copia los datos una vez; otros procesos se
+    adjuntan por nombre con attach(spec) y obtienen una vista sin copia.
+    Solo el owner elimina (unlink) el segmento.
+    """
+    
+    def __init__(self, shm, shape, dtype, owner):
+        self._shm = shm
+        self.array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        self._owner_pid = os.getpid() if owner else None
+    
+    @classmethod
+    def create(cls, values):
+        values = np.ascontiguousarray(values)
+        shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        shared = cls(shm, values.shape, values.dtype, owner=True)
+        shared.array[...] = values
+        return shared
+    
+    @classmethod
+    def attach(cls, spec):
+        _, name, shape, dtype = spec
+        return cls(shared_memory.SharedMemory(name=name), shape, np.dtype(dtype), owner=False)
+    
+    @property
+    def spec(self):
+        """('shm', nombre, forma, dtype): lo necesario para adjuntarse desde otro proceso"""
+        return ('shm', self._shm.name, self.array.shape, self.array.dtype.str)
+    
+    def close(self):
+        self.array = None
+        try:
+            self._shm.close()
+            if self._owner_pid == os.getpid():
+                self._shm.unlink()
+        except (FileNotFoundError, BufferError) as e:
+            logger.debug(f"Error liberando memoria compartida: {e}")
+
+class MappedArray:
+    """
+    Array que ya vive en un archivo mapeado en memoria (p.ej. una columna de
+    la caché columnar, ver DatasetLoader): otros procesos mapean el mismo
+    archivo de solo lectura y comparten sus páginas, sin copiarlo a un
+    segmento de memoria compartida.
+    """
+    
+    def __init__(self, array, filename, offset):
+        self.array = array
+        self._filename = filename
+        self._offset = offset
+    
+    @classmethod
+    def wrap(cls, values):
+        """MappedArray si values es un archivo mapeado completo (np.memmap de np.load), o None"""
+        mapped = values
+        while mapped is not None and not isinstance(mapped, np.memmap):
+            mapped = mapped.base if isinstance(mapped, np.ndarray) else None
+        if (mapped is None or mapped.filename is None or not os.path.exists(mapped.filename)
+                or mapped.__array_interface__['data'][0] != values.__array_interface__['data'][0]
+                or mapped.nbytes != values.nbytes or mapped.dtype != values.dtype
+                or not mapped.flags.c_contiguous):
+            return None
+        return cls(values, mapped.filename, mapped.offset)
+    
+    @classmethod
+    def attach(cls, spec):
+        _, filename, offset, shape, dtype = spec
+        array = np.memmap(filename, dtype=np.dtype(dtype), mode='r', offset=offset, shape=shape)
+        return cls(array, filename, offset)
+    
+    @property
+    def spec(self):
+        """('mmap', archivo, offset, forma, dtype)"""
+        return ('mmap', self._filename, self._offset, self.array.shape, self.array.dtype.str)
+    
+    def close(self):
+        self.array = None
+
+def share(values):
+    """
+    Array accesible desde otros procesos sin serializarlo: el archivo mapeado
+    en el que ya está (MappedArray) o, si no, una copia en memoria compartida
+    (SharedArray).
+    """
+    return MappedArray.wrap(values) or SharedArray.create(values)
+
+def attach(spec):
+    """Se adjunta a un array de share() en otro proceso a partir de su spec"""
+    return MappedArray.attach(spec) if spec[0] == 'mmap' else SharedArray.attach(spec)
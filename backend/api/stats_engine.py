@@ -0,0 +1,306 @@
+import numpy as np
+
+# Cuantiles que siempre se calculan (q25, mediana, q75)
+BASE_QUANTILES = (0.25, 0.5, 0.75)
+
+# Filas por bloque al reducir una columna: acota su copia temporal en float64
+MOMENT_BLOCK_ROWS = 65536
+
+def quantile_label(q):
+    """Nombre de la clave para un percentil: 0.9 -> 'p90', 0.999 -> 'p99_9'"""
+    label = f'{q * 100:.4f}'.rstrip('0').rstrip('.')
+    return 'p' + label.replace('.', '_')
+
+def column_moments(X, valid=None):
+    """
+    Conteo, media y M2 (suma de cuadrados centrada) de cada columna de X (n, k).
+    
+    Todo el cálculo es sobre la matriz completa: una suma por eje para la media
+    y un producto einsum para M2, sin bucles por columna. Los NaN se excluyen;
+    valid (~np.isnan(X)) puede venir precalculada para no recorrer X otra vez.
+    """
+    n, k = X.shape
+    if valid is None:
+        valid = ~np.isnan(X)
+    
+    if valid.all():
+        count = np.full(k, n, dtype=np.int64)
+        mean = X.mean(axis=0) if n else np.full(k, np.nan)
+        dev = X - mean
+    else:
+        count = valid.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(valid, X, 0.0).sum(axis=0) / count
+        dev = np.where(valid, X - mean, 0.0)
+    
+    m2 = np.einsum('ij,ij->j', dev, dev)
+    return count, mean, m2
+
+def _float_blocks(values):
+    """Bloques de MOMENT_BLOCK_ROWS filas de una columna 1-D, en float64 y sin NaN"""
+    for start in range(0, len(values), MOMENT_BLOCK_ROWS):
+        block = values[start:start + MOMENT_BLOCK_ROWS].astype(np.float64, copy=False)
+        yield block[~np.isnan(block)] if values.dtype.kind == 'f' else block
+
+def series_moments(values):
+    """
+    Conteo, media y M2 de una columna 1-D en su dtype (NaN excluidos).
+    Dos pasadas por bloques (suma y luego desviaciones) con acumuladores
+    float64: la copia en float64 es de un bloque, no de la columna entera.
+    """
+    count, total = 0, 0.0
+    for block in _float_blocks(values):
+        count += len(block)
+        total += block.sum()
+    if count == 0:
+        return 0, np.nan, 0.0
+    
+    mean = total / count
+    m2 = 0.0
+    for block in _float_blocks(values):
+        dev = block - mean
+        m2 += dev @ dev
+    return count, mean, m2
+
+def std_from_m2(count, m2):
+    """Desviación estándar muestral (ddof=1), NaN con menos de 2 valores"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 1, np.sqrt(m2 / np.maximum(count - 1, 1)), np.nan)
+
+def grouped_moments(columns, groups, n_groups):
+    """
+    Conteo, media y M2 por grupo de k columnas 1-D: arrays (n_groups, k).
+    
+    groups: código de grupo de cada fila (0..n_groups-1; negativo = sin grupo).
+    Cada columna se reduce con np.bincount, una vez para las sumas y otra para
+    las desviaciones al cuadrado: el coste no depende del número de grupos y
+    no se copia ningún subconjunto de filas. Los NaN se excluyen.
+    """
+    columns = list(columns)
+    k = len(columns)
+    groups = np.asarray(groups, dtype=np.intp)
+    keep = groups >= 0
+    if keep.all():
+        keep = None
+    
+    count = np.zeros((n_groups, k), dtype=np.int64)
+    mean = np.full((n_groups, k), np.nan)
+    m2 = np.zeros((n_groups, k))
+    rows = np.bincount(groups if keep is None else groups[keep], minlength=n_groups)
+    
+    for j, values in enumerate(columns):
+        values = np.asarray(values, dtype=np.float64)
+        valid = keep
+        if np.isnan(values).any():
+            valid = ~np.isnan(values) if keep is None else keep & ~np.isnan(values)
+        g = groups if valid is None else groups[valid]
+        if valid is not None:
+            values = values[valid]
+        
+        c = rows if valid is keep else np.bincount(g, minlength=n_groups)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mu = np.bincount(g, weights=values, minlength=n_groups) / c
+        dev = values - np.nan_to_num(mu)[g]
+        count[:, j] = c
+        mean[:, j] = mu
+        m2[:, j] = np.bincount(g, weights=dev * dev, minlength=n_groups)
+    
+    return count, mean, m2
+
+def pool_moments(count, mean, m2):
+    """
+    Combina los momentos de varios grupos (eje 0) en los del conjunto, de
+    forma exacta (Chan et al.). Sirve para unir grupos (todas las familias de
+    ataque) o los parciales de varios bloques de filas.
+    """
+    total = count.sum(axis=0)
+    weighted = np.where(count > 0, mean, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pooled = (count * weighted).sum(axis=0) / total
+    spread = (count * (weighted - np.nan_to_num(pooled)) ** 2).sum(axis=0)
+    return total, pooled, m2.sum(axis=0) + spread
+
+def effect_sizes(count_a, mean_a, m2_a, count_b, mean_b, m2_b):
+    """
+    Diferencia de medias de b respecto a a y su tamaño del efecto:
+    - cohens_d: dividida por la desviación estándar combinada (pooled)
+    - smd: diferencia de medias estandarizada, dividida por sqrt((s_a² + s_b²) / 2)
+    NaN si alguna desviación no está definida o es 0.
+    """
+    difference = mean_b - mean_a
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pooled_sd = np.sqrt((m2_a + m2_b) / (count_a + count_b - 2))
+        var_a = np.where(count_a > 1, m2_a / (count_a - 1), np.nan)
+        var_b = np.where(count_b > 1, m2_b / (count_b - 1), np.nan)
+        average_sd = np.sqrt((var_a + var_b) / 2)
+        cohens_d = np.where(pooled_sd > 0, difference / pooled_sd, np.nan)
+        smd = np.where(average_sd > 0, difference / average_sd, np.nan)
+    return difference, cohens_d, smd
+
+def _partition_quantiles(X, count, quantiles):
+    """
+    Mínimo, máximo y cuantiles de columnas con el mismo número de valores
+    válidos, con una sola llamada a np.partition sobre todas ellas.
+    
+    np.partition deja los NaN al final, así que las posiciones 0..count-1
+    corresponden a los valores válidos. Interpolación lineal (igual que pandas).
+    X puede estar en su dtype compacto: solo los estadísticos de orden
+    elegidos pasan a float64.
+    """
+    k = X.shape[1]
+    if count == 0:
+        nan = np.full(k, np.nan)
+        return nan, nan, {q: nan for q in quantiles}
+    
+    positions = {q: (count - 1) * q for q in quantiles}
+    kth = {0, count - 1}
+    for pos in positions.values():
+        kth.update((int(np.floor(pos)), int(np.ceil(pos))))
+    
+    part = np.partition(X, sorted(kth), axis=0)
+    order = {i: part[i].astype(np.float64) for i in kth}
+    
+    result = {}
+    for q, pos in positions.items():
+        lo, hi = int(np.floor(pos)), int(np.ceil(pos))
+        frac = pos - lo
+        result[q] = order[lo] + (order[hi] - order[lo]) * frac
+    
+    return order[0], order[count - 1], result
+
+def column_quantiles(values, quantiles):
+    """
+    Mínimo, máximo y cuantiles {q: valor} de una columna 1-D en su dtype (NaN
+    excluidos): una sola copia de la columna para np.partition, sin pasarla
+    entera a float64.
+    """
+    count = len(values) - (int(np.isnan(values).sum()) if values.dtype.kind == 'f' else 0)
+    lo, hi, result = _partition_quantiles(values[:, None], count, quantiles)
+    return float(lo[0]), float(hi[0]), {q: float(v[0]) for q, v in result.items()}
+
+def quantile_histogram(columns, bins):
+    """
+    Histograma de igual frecuencia de cada columna, con un solo ordenamiento
+    por columna: los bordes son los cuantiles 0, 1/bins, ..., 1 (interpolación
+    lineal, NaN excluidos) y el conteo de [a, b) es la diferencia entre las
+    posiciones de a y b en la columna ordenada (el último bin incluye el
+    máximo). Evita buscar el bin de cada valor entre cientos de bordes.
+    
+    Retorna (bordes (k, bins + 1), conteos (k, bins)).
+    """
+    steps = np.linspace(0.0, 1.0, bins + 1)
+    edges = np.full((len(columns), bins + 1), np.nan)
+    counts = np.zeros((len(columns), bins), dtype=np.int64)
+    for j, values in enumerate(columns):
+        ordered = np.sort(values)
+        if ordered.dtype.kind == 'f':
+            ordered = ordered[:len(ordered) - int(np.isnan(ordered).sum())]
+        count = len(ordered)
+        if count == 0:
+            continue
+        positions = (count - 1) * steps
+        lo = np.floor(positions).astype(np.intp)
+        hi = np.ceil(positions).astype(np.intp)
+        low = ordered[lo].astype(np.float64)
+        edges[j] = low + (ordered[hi] - low) * (positions - lo)
+        
+        ranks = np.searchsorted(ordered.astype(np.float64, copy=False), edges[j], side='left')
+        ranks[-1] = count
+        counts[j] = np.diff(ranks)
+    return edges, counts
+
+def describe(columns, percentiles=None):
+    """
+    Estadísticas descriptivas de k columnas 1-D, cada una en su dtype.
+    
+    Retorna un dict de arrays de longitud k: count, mean, std, min, max y
+    'quantiles' {q: array} para q25/mediana/q75 y los percentiles extra.
+    Se reduce una columna cada vez (series_moments y column_quantiles): la
+    memoria extra es la de una columna en su dtype y un bloque en float64,
+    no una matriz (n, k) en float64.
+    """
+    quantiles = sorted(set(BASE_QUANTILES) | set(percentiles or ()))
+    columns = list(columns)
+    k = len(columns)
+    
+    count = np.zeros(k, dtype=np.int64)
+    mean = np.full(k, np.nan)
+    m2 = np.zeros(k)
+    col_min = np.full(k, np.nan)
+    col_max = np.full(k, np.nan)
+    col_q = {q: np.full(k, np.nan) for q in quantiles}
+    
+    for j, values in enumerate(columns):
+        values = np.asarray(values)
+        count[j], mean[j], m2[j] = series_moments(values)
+        col_min[j], col_max[j], qs = column_quantiles(values, quantiles)
+        for q in quantiles:
+            col_q[q][j] = qs[q]
+    
+    return {
+        'count': count,
+        'mean': mean,
+        'std': std_from_m2(count, m2),
+        'min': col_min,
+        'max': col_max,
+        'quantiles': col_q,
+    }
+
+def correlation(columns, n):
+    """
+    Matriz de correlación de Pearson (k, k) de k columnas 1-D de longitud n.
+    
+    Cada columna se estandariza en float64 (media 0, desviación 1) y se guarda
+    en una matriz float32 (n, k); la correlación es entonces un único producto
+    Z.T @ Z. Con NaN se usan pares completos (igual que pandas): los conteos,
+    sumas y sumas de cuadrados de cada par salen de productos con la máscara
+    de valores válidos. Columnas constantes dan NaN.
+    """
+    columns = list(columns)
+    k = len(columns)
+    Z = np.empty((n, k), dtype=np.float32)
+    has_nan = False
+    
+    for j, values in enumerate(columns):
+        values = np.asarray(values, dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.nanmean(values) if n else np.nan
+            std = np.nanstd(values) if n else np.nan
+            Z[:, j] = (values - mean) / std if std > 0 else np.where(np.isnan(values), np.nan, 0.0)
+        has_nan = has_nan or bool(np.isnan(Z[:, j]).any())
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if not has_nan:
+            C = (Z.T @ Z).astype(np.float64)
+            d = np.sqrt(np.diag(C))
+            corr = C / np.outer(d, d)
+        else:
+            M = (~np.isnan(Z)).astype(np.float32)
+            np.nan_to_num(Z, copy=False)
+            count = (M.T @ M).astype(np.float64)
+            sx = (Z.T @ M).astype(np.float64)
+            sxx = ((Z * Z).T @ M).astype(np.float64)
+            sxy = (Z.T @ Z).astype(np.float64)
+            cov = sxy - sx * sx.T / count
+            var = sxx - sx * sx / count
+            corr = cov / np.sqrt(var * var.T)
+    
+    corr = np.clip(corr, -1.0, 1.0)
+    np.fill_diagonal(corr, np.where(np.isnan(np.diag(corr)), np.nan, 1.0))
+    return corr
+
+def top_pairs(corr, k):
+    """
+    Índices (i, j), i < j, de los k pares con mayor |correlación|, de mayor a
+    menor. Selección parcial con np.argpartition: solo se ordenan los k elegidos.
+    """
+    rows, cols = np.triu_indices(corr.shape[0], 1)
+    strength = np.abs(corr[rows, cols])
+    valid = np.flatnonzero(~np.isnan(strength))
+    k = min(k, len(valid))
+    if k == 0:
+        return rows[:0], cols[:0]
+    
+    chosen = valid[np.argpartition(-strength[valid], k - 1)[:k]]
+    chosen = chosen[np.argsort(-strength[chosen], kind='stable')]
+    return rows[chosen], cols[chosen]
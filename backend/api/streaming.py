@@ -0,0 +1,215 @@
+import copy
+import numpy as np
+import logging
+import threading
+from .aggregates import (
+    DatasetAggregates, FixedBinHistogram, HISTOGRAM_BINNINGS, HISTOGRAM_RESOLUTIONS, PYRAMID_BINS,
+)
+from .analytics import (
+    CATEGORY_TOP, HISTOGRAM_BINS,
+    overview_payload, class_distribution_payload, statistics_payload,
+    correlation_payload, top_correlations_payload, distributions_payload, categorical_payload, crosstab_payload,
+    anomaly_payload, model_metrics_payload, class_groups,
+)
+from .stats_engine import pool_moments
+
+logger = logging.getLogger(__name__)
+
+class StreamingAnalytics:
+    """
+    Misma interfaz que DatasetAnalytics, pero sin cargar el dataset en memoria.
+    
+    El archivo se recorre por bloques de tamaño fijo alimentando acumuladores
+    combinables (api/aggregates.py): momentos de Welford, co-momentos para la
+    correlación, sketches KLL para cuantiles, conteos categóricos y momentos
+    por clase. La memoria depende del número de columnas, no de filas.
+    
+    Diferencias con el modo en memoria:
+    - Mediana y cuartiles son aproximados (sketch KLL, error de rango ~0.5%).
+    - Los histogramas necesitan una segunda pasada (bins entre min y max).
+      Los bordes por cuantiles salen de los sketches KLL (aproximados); los
+      conteos dentro de esos bordes son exactos.
+    """
+    
+    def __init__(self, loader, chunksize=None):
+        self.loader = loader
+        self.chunksize = chunksize
+        
+        # Esquema a partir del primer bloque
+        head = next(iter(self._chunks(1000)))
+        self.columns = head.columns.tolist()
+        self.numeric_cols = head.select_dtypes(include=[np.number]).columns.tolist()
+        self.categorical_cols = head.select_dtypes(include=['object', 'category']).columns.tolist()
+        
+        self._aggregates = None
+        self._histograms = None
+        self._pyramids = None
+        self._lock = threading.Lock()
+    
+    def appended(self, chunks):
+        """
+        Motor para el archivo con filas nuevas al final (recarga por anexado,
+        ver DatasetLoader.refresh): solo se leen esas filas (chunks, desde el
+        final anterior). Sus acumuladores se combinan con una copia de los
+        actuales (merge) y, si el min y max de todas las columnas no cambian,
+        sus conteos se suman a copias de los histogramas; si cambian, los
+        histogramas se recalculan con una pasada completa al pedirse.
+        """
+        engine = copy.copy(self)
+        engine._lock = threading.Lock()
+        if self._aggregates is None:
+            # Nada calculado todavía: el nuevo motor hará su primera pasada
+            return engine
+        
+        tail = DatasetAggregates(self.numeric_cols, self.categorical_cols)
+        histograms = copy.deepcopy(self._histograms)
+        for chunk in chunks:
+            tail.update(chunk)
+            if histograms is not None:
+                X = chunk[self.numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+                for histogram in histograms.values():
+                    histogram.update(X)
+        
+        aggregates = copy.deepcopy(self._aggregates)
+        aggregates.merge(tail)
+        engine._aggregates = aggregates
+        logger.info(f"Streaming: {tail.rows} registros añadidos ({aggregates.rows} en total)")
+        
+        same = lambda a, b: np.array_equal(a, b, equal_nan=True)
+        old = self._aggregates.moments
+        if histograms is None or not (same(aggregates.moments.min, old.min) and same(aggregates.moments.max, old.max)):
+            engine._histograms = engine._pyramids = None
+        else:
+            engine._histograms = histograms
+            engine._pyramids = {
+                binning: histogram.pyramid(HISTOGRAM_RESOLUTIONS)
+                for binning, histogram in histograms.items()
+            }
+        return engine
+    
+    def _chunks(self, chunksize=None):
+        chunksize = chunksize or self.chunksize
+        if chunksize:
+            return self.loader.iter_chunks(chunksize)
+        return self.loader.iter_chunks()
+    
+    def _scan(self):
+        """Primera pasada: todos los acumuladores en una sola lectura del archivo"""
+        if self._aggregates is None:
+            with self._lock:
+                if self._aggregates is None:
+                    aggregates = DatasetAggregates(self.numeric_cols, self.categorical_cols)
+                    for chunk in self._chunks():
+                        aggregates.update(chunk)
+                    logger.info(f"Streaming: {aggregates.rows} registros agregados")
+                    self._aggregates = aggregates
+        return self._aggregates
+    
+    def _histogram_pass(self):
+        """
+        Segunda pasada: histogramas de todas las columnas numéricas con los
+        tres binnings a la vez, a PYRAMID_BINS bins (ver FixedBinHistogram.pyramid).
+        Lineal y log entre el min y max globales; quantile con los cuantiles
+        de los sketches, ajustados al min y max exactos. Se conservan los
+        histogramas (no solo sus pirámides) para sumarles filas nuevas (appended).
+        """
+        if self._pyramids is None:
+            aggregates = self._scan()
+            moments = aggregates.moments
+            with self._lock:
+                if self._pyramids is None:
+                    steps = np.linspace(0.0, 1.0, PYRAMID_BINS + 1)
+                    edges = np.array([sketch.quantiles(steps) for sketch in aggregates.sketches])
+                    edges = edges.reshape(len(self.numeric_cols), PYRAMID_BINS + 1)
+                    edges[:, 0], edges[:, -1] = moments.min, moments.max
+                    edges = np.maximum.accumulate(edges, axis=1)
+                    histograms = {
+                        'linear': FixedBinHistogram(moments.min, moments.max, PYRAMID_BINS),
+                        'log': FixedBinHistogram(moments.min, moments.max, PYRAMID_BINS, 'log'),
+                        'quantile': FixedBinHistogram(None, None, PYRAMID_BINS, 'quantile', edges),
+                    }
+                    for chunk in self._chunks():
+                        X = chunk[self.numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+                        for histogram in histograms.values():
+                            histogram.update(X)
+                    self._histograms = histograms
+                    self._pyramids = {
+                        binning: histogram.pyramid(HISTOGRAM_RESOLUTIONS)
+                        for binning, histogram in histograms.items()
+                    }
+        return self._pyramids
+    
+    def get_overview(self):
+        return overview_payload(
+            self._scan().rows,
+            self.columns,
+            len(self.numeric_cols),
+            len(self.categorical_cols),
+        )
+    
+    def get_class_distribution(self):
+        if 'class' not in self.categorical_cols:
+            return {'error': 'Columna class no encontrada'}
+        aggregates = self._scan()
+        return class_distribution_payload(
+            aggregates.categories.most_common('class'), aggregates.rows
+        )
+    
+    def get_statistics(self, percentiles=None):
+        extra = sorted(set(percentiles or ()))
+        summary = self._scan().summary(extra)
+        return statistics_payload(self.numeric_cols, summary, extra)
+    
+    def get_correlation_matrix(self):
+        corr = self._scan().comoments.correlation()
+        return correlation_payload(self.numeric_cols, corr)
+    
+    def get_top_correlations(self, k=10):
+        corr = self._scan().comoments.correlation()
+        return top_correlations_payload(self.numeric_cols, corr, k)
+    
+    def get_feature_distributions(self, bins=HISTOGRAM_BINS, binning='linear'):
+        if binning not in HISTOGRAM_BINNINGS or bins not in HISTOGRAM_RESOLUTIONS:
+            raise ValueError(f'Histograma no disponible en modo streaming: {bins} bins, binning {binning}')
+        counts, edges = self._histogram_pass()[binning][bins]
+        return distributions_payload(self.numeric_cols, counts, edges, binning)
+    
+    def get_categorical_analysis(self, top=CATEGORY_TOP):
+        categories = self._scan().categories
+        return {
+            col: categorical_payload(col, *categories.arrays(col), top)
+            for col in self.categorical_cols
+        }
+    
+    def get_categorical_crosstab(self, column, top=CATEGORY_TOP, grouping='binary'):
+        if 'class' not in self.categorical_cols:
+            return {'error': 'Columna class no encontrada'}
+        
+        values, labels, table = self._scan().categories.crosstab(column)
+        groups, group_of = class_groups(labels, grouping)
+        by_group = np.zeros((len(values), len(groups)), dtype=np.int64)
+        for j, g in enumerate(group_of):
+            by_group[:, g] += table[:, j]
+        return crosstab_payload(column, values, groups, by_group, top, grouping)
+    
+    def get_anomaly_statistics(self, grouping='binary'):
+        if 'class' not in self.categorical_cols:
+            return {'error': 'Columna class no encontrada'}
+        
+        aggregates = self._scan()
+        class_counts = aggregates.categories.counts['class']
+        labels = list(aggregates.class_moments.groups)
+        groups, table = class_groups(labels, grouping)
+        
+        # Se combinan los momentos de las etiquetas de cada grupo
+        count, mean, m2 = aggregates.class_moments.arrays(labels)
+        pooled = [pool_moments(count[table == g], mean[table == g], m2[table == g]) for g in range(len(groups))]
+        count, mean, m2 = (np.array(parts) for parts in zip(*pooled))
+        rows = np.zeros(len(groups), dtype=np.int64)
+        for label, g in zip(labels, table):
+            rows[g] += class_counts[label]
+        
+        return anomaly_payload(self.numeric_cols, groups, rows, count, mean, m2, grouping)
+    
+    def get_model_metrics(self):
+        return model_metrics_payload()
@@ -0,0 +1,281 @@
+import numpy as np
+import pandas as pd
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from scipy.special import log_ndtr, ndtr
+from .columnar import ColumnarCache, StoreWriter
+
+logger = logging.getLogger(__name__)
+
+# Registros del dataset de demostración (cuando no hay archivo real)
+DEMO_SAMPLES = 5000
+
+# Filas por bloque: la generación y escritura nunca tienen más de unos pocos
+# bloques en memoria, sea cual sea n_samples
+CHUNK_ROWS = 250000
+
+# En el dataset real: 67% Normal, 33% Ataques
+DEFAULT_CLASS_MIX = {'normal': 0.67, 'anomaly': 0.33}
+
+# Correlación entre las variables latentes de un mismo grupo (0 = independientes)
+DEFAULT_CORRELATION = 0.5
+
+# Desplazamiento (en desviaciones estándar) de cada factor latente en las
+# conexiones de ataque: más errores SYN/REJ, más conexiones al mismo host,
+# menos bytes y menos tráfico al mismo servicio
+ATTACK_SHIFT = {
+    'volume': -0.3,
+    'traffic': 0.8,
+    'serror': 1.0,
+    'rerror': 0.5,
+    'service': -0.6,
+    'host': 0.4,
+}
+
+# Categorías con su probabilidad para conexiones normales y de ataque
+PROTOCOLS = {'tcp': (0.7, 0.75), 'udp': (0.2, 0.05), 'icmp': (0.1, 0.2)}
+SERVICES = {
+    'http': (0.4, 0.3), 'ssh': (0.3, 0.1), 'ftp': (0.15, 0.2),
+    'dns': (0.1, 0.1), 'smtp': (0.05, 0.3),
+}
+
+# Flags ordenados de menos a más "error": se eligen con el factor serror,
+# así que S0/REJ aparecen sobre todo en ataques y con tasas de error altas
+FLAGS = {'SF': 0.6, 'S1': 0.2, 'SH': 0.05, 'REJ': 0.05, 'S0': 0.1}
+
+# (nombre, distribución, parámetros, grupo latente, signo de la carga)
+# - exponential: float64 con la escala dada
+# - integer: entero uniforme en [lo, hi] con el dtype dado
+# - binary: 0/1 con probabilidad p de 1
+# - rate: tasa en [0, 1] con 2 decimales (float32, como tras la carga)
+FEATURES = [
+    ('duration', 'exponential', (50,), 'volume', 1),
+    ('src_bytes', 'exponential', (1000,), 'volume', 1),
+    ('dst_bytes', 'exponential', (1000,), 'volume', 1),
+    ('flag', 'flag', (), 'serror', 1),
+    ('land', 'binary', (0.05,), None, 1),
+    ('wrong_fragment', 'binary', (0.02,), None, 1),
+    ('urgent', 'binary', (0.01,), None, 1),
+    ('hot', 'integer', (0, 19, np.int8), 'host', 1),
+    ('num_compromised', 'integer', (0, 4, np.int8), 'host', 1),
+    ('root_shell', 'binary', (0.05,), 'host', 1),
+    ('su_attempted', 'binary', (0.05,), 'host', 1),
+    ('num_root', 'integer', (0, 9, np.int8), 'host', 1),
+    ('num_file_creations', 'integer', (0, 49, np.int8), 'host', 1),
+    ('num_shells', 'integer', (0, 4, np.int8), 'host', 1),
+    ('num_access_files', 'integer', (0, 19, np.int8), 'host', 1),
+    ('num_outbound_cmds', 'integer', (0, 9, np.int8), None, 1),
+    ('is_host_login', 'binary', (0.05,), None, 1),
+    ('is_guest_login', 'binary', (0.01,), None, 1),
+    ('count', 'integer', (1, 99, np.int8), 'traffic', 1),
+    ('srv_count', 'integer', (1, 99, np.int8), 'traffic', 1),
+    ('serror_rate', 'rate', (), 'serror', 1),
+    ('srv_serror_rate', 'rate', (), 'serror', 1),
+    ('rerror_rate', 'rate', (), 'rerror', 1),
+    ('srv_rerror_rate', 'rate', (), 'rerror', 1),
+    ('same_srv_rate', 'rate', (), 'service', 1),
+    ('diff_srv_rate', 'rate', (), 'service', -1),
+    ('srv_diff_host_rate', 'rate', (), None, 1),
+    ('dst_host_count', 'integer', (1, 254, np.int16), 'traffic', 1),
+    ('dst_host_srv_count', 'integer', (1, 254, np.int16), 'traffic', 1),
+    ('dst_host_same_srv_rate', 'rate', (), 'service', 1),
+    ('dst_host_diff_srv_rate', 'rate', (), 'service', -1),
+    ('dst_host_same_src_port_rate', 'rate', (), None, 1),
+    ('dst_host_srv_diff_host_rate', 'rate', (), None, 1),
+    ('dst_host_serror_rate', 'rate', (), 'serror', 1),
+    ('dst_host_srv_serror_rate', 'rate', (), 'serror', 1),
+    ('dst_host_rerror_rate', 'rate', (), 'rerror', 1),
+    ('dst_host_srv_rerror_rate', 'rate', (), 'rerror', 1),
+]
+
+def _class_mix(class_mix):
+    """Etiquetas (orden alfabético) y probabilidades normalizadas"""
+    class_mix = class_mix or DEFAULT_CLASS_MIX
+    labels = sorted(class_mix)
+    weights = np.array([class_mix[label] for label in labels], dtype=np.float64)
+    if (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError(f"Mezcla de clases inválida: {class_mix}")
+    return labels, weights / weights.sum()
+
+def _choose_by_class(rng, options, attack):
+    """Categoría por fila con las probabilidades de su clase (normal/ataque)"""
+    names = sorted(options)
+    normal = np.cumsum([options[name][0] for name in names])
+    anomaly = np.cumsum([options[name][1] for name in names])
+    cumulative = np.where(attack[:, None], anomaly / anomaly[-1], normal / normal[-1])
+    u = rng.random(len(attack))
+    codes = np.minimum((u[:, None] >= cumulative).sum(axis=1), len(names) - 1)
+    return pd.Categorical.from_codes(codes, names)
+
+def _from_uniform(kind, params, z):
+    """Transforma la variable latente normal z a la distribución marginal"""
+    if kind == 'exponential':
+        # -scale * log(1 - Phi(z)), estable para z grandes
+        return -params[0] * log_ndtr(-z)
+    
+    u = ndtr(z)
+    if kind == 'integer':
+        lo, hi, dtype = params
+        return np.minimum(np.floor(u * (hi - lo + 1)) + lo, hi).astype(dtype)
+    if kind == 'binary':
+        return (u > 1 - params[0]).astype(np.int8)
+    if kind == 'rate':
+        return np.round(u, 2).astype(np.float32)
+    if kind == 'flag':
+        names = list(FLAGS)
+        cumulative = np.cumsum(list(FLAGS.values()))
+        positions = np.minimum(np.searchsorted(cumulative, u, side='right'), len(names) - 1)
+        # Códigos en orden alfabético de categorías
+        order = np.argsort(names)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(names))
+        return pd.Categorical.from_codes(rank[positions], sorted(names))
+    raise ValueError(f"Distribución desconocida: {kind}")
+
+def generate_chunk(n_samples, rng, class_mix=None, correlation=DEFAULT_CORRELATION):
+    """
+    Genera n_samples conexiones sintéticas con el esquema de NSL-KDD.
+    
+    La clase se elige primero y condiciona el resto: cada grupo de
+    características (volumen, tráfico, errores SYN, errores REJ, servicio,
+    host) comparte un factor latente normal, desplazado en los ataques
+    (ATTACK_SHIFT). Cada característica es carga * factor + ruido, con
+    correlación latente 'correlation' dentro del grupo, y se transforma a su
+    distribución marginal (cópula gaussiana). Para la clase normal las
+    marginales son las del dataset de demostración original.
+    
+    Los tipos son los que produce la carga normalizada (category, int8/int16,
+    float32 para tasas), así que el resultado se escribe tal cual en la caché.
+    """
+    if not 0 <= correlation <= 1:
+        raise ValueError("correlation debe estar en [0, 1]")
+    
+    labels, probabilities = _class_mix(class_mix)
+    classes = rng.choice(len(labels), size=n_samples, p=probabilities)
+    attack = np.array([label != 'normal' for label in labels], dtype=bool)[classes]
+    
+    factors = {
+        group: rng.standard_normal(n_samples) + shift * attack
+        for group, shift in ATTACK_SHIFT.items()
+    }
+    loading = np.sqrt(correlation)
+    residual = np.sqrt(1 - correlation)
+    
+    columns = {
+        'protocol_type': _choose_by_class(rng, PROTOCOLS, attack),
+        'service': _choose_by_class(rng, SERVICES, attack),
+    }
+    for name, kind, params, group, sign in FEATURES:
+        z = rng.standard_normal(n_samples)
+        if group is not None:
+            z = sign * loading * factors[group] + residual * z
+        columns[name] = _from_uniform(kind, params, z)
+    columns['class'] = pd.Categorical.from_codes(classes, labels)
+    
+    return pd.DataFrame(columns)
+
+def _generate_task(task):
+    n_samples, seed_sequence, class_mix, correlation = task
+    return generate_chunk(n_samples, np.random.default_rng(seed_sequence), class_mix, correlation)
+
+def iter_synthetic(n_samples, seed=42, class_mix=None, correlation=DEFAULT_CORRELATION,
+                   chunk_rows=CHUNK_ROWS, workers=1):
+    """
+    Itera el dataset sintético en bloques de chunk_rows filas, en orden.
+    
+    Cada bloque tiene su propio generador, derivado de seed con
+    SeedSequence.spawn: el resultado es idéntico con cualquier número de
+    workers. Con workers > 1 los bloques se generan en procesos (spawn) con
+    como mucho 2 * workers bloques pendientes, para acotar la memoria.
+    """
+    sizes = [min(chunk_rows, n_samples - start) for start in range(0, n_samples, chunk_rows)]
+    streams = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(size, stream, class_mix, correlation) for size, stream in zip(sizes, streams)]
+    
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield _generate_task(task)
+        return
+    
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('spawn')
+    ) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_generate_task, task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def generate(n_samples=DEMO_SAMPLES, seed=42, **options):
+    """Dataset sintético completo en memoria (para tamaños pequeños)"""
+    return pd.concat(list(iter_synthetic(n_samples, seed, **options)), ignore_index=True)
+
+def _arff_header(chunk, relation):
+    lines = [f'@relation {relation}', '']
+    for col in chunk.columns:
+        dtype = chunk[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            values = ','.join(str(c) for c in dtype.categories)
+            lines.append(f"@attribute '{col}' {{{values}}}")
+        else:
+            lines.append(f"@attribute '{col}' real")
+    lines += ['', '@data', '']
+    return '\n'.join(lines)
+
+def write_dataset(n_samples, arff_path=None, csv_path=None, cache_dir=None,
+                  seed=42, relation='synthetic_nsl_kdd', **options):
+    """
+    Genera el dataset por bloques y lo escribe directamente en los formatos
+    del loader: ARFF y/o CSV y, con cache_dir, la caché columnar de la
+    fuente principal (el ARFF si se pide, si no el CSV). Así la primera carga
+    de un dataset de millones de filas no necesita parsear el texto.
+    
+    Los archivos se escriben con sufijo .tmp y se renombran al terminar.
+    options: class_mix, correlation, chunk_rows, workers (ver iter_synthetic).
+    """
+    targets = [(fmt, path) for fmt, path in (('arff', arff_path), ('csv', csv_path)) if path]
+    if not targets:
+        raise ValueError("Indica al menos un archivo de salida (ARFF o CSV)")
+    
+    handles = {fmt: open(path + '.tmp', 'w') for fmt, path in targets}
+    store = None
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        store = StoreWriter(tempfile.mkdtemp(prefix='.tmp-', dir=cache_dir), n_samples)
+    
+    try:
+        for i, chunk in enumerate(iter_synthetic(n_samples, seed, **options)):
+            if 'arff' in handles:
+                if i == 0:
+                    handles['arff'].write(_arff_header(chunk, relation))
+                chunk.to_csv(handles['arff'], header=False, index=False)
+            if 'csv' in handles:
+                chunk.to_csv(handles['csv'], header=(i == 0), index=False)
+            if store is not None:
+                store.write(chunk)
+            logger.debug(f"Bloque {i}: {len(chunk)} filas")
+        
+        for fmt, path in targets:
+            handles[fmt].close()
+            os.replace(path + '.tmp', path)
+        
+        if store is not None:
+            ColumnarCache(cache_dir).adopt(targets[0][1], store.close())
+    except BaseException:
+        for fmt, path in targets:
+            handles[fmt].close()
+            if os.path.exists(path + '.tmp'):
+                os.remove(path + '.tmp')
+        if store is not None:
+            shutil.rmtree(store.directory, ignore_errors=True)
+        raise
+    
+    logger.info(f"Dataset sintético de {n_samples} filas escrito en {', '.join(p for _, p in targets)}")
+    return [path for _, path in targets]
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+from api.aggregates import DatasetAggregates
+
+NUMERIC = ['a', 'b', 'c']
+CATEGORICAL = ['protocol_type', 'class']
+
+@pytest.fixture(scope='module')
+def frame():
+    rng = np.random.default_rng(11)
+    n = 5000
+    frame = pd.DataFrame({
+        'a': rng.normal(10, 3, size=n),
+        'b': rng.exponential(2, size=n),
+        'c': rng.integers(0, 50, size=n).astype(np.float64),
+        'protocol_type': rng.choice(['tcp', 'udp', 'icmp'], size=n, p=[0.7, 0.2, 0.1]),
+        'class': rng.choice(['normal', 'anomaly'], size=n),
+    })
+    frame['b'] += 0.3 * frame['a']
+    frame.loc[rng.choice(n, 200, replace=False), 'a'] = np.nan
+    frame.loc[rng.choice(n, 50, replace=False), 'c'] = np.nan
+    return frame
+
+def aggregate(frame, chunks):
+    """Un acumulador por bloque, combinados con merge como en el modo streaming"""
+    parts = [
+        DatasetAggregates(NUMERIC, CATEGORICAL).update(frame.iloc[rows])
+        for rows in np.array_split(np.arange(len(frame)), chunks)
+    ]
+    total = parts[0]
+    for part in parts[1:]:
+        total.merge(part)
+    return total
+
+@pytest.mark.parametrize('chunks', [1, 7])
+def test_moments_match_in_memory(frame, chunks):
+    aggregates = aggregate(frame, chunks)
+    summary = aggregates.summary()
+    expected = frame[NUMERIC].describe()
+    assert aggregates.rows == len(frame)
+    np.testing.assert_array_equal(summary['count'], expected.loc['count'])
+    for key in ['mean', 'std', 'min', 'max']:
+        np.testing.assert_allclose(summary[key], expected.loc[key], rtol=1e-10)
+
+@pytest.mark.parametrize('chunks', [1, 7])
+def test_correlation_matches_in_memory(frame, chunks):
+    # Pares completos, como DataFrame.corr y stats_engine.correlation
+    corr = aggregate(frame, chunks).comoments.correlation()
+    np.testing.assert_allclose(corr, frame[NUMERIC].corr(), rtol=1e-10)
+
+def test_correlation_with_missing_and_constant_columns():
+    rng = np.random.default_rng(12)
+    frame = pd.DataFrame({
+        'a': rng.normal(1e6, 1, size=300),
+        'b': rng.normal(size=300),
+        'constant': np.full(300, 4.0),
+        'sparse': np.full(300, np.nan),
+    })
+    frame['b'] += frame['a'] - 1e6
+    frame.loc[::3, 'a'] = np.nan
+    frame.loc[1::4, 'b'] = np.nan
+    frame.loc[[5, 200], 'sparse'] = [1.0, 2.0]
+    cols = list(frame.columns)
+    aggregates = DatasetAggregates(cols, [])
+    for rows in np.array_split(np.arange(len(frame)), 5):
+        aggregates.merge(DatasetAggregates(cols, []).update(frame.iloc[rows]))
+    np.testing.assert_allclose(aggregates.comoments.correlation(), frame.corr(), rtol=1e-9, equal_nan=True)
+
+def test_sketch_quantiles_are_close_in_rank(frame):
+    summary = aggregate(frame, 7).summary(percentiles=[0.05, 0.95])
+    for j, col in enumerate(NUMERIC):
+        values = np.sort(frame[col].dropna().to_numpy())
+        for q, estimates in summary['quantiles'].items():
+            rank = np.searchsorted(values, estimates[j], side='right') / len(values)
+            assert abs(rank - q) < 0.02
+
+def test_categories_and_class_moments_match_in_memory(frame):
+    aggregates = aggregate(frame, 7)
+    for col in CATEGORICAL:
+        assert aggregates.categories.most_common(col) == frame[col].value_counts().to_dict()
+    
+    grouped = frame.groupby('class')[NUMERIC]
+    for label in ['normal', 'anomaly']:
+        moments = aggregates.class_moments.get(label)
+        np.testing.assert_array_equal(moments.count, grouped.count().loc[label])
+        np.testing.assert_allclose(moments.means, grouped.mean().loc[label], rtol=1e-10)
+        np.testing.assert_allclose(moments.std, grouped.std().loc[label], rtol=1e-10)
@@ -0,0 +1,50 @@
+import pytest
+from api.analytics import DatasetAnalytics
+from api.response_cache import render_json
+from api.synthetic import generate
+
+ROWS = 20000
+TAIL = 1000
+
+CALLS = [
+    ('get_overview', {}),
+    ('get_class_distribution', {}),
+    ('get_statistics', {}),
+    ('get_correlation_matrix', {}),
+    ('get_top_correlations', {'k': 10}),
+    ('get_anomaly_statistics', {}),
+    ('get_categorical_analysis', {}),
+] + [
+    ('get_feature_distributions', {'bins': bins, 'binning': binning})
+    for bins in (30, 60)
+    for binning in ('linear', 'log', 'quantile')
+]
+
+@pytest.fixture(scope='module', params=['same_range', 'new_max'])
+def engines(request):
+    """
+    (motor anexado, motor nuevo) sobre el mismo dataset. new_max pone en
+    las filas nuevas un src_bytes mayor que el máximo anterior: los bordes
+    de esa columna cambian y sus histogramas se cuentan de nuevo.
+    """
+    data = generate(ROWS, seed=3)
+    if request.param == 'new_max':
+        data.loc[ROWS - 1, 'src_bytes'] = data['src_bytes'].max() * 10
+    base = DatasetAnalytics(data.iloc[:ROWS - TAIL].reset_index(drop=True))
+    # Histogramas ya calculados: appended los actualiza en lugar de rehacerlos
+    for binning in ('linear', 'log', 'quantile'):
+        base.get_feature_distributions(bins=30, binning=binning)
+    return base.appended(data), DatasetAnalytics(data)
+
+@pytest.mark.parametrize('method, kwargs', CALLS, ids=[f'{m}-{kw}' for m, kw in CALLS])
+def test_appended_matches_fresh_build(engines, method, kwargs):
+    appended, fresh = engines
+    assert render_json(getattr(appended, method)(**kwargs)) == render_json(getattr(fresh, method)(**kwargs))
+
+def test_appended_index_matches_fresh_build(engines):
+    appended, fresh = engines
+    assert appended.index.n_rows == fresh.index.n_rows
+    for col, bitmaps in fresh.index.bitmaps.items():
+        assert list(appended.index.bitmaps[col]) == list(bitmaps)
+        for value, bitmap in bitmaps.items():
+            assert (appended.index.bitmaps[col][value] == bitmap).all()
@@ -0,0 +1,98 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from django.test import RequestFactory
+from rest_framework.request import Request
+from api.analytics import DatasetAnalytics, class_filter_labels
+from api.bitmap_index import BitmapIndex
+from api.response_cache import render_json
+from api.views import _dataset_filters
+
+FILTERS = [
+    {'class': ['anomaly']},
+    {'protocol_type': ['tcp', 'icmp']},
+    {'class': ['normal'], 'service': ['http', 'ftp'], 'flag': ['SF']},
+    {'service': ['telnet'], 'flag': ['REJ']},
+]
+
+@pytest.fixture(scope='module')
+def frame():
+    # 1003 filas: el último byte de cada bitmap queda incompleto
+    rng = np.random.default_rng(5)
+    n = 1003
+    return pd.DataFrame({
+        'duration': rng.integers(0, 100, size=n),
+        'src_bytes': rng.exponential(500, size=n),
+        'protocol_type': rng.choice(['tcp', 'udp', 'icmp'], size=n),
+        'service': rng.choice(['http', 'ftp', 'smtp', 'telnet'], size=n),
+        'flag': rng.choice(['SF', 'S0', 'REJ'], size=n),
+        'class': rng.choice(['normal', 'anomaly'], size=n),
+    })
+
+def assert_close(actual, expected):
+    """Mismo payload salvo redondeo en los float (la suma enmascarada sigue otro orden)"""
+    if isinstance(expected, dict):
+        assert list(actual) == list(expected)
+        for key in expected:
+            assert_close(actual[key], expected[key])
+    elif isinstance(expected, float):
+        assert actual == pytest.approx(expected, rel=1e-12)
+    else:
+        assert actual == expected
+
+def expected_mask(frame, filters):
+    mask = np.ones(len(frame), dtype=bool)
+    for col, values in filters.items():
+        mask &= frame[col].isin(values).to_numpy()
+    return mask
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_lookup_matches_pandas(frame, filters):
+    index = BitmapIndex(frame)
+    bitmap = index.lookup(filters)
+    expected = expected_mask(frame, filters)
+    np.testing.assert_array_equal(index.to_mask(bitmap), expected)
+    assert index.count(bitmap) == expected.sum()
+
+def test_lookup_without_filters(frame):
+    index = BitmapIndex(frame)
+    assert index.lookup({}) is None
+    assert sorted(index.values('flag')) == ['REJ', 'S0', 'SF']
+
+@pytest.mark.parametrize('filters', FILTERS)
+@pytest.mark.parametrize('method', ['get_class_distribution', 'get_statistics', 'get_categorical_analysis'])
+def test_filtered_analytics_match_the_subset(frame, filters, method):
+    analytics = DatasetAnalytics(frame)
+    subset = DatasetAnalytics(frame[expected_mask(frame, filters)].reset_index(drop=True))
+    filtered = getattr(analytics, method)(mask=analytics.select(filters))
+    assert_close(json.loads(render_json(filtered)), json.loads(render_json(getattr(subset, method)())))
+
+LABELS = ['normal', 'neptune', 'smurf', 'satan', 'guess_passwd', 'mystery']
+
+@pytest.mark.parametrize('name, expected', [
+    ('normal', ['normal']),
+    ('neptune', ['neptune']),
+    ('anomaly', ['neptune', 'smurf', 'satan', 'guess_passwd', 'mystery']),
+    ('dos', ['neptune', 'smurf']),
+    ('PROBE', ['satan']),
+    ('u2r', []),
+    ('unknown', []),
+])
+def test_class_filter_labels(name, expected):
+    assert class_filter_labels(LABELS, name) == expected
+
+def test_class_filter_accepts_labels_and_families(frame):
+    labeled = frame.assign(**{'class': np.random.default_rng(6).choice(LABELS, size=len(frame))})
+    analytics = DatasetAnalytics(labeled)
+    
+    def filters(name):
+        request = Request(RequestFactory().get('/api/statistics/', {'class': name}, HTTP_HOST='localhost'))
+        return _dataset_filters(request, analytics)
+    
+    kwargs, errors = filters('dos')
+    assert errors is None
+    np.testing.assert_array_equal(kwargs['mask'], labeled['class'].isin(['neptune', 'smurf']).to_numpy())
+    kwargs, errors = filters('mystery')
+    np.testing.assert_array_equal(kwargs['mask'], (labeled['class'] == 'mystery').to_numpy())
+    assert filters('u2r') == (None, {'class': ['Valores desconocidos: u2r']})
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+from api.analytics import ATTACK_FAMILY, DatasetAnalytics
+from api.response_cache import render_json
+from api.streaming import StreamingAnalytics
+from api.synthetic import generate
+
+LABELS = ['normal', 'neptune', 'smurf', 'satan', 'guess_passwd', 'buffer_overflow', 'unknown_attack']
+
+class FrameLoader:
+    """Fuente de bloques para StreamingAnalytics a partir de un DataFrame"""
+    
+    def __init__(self, frame):
+        self.frame = frame
+    
+    def iter_chunks(self, chunksize=997):
+        for start in range(0, len(self.frame), chunksize):
+            yield self.frame.iloc[start:start + chunksize]
+
+@pytest.fixture(scope='module')
+def frame():
+    frame = generate(6000, seed=8)
+    rng = np.random.default_rng(8)
+    frame['class'] = pd.Categorical(rng.choice(LABELS, size=len(frame), p=[0.5, 0.2, 0.1, 0.1, 0.05, 0.03, 0.02]))
+    return frame
+
+def expected_crosstab(frame, column, grouping):
+    def group(label):
+        if label == 'normal':
+            return 'normal'
+        return ATTACK_FAMILY.get(label, 'anomaly') if grouping == 'family' else 'anomaly'
+    return pd.crosstab(frame[column].astype(str), frame['class'].astype(str).map(group))
+
+@pytest.mark.parametrize('grouping', ['binary', 'family'])
+@pytest.mark.parametrize('column', ['protocol_type', 'service', 'flag'])
+def test_crosstab_matches_pandas(frame, column, grouping):
+    payload = DatasetAnalytics(frame).get_categorical_crosstab(column, top=1000, grouping=grouping)
+    expected = expected_crosstab(frame, column, grouping)
+    
+    assert payload['other_values'] == 0
+    assert set(payload['counts']) == set(expected.index)
+    for value, counts in payload['counts'].items():
+        for group, count in counts.items():
+            assert count == (expected.loc[value, group] if group in expected.columns else 0)
+        assert payload['totals'][value] == expected.loc[value].sum()
+        share = counts['normal'] / payload['totals'][value]
+        assert payload['shares'][value]['normal'] == pytest.approx(share, abs=5e-5)
+    assert sum(payload['group_totals'].values()) == len(frame)
+
+def test_crosstab_folds_the_rest_into_other(frame):
+    payload = DatasetAnalytics(frame).get_categorical_crosstab('service', top=2)
+    expected = expected_crosstab(frame, 'service', 'binary')
+    totals = expected.sum(axis=1).sort_values(ascending=False, kind='stable')
+    
+    assert list(payload['counts']) == list(totals.index[:2])
+    assert payload['other_values'] == len(totals) - 2
+    assert payload['other'] == expected.loc[totals.index[2:]].sum().to_dict()
+
+@pytest.mark.parametrize('grouping', ['binary', 'family'])
+def test_streaming_crosstab_matches_in_memory(frame, grouping):
+    streaming = StreamingAnalytics(FrameLoader(frame))
+    in_memory = DatasetAnalytics(frame)
+    for column in ['protocol_type', 'service', 'flag']:
+        assert render_json(streaming.get_categorical_crosstab(column, grouping=grouping)) == \
+            render_json(in_memory.get_categorical_crosstab(column, grouping=grouping))
+
+def test_categorical_counts_match_value_counts(frame):
+    analysis = DatasetAnalytics(frame).get_categorical_analysis(top=3)
+    for column, payload in analysis.items():
+        counts = frame[column].astype(str).value_counts()
+        assert payload['counts'] == counts.iloc[:3].to_dict()
+        assert payload['other'] == counts.iloc[3:].sum()
+        assert payload['distinct'] == len(counts)
+        assert payload['total'] == len(frame)
@@ -0,0 +1,77 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from api import columnar
+from api.columnar import ColumnarCache, extend_store, file_digest, file_signature, read_store, write_store
+from api.data_loader import _append_rows
+
+def write_source(path, rows):
+    pd.DataFrame({'x': range(rows)}).to_csv(path, index=False)
+    return pd.read_csv(path)
+
+def stores(cache_dir):
+    return sorted(entry for entry in os.listdir(cache_dir) if os.path.isdir(os.path.join(cache_dir, entry)))
+
+def test_new_version_removes_only_its_own_stale_stores(tmp_path):
+    cache = ColumnarCache(str(tmp_path / 'cache'))
+    foo, foo_bar = str(tmp_path / 'foo.csv'), str(tmp_path / 'foo-bar.csv')
+    cache.save(foo, write_source(foo, 3))
+    cache.save(foo_bar, write_source(foo_bar, 4))
+    old = stores(cache.cache_dir)
+    
+    data = write_source(foo, 5)
+    cache.save(foo, data)
+    current = stores(cache.cache_dir)
+    
+    assert len(current) == 2
+    assert [entry for entry in old if entry.startswith('foo-bar-')] == \
+        [entry for entry in current if entry.startswith('foo-bar-')]
+    pd.testing.assert_frame_equal(cache.load(foo), data, check_dtype=False)
+    assert len(cache.load(foo_bar)) == 4
+
+def test_extend_store_matches_a_full_write(tmp_path):
+    data = pd.DataFrame({
+        'small': np.arange(6, dtype=np.int8),
+        'ratio': np.linspace(0, 1, 6, dtype=np.float32),
+        'proto': pd.Categorical(['tcp', 'udp'] * 3),
+        'service': pd.Categorical(['http', 'smtp', 'http', 'ftp', 'smtp', 'http']),
+    })
+    # small crece en dtype (int8 -> int16) y service recibe una categoría que va delante
+    tail = pd.DataFrame({
+        'small': np.array([7, 300], dtype=np.int16),
+        'ratio': np.array([0.5, np.nan], dtype=np.float32),
+        'proto': pd.Categorical(['udp', 'tcp']),
+        'service': pd.Categorical(['auth', 'http']),
+    })
+    store = str(tmp_path / 'store')
+    write_store(store, data)
+    before = read_store(store)
+    inodes = {name: os.stat(os.path.join(store, name)).st_ino for name in os.listdir(store)}
+    
+    extend_store(store, tail)
+    expected = str(tmp_path / 'expected')
+    write_store(expected, _append_rows(data, tail))
+    pd.testing.assert_frame_equal(read_store(store), read_store(expected))
+    # Las columnas que conservan tipo crecen en el sitio; las demás son archivos nuevos
+    assert [os.stat(os.path.join(store, f'col_{i:03d}.npy')).st_ino == inodes[f'col_{i:03d}.npy']
+            for i in range(4)] == [False, True, True, False]
+    # Lo mapeado antes de extender no cambia
+    pd.testing.assert_frame_equal(before, data, check_categorical=False)
+
+def test_extend_mapped_publishes_without_rehashing(tmp_path, monkeypatch):
+    cache = ColumnarCache(str(tmp_path / 'cache'))
+    source = str(tmp_path / 'foo.csv')
+    data = write_source(source, 3)
+    old_digest = cache.save(source, data)
+    
+    with open(source, 'a') as fh:
+        fh.write('3\n4\n')
+    digest, signature = file_digest(source), file_signature(source)
+    monkeypatch.setattr(columnar, 'file_digest', lambda path: pytest.fail('rehash'))
+    extended = cache.extend_mapped(source, pd.DataFrame({'x': [3, 4]}), old_digest, digest, signature)
+    
+    assert extended['x'].tolist() == [0, 1, 2, 3, 4]
+    assert stores(cache.cache_dir) == [os.path.basename(cache._store_path(source, digest))]
+    assert cache.load(source)['x'].tolist() == [0, 1, 2, 3, 4]
+    assert cache.extend_mapped(source, pd.DataFrame({'x': [5]}), 'f' * 64, 'e' * 64, signature) is None
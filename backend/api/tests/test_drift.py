@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from api.drift import (
+    PSI_EPSILON, SortedValues, drift_level, jensen_shannon, kolmogorov_smirnov, population_stability,
+)
+
+scipy_stats = pytest.importorskip('scipy.stats')
+
+@pytest.mark.parametrize('shift, scale', [(0.0, 1.0), (0.1, 1.0), (0.0, 2.0), (3.0, 1.0)])
+def test_kolmogorov_smirnov_matches_scipy(shift, scale):
+    rng = np.random.default_rng(9)
+    # Valores redondeados: muchos repetidos, como en NSL-KDD
+    reference = np.round(rng.normal(size=3000), 1)
+    current = np.round(rng.normal(shift, scale, size=1200), 1).astype(np.float32)
+    current[::50] = np.nan
+    d, p = kolmogorov_smirnov(SortedValues([reference]), SortedValues([current]), 0)
+    
+    current = current[~np.isnan(current)].astype(np.float64)
+    expected = scipy_stats.ks_2samp(reference, current)
+    assert d == pytest.approx(expected.statistic, abs=1e-12)
+    # p-valor de la distribución límite de Kolmogorov (ks_2samp usa la exacta de n finito)
+    n, m = len(reference), len(current)
+    assert p == pytest.approx(scipy_stats.kstwobign.sf(expected.statistic * np.sqrt(n * m / (n + m))), rel=1e-9)
+
+def test_kolmogorov_smirnov_without_values():
+    d, p = kolmogorov_smirnov(SortedValues([np.arange(5.0)]), SortedValues([np.full(3, np.nan)]), 0)
+    assert np.isnan(d) and np.isnan(p)
+
+def test_population_stability():
+    expected = np.array([[10, 20, 30, 40], [25, 25, 25, 25]])
+    actual = np.array([[10, 20, 30, 40], [40, 30, 20, 10]])
+    psi = population_stability(expected, actual)
+    e, a = expected[1] / 100, actual[1] / 100
+    assert psi[0] == 0
+    assert psi[1] == pytest.approx(((a - e) * np.log(a / e)).sum(), rel=1e-12)
+
+def test_population_stability_with_empty_bins():
+    psi = population_stability([50, 50, 0], [50, 0, 50])
+    e = np.maximum([0.5, 0.5, 0], PSI_EPSILON)
+    a = np.maximum([0.5, 0, 0.5], PSI_EPSILON)
+    assert np.isfinite(psi)
+    assert psi == pytest.approx(((a - e) * np.log(a / e)).sum(), rel=1e-12)
+
+@pytest.mark.parametrize('psi, level', [
+    (0.0, 'none'), (0.099, 'none'), (0.1, 'moderate'), (0.249, 'moderate'),
+    (0.25, 'significant'), (3.0, 'significant'), (np.nan, 'none'),
+])
+def test_drift_level(psi, level):
+    assert drift_level(psi) == level
+
+def test_jensen_shannon():
+    assert jensen_shannon([1, 2, 3], [2, 4, 6]) == 0
+    assert jensen_shannon([1, 0], [0, 1]) == pytest.approx(1.0)
+    p, q = np.array([0.2, 0.5, 0.3]), np.array([0.4, 0.4, 0.2])
+    m = (p + q) / 2
+    expected = (np.sum(p * np.log2(p / m)) + np.sum(q * np.log2(q / m))) / 2
+    assert jensen_shannon(p * 10, q * 10) == pytest.approx(expected, rel=1e-12)
@@ -0,0 +1,131 @@
+import json
+import threading
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+from api import jobs
+from api.models import AnalyticsJob
+from api.response_cache import CachedResponse
+
+BODY = b'{"mean": 1.5}'
+
+@pytest.fixture(scope='module', autouse=True)
+def database():
+    """Base de datos de prueba (SQLite en memoria) con las migraciones aplicadas"""
+    name = connection.creation.create_test_db(verbosity=0)
+    yield
+    connection.creation.destroy_test_db(name, verbosity=0)
+
+@pytest.fixture(autouse=True)
+def empty_table(database):
+    AnalyticsJob.objects.all().delete()
+
+def submit(key, compute, endpoint='statistics'):
+    request = RequestFactory().get(f'/api/{endpoint}/', {'async': 'true'}, HTTP_HOST='localhost')
+    return jobs.submit(request, key, endpoint, compute)
+
+def finished(response):
+    job = jobs.wait(response.data['id'], timeout=10)
+    assert job.status not in jobs.ACTIVE
+    return job
+
+def test_result_is_stored_under_the_key():
+    key = ('fingerprint', 'statistics', ())
+    response = submit(key, lambda: CachedResponse(BODY))
+    assert response.status_code == 202
+    assert response['Location'].endswith(f"/api/jobs/{response.data['id']}/")
+    
+    job = finished(response)
+    assert (job.status, job.status_code, bytes(job.result)) == (AnalyticsJob.DONE, 200, BODY)
+    assert jobs.stored_result(key) == BODY
+    assert jobs.stored_result(('other', 'statistics', ())) is None
+
+def test_failure_is_recorded_but_not_served():
+    key = ('fingerprint', 'statistics', (('percentiles', ('x',)),))
+    
+    def compute():
+        raise ValueError('percentil inválido')
+    
+    job = finished(submit(key, compute))
+    assert (job.status, job.status_code) == (AnalyticsJob.FAILED, 500)
+    assert json.loads(bytes(job.result)) == {'error': 'percentil inválido'}
+    assert jobs.stored_result(key) is None
+
+def test_concurrent_submissions_share_the_active_job():
+    key = ('fingerprint', 'correlation_matrix', ())
+    release = threading.Event()
+    calls = []
+    
+    def compute():
+        calls.append(1)
+        release.wait(10)
+        return CachedResponse(BODY)
+    
+    first = submit(key, compute, 'correlation_matrix')
+    second = submit(key, compute, 'correlation_matrix')
+    assert first.data['id'] == second.data['id']
+    release.set()
+    finished(first)
+    assert len(calls) == 1
+
+def test_stale_job_is_resubmitted():
+    key = ('fingerprint', 'anomaly_analysis', ())
+    stale = AnalyticsJob.objects.create(
+        key=jobs.job_key(key), endpoint='anomaly_analysis', status=AnalyticsJob.RUNNING
+    )
+    # auto_now: la marca antigua solo se puede poner con update()
+    AnalyticsJob.objects.filter(id=stale.id).update(updated_at=timezone.now() - timedelta(hours=1))
+    
+    response = submit(key, lambda: CachedResponse(BODY), 'anomaly_analysis')
+    assert response.data['id'] != str(stale.id)
+    assert finished(response).status == AnalyticsJob.DONE
+
+@override_settings(ANALYTICS_JOB_TIMEOUT=0.3)
+def test_running_job_keeps_its_heartbeat():
+    key = ('fingerprint', 'batch', ())
+    release = threading.Event()
+    
+    def compute():
+        release.wait(10)
+        return CachedResponse(BODY)
+    
+    first = submit(key, compute, 'batch')
+    # Más que ANALYTICS_JOB_TIMEOUT: sin latido el job se daría por perdido
+    release.wait(0.8)
+    job = AnalyticsJob.objects.get(id=first.data['id'])
+    assert job.status == AnalyticsJob.RUNNING and not jobs._is_stale(job)
+    assert submit(key, compute, 'batch').data['id'] == first.data['id']
+    release.set()
+    assert finished(first).status == AnalyticsJob.DONE
+
+def test_discard_removes_finished_results():
+    key = ('fingerprint', 'model_metrics', ())
+    finished(submit(key, lambda: CachedResponse(BODY), 'model_metrics'))
+    jobs.discard(['model_metrics'])
+    assert jobs.stored_result(key) is None
+
+@override_settings(ANALYTICS_JOBS_MIN_ROWS=0)
+@pytest.mark.parametrize('query, expected', [
+    ({'async': 'true'}, True),
+    ({'async': '1'}, True),
+    ({'async': 'false'}, False),
+    ({}, False),
+])
+def test_wants_async(query, expected):
+    request = RequestFactory().get('/api/statistics/', query)
+    assert jobs.wants_async(request, 'statistics') is expected
+
+@pytest.mark.parametrize('min_rows, endpoint, query, expected', [
+    (0, 'statistics', {}, False),
+    (0, 'statistics', {'async': 'true'}, True),
+    (0, 'overview', {'async': 'false'}, True),
+    (1000, 'statistics', {}, True),
+    (1000, 'overview', {}, False),
+])
+def test_may_have_result(min_rows, endpoint, query, expected):
+    request = RequestFactory().get(f'/api/{endpoint}/', query)
+    with override_settings(ANALYTICS_JOBS_MIN_ROWS=min_rows):
+        assert jobs.may_have_result(request, endpoint) is expected
@@ -0,0 +1,67 @@
+import gc
+import weakref
+import numpy as np
+import pytest
+from api.analytics import DatasetAnalytics
+from api.parallel import ParallelAnalytics
+from api.synthetic import generate
+
+@pytest.fixture(scope='module')
+def engines():
+    """(paralelo con 2 procesos, secuencial) sobre un dataset con NaN en dos columnas"""
+    data = generate(5000, seed=4)
+    rng = np.random.default_rng(4)
+    floats = data.select_dtypes(include=[np.floating]).columns[:2]
+    for col in floats:
+        data.loc[rng.choice(len(data), 700, replace=False), col] = np.nan
+    parallel = ParallelAnalytics(data, 2, min_rows=0)
+    yield parallel, DatasetAnalytics(data)
+    parallel.close()
+
+def test_correlation_is_pairwise_like_in_memory(engines):
+    parallel, sequential = engines
+    cols, corr = parallel._correlation()
+    expected_cols, expected = sequential._correlation()
+    assert cols == expected_cols
+    # stats_engine.correlation estandariza en float32
+    np.testing.assert_allclose(corr, expected, atol=1e-6, equal_nan=True)
+
+def test_statistics_match_in_memory(engines):
+    parallel, sequential = engines
+    result, expected = parallel.get_statistics([0.9]), sequential.get_statistics([0.9])
+    for col, stats in expected.items():
+        for key, value in stats.items():
+            if key != 'explanation':
+                assert result[col][key] == pytest.approx(value, rel=1e-9, nan_ok=True)
+
+def test_dropped_engine_releases_its_pool():
+    engine = ParallelAnalytics(generate(2000, seed=5), 2, min_rows=0)
+    engine.get_statistics()
+    resources, ref = engine._resources, weakref.ref(engine)
+    assert resources.executor is not None and resources.shared
+    
+    del engine
+    gc.collect()
+    assert ref() is None
+    assert resources.executor is None and resources.shared is None
+
+def test_appended_engine_has_its_own_pool():
+    data = generate(3000, seed=6)
+    base = ParallelAnalytics(data.iloc[:2500].reset_index(drop=True), 2, min_rows=0)
+    base.get_statistics()
+    engine = base.appended(data)
+    # Al retirar el motor anterior se libera su pool, no el del nuevo
+    base.close()
+    
+    assert isinstance(engine, ParallelAnalytics) and engine._resources is not base._resources
+    assert engine.index.n_rows == len(data)
+    sequential = DatasetAnalytics(data)
+    result = engine.get_statistics()
+    for col, stats in sequential.get_statistics().items():
+        assert result[col]['mean'] == pytest.approx(stats['mean'], rel=1e-9)
+    np.testing.assert_allclose(engine._correlation()[1], sequential._correlation()[1], atol=1e-6)
+    engine.close()
+    
+    rebuilt = engine.appended(data.drop(columns=['duration']))
+    assert isinstance(rebuilt, ParallelAnalytics) and rebuilt.workers == 2
+    rebuilt.close()
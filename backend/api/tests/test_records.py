@@ -0,0 +1,62 @@
+import json
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+import pytest
+from api import renderers
+from api.records import RecordPage, decode_cursor, encode_cursor
+from api.renderers import NumpyJSONRenderer
+
+VERSION = SimpleNamespace(fingerprint='3f1c9a7e')
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(VERSION, 12345), VERSION) == 12345
+
+def test_cursor_from_another_version_is_rejected():
+    cursor = encode_cursor(SimpleNamespace(fingerprint='0000aaaa'), 10)
+    with pytest.raises(ValueError, match='otra versión'):
+        decode_cursor(cursor, VERSION)
+
+@pytest.mark.parametrize('cursor', ['', 'no-es-base64!', 'Zm9v', encode_cursor(VERSION, 1).upper()])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, VERSION)
+
+def test_negative_position_is_rejected():
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(VERSION, -5), VERSION)
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'rate': np.array([0.05, np.nan, 1 / 3, 0.25], dtype=np.float32),
+        'bytes': np.array([181.0, 0.1 + 0.2, np.inf, 1250.75]),
+        'count': np.array([1, -2, 127, 0], dtype=np.int8),
+        'service': pd.Categorical(['http', None, 'ftp_data', 'http']),
+        'flag': np.array([True, False, True, True]),
+    })
+
+def ndjson(page):
+    return b''.join(page.ndjson())
+
+def test_ndjson_matches_the_json_renderer(frame):
+    body = ndjson(RecordPage(frame, ['rate', 'bytes', 'count', 'service', 'flag'], 0, 10))
+    lines = body.splitlines()
+    assert lines[0] == b'{"rate":0.05,"bytes":181.0,"count":1,"service":"http","flag":true}'
+    assert json.loads(lines[1])['rate'] is None and json.loads(lines[1])['service'] is None
+    for i, line in enumerate(lines):
+        expected = {col: frame[col].to_numpy()[i:i + 1] for col in ['rate', 'bytes', 'count', 'flag']}
+        rendered = json.loads(NumpyJSONRenderer().render(expected))
+        assert {col: json.loads(line)[col] for col in expected} == {col: v[0] for col, v in rendered.items()}
+
+def test_ndjson_chunks_and_mask(frame, monkeypatch):
+    monkeypatch.setattr('api.records.RECORDS_CHUNK_ROWS', 1)
+    page = RecordPage(frame, ['count', 'service'], 1, 2, mask=np.array([True, False, True, True]))
+    assert list(page.ndjson()) == [b'{"count":127,"service":"ftp_data"}\n', b'{"count":0,"service":"http"}\n']
+
+@pytest.mark.skipif(renderers.orjson is None, reason='sin orjson solo hay una ruta')
+def test_ndjson_without_orjson(frame, monkeypatch):
+    page = RecordPage(frame, list(frame.columns), 0, 10)
+    fast = ndjson(page)
+    monkeypatch.setattr(renderers, 'orjson', None)
+    assert ndjson(page) == fast
@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+from api import renderers
+from api.renderers import NumpyJSONRenderer
+
+PAYLOADS = [
+    {'values': np.array([1.5, np.nan, np.inf], dtype=np.float64), 'count': np.int64(3)},
+    {'rates': np.array([0.1, 0.25], dtype=np.float32), 'flag': np.bool_(True)},
+    {np.int64(1): 2, 'nested': [{np.float64(0.5): np.arange(3, dtype=np.int8)}]},
+]
+
+@pytest.mark.skipif(renderers.orjson is None, reason='sin orjson solo hay una ruta')
+@pytest.mark.parametrize('payload', PAYLOADS)
+def test_orjson_and_fallback_render_the_same(payload, monkeypatch):
+    fast = NumpyJSONRenderer().render(payload)
+    monkeypatch.setattr(renderers, 'orjson', None)
+    assert NumpyJSONRenderer().render(payload) == fast
+
+def test_numpy_keys():
+    assert NumpyJSONRenderer().render({np.int64(1): 2}) == b'{"1":2}'
@@ -0,0 +1,142 @@
+import gzip
+import threading
+import time
+import pytest
+from django.test import RequestFactory
+from api import response_cache
+from api.response_cache import MIN_COMPRESS_BYTES, CachedResponse, ResponseCache, build_response, single_flight
+
+BODY = b'{"values": [%s]}' % b','.join(b'%d' % i for i in range(400))
+
+@pytest.fixture
+def entry():
+    return CachedResponse(BODY)
+
+def get(**headers):
+    return RequestFactory().get('/api/statistics/', **headers)
+
+def test_identity_when_no_encoding_is_accepted(entry):
+    response = build_response(get(), entry)
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert not response.has_header('Content-Encoding')
+    assert response['ETag'] == entry.etag and entry.etag.startswith('W/"')
+    assert response['Vary'] == 'Accept-Encoding'
+    assert response['Cache-Control'] == 'no-cache'
+
+def test_gzip(entry):
+    response = build_response(get(HTTP_ACCEPT_ENCODING='gzip, deflate'), entry)
+    assert response['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.content) == BODY
+
+@pytest.mark.skipif(response_cache.brotli is None, reason='brotli no está instalado')
+def test_brotli_preferred_over_gzip(entry):
+    response = build_response(get(HTTP_ACCEPT_ENCODING='gzip, br'), entry)
+    assert response['Content-Encoding'] == 'br'
+    assert response_cache.brotli.decompress(response.content) == BODY
+
+@pytest.mark.parametrize('header', ['gzip;q=0', 'br;q=0, gzip; q=0.0', 'identity'])
+def test_rejected_encodings(entry, header):
+    response = build_response(get(HTTP_ACCEPT_ENCODING=header), entry)
+    assert not response.has_header('Content-Encoding')
+    assert response.content == BODY
+
+def test_small_bodies_are_not_compressed():
+    entry = CachedResponse(b'{"a": 1}')
+    assert len(entry.body) < MIN_COMPRESS_BYTES
+    assert entry.gzip_body is None and entry.br_body is None
+    response = build_response(get(HTTP_ACCEPT_ENCODING='gzip, br'), entry)
+    assert response.content == b'{"a": 1}'
+    assert not response.has_header('Content-Encoding')
+
+@pytest.mark.parametrize('header', [
+    '{etag}',
+    '{bare}',
+    '"other", {etag}',
+    '*',
+])
+def test_if_none_match_gives_304(entry, header):
+    bare = entry.etag[2:]
+    response = build_response(get(HTTP_IF_NONE_MATCH=header.format(etag=entry.etag, bare=bare)), entry)
+    assert response.status_code == 304
+    assert response.content == b''
+    assert response['ETag'] == entry.etag
+
+def test_stale_etag_gets_the_body(entry):
+    stale = CachedResponse(b'{"values": []}')
+    response = build_response(get(HTTP_IF_NONE_MATCH=stale.etag), entry)
+    assert response.status_code == 200
+    assert response.content == BODY
+
+def test_etag_depends_on_the_body():
+    assert CachedResponse(BODY).etag == CachedResponse(bytes(BODY)).etag
+    assert CachedResponse(BODY).etag != CachedResponse(BODY + b' ').etag
+
+def test_cache_is_bounded_by_bytes():
+    entries = [CachedResponse(b'[%d]' % i) for i in range(3)]
+    cache = ResponseCache(max_bytes=entries[0].size * 2)
+    for i, entry in enumerate(entries):
+        cache.put(('fingerprint', f'endpoint{i}', ()), entry)
+    assert len(cache) == 2
+    assert cache.get(('fingerprint', 'endpoint0', ())) is None
+    assert cache.get(('fingerprint', 'endpoint2', ())) is entries[2]
+
+def test_single_flight_runs_compute_once():
+    started, release = threading.Event(), threading.Event()
+    calls = []
+    
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'resultado'
+    
+    results = []
+    leader = threading.Thread(target=lambda: results.append(single_flight('key', compute)))
+    leader.start()
+    assert started.wait(5)
+    followers = [
+        threading.Thread(target=lambda: results.append(single_flight('key', compute)))
+        for _ in range(4)
+    ]
+    for thread in followers:
+        thread.start()
+    # Da tiempo a que los seguidores lleguen a esperar el cálculo en curso
+    time.sleep(0.2)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+    
+    assert len(calls) == 1
+    assert sorted(results, key=lambda result: not result[1]) == [('resultado', True)] + [('resultado', False)] * 4
+
+def test_single_flight_failure_reaches_only_the_leader():
+    started, release = threading.Event(), threading.Event()
+    
+    def compute():
+        started.set()
+        release.wait(5)
+        raise ValueError('fallo')
+    
+    errors, results = [], []
+    
+    def lead():
+        try:
+            single_flight('failing', compute)
+        except ValueError as e:
+            errors.append(e)
+    
+    leader = threading.Thread(target=lead)
+    leader.start()
+    assert started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(single_flight('failing', compute)))
+    follower.start()
+    time.sleep(0.2)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    
+    assert len(errors) == 1
+    assert results == [(None, False)]
+    # La clave queda libre: la siguiente llamada vuelve a calcular
+    assert single_flight('failing', lambda: 'otra vez') == ('otra vez', True)
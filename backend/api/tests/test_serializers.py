@@ -0,0 +1,32 @@
+import pytest
+from api.sampling import DEFAULT_ERROR
+from api.serializers import ApproxSerializer
+
+def approx(value):
+    serializer = ApproxSerializer(data={'approx': value})
+    assert serializer.is_valid(), serializer.errors
+    return serializer.validated_data['approx']
+
+@pytest.mark.parametrize('value, expected', [
+    ('true', {'error': DEFAULT_ERROR}),
+    ('1', {'error': DEFAULT_ERROR}),
+    ('0.05', {'error': 0.05}),
+    (' 0.01 ', {'error': 0.01}),
+    ('200ms', {'budget_ms': 200.0}),
+    ('2.5MS', {'budget_ms': 2.5}),
+    ('false', None),
+    ('0', None),
+])
+def test_approx_values(value, expected):
+    assert approx(value) == expected
+
+@pytest.mark.parametrize('value', ['1.5', '-0.1', '0.0', '0ms', '60001ms', 'ms', 'abc', 'nan'])
+def test_invalid_approx_values(value):
+    serializer = ApproxSerializer(data={'approx': value})
+    assert not serializer.is_valid()
+    assert 'approx' in serializer.errors
+
+def test_approx_is_optional():
+    serializer = ApproxSerializer(data={})
+    assert serializer.is_valid()
+    assert serializer.validated_data.get('approx') is None
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+from api import stats_engine
+from api.stats_engine import (
+    column_quantiles, correlation, describe, effect_sizes, grouped_moments, pool_moments, std_from_m2,
+)
+
+PERCENTILES = [0.05, 0.9, 0.99]
+
+@pytest.fixture
+def frame():
+    """Columnas con NaN en distinta proporción, una constante y una vacía"""
+    rng = np.random.default_rng(7)
+    n = 500
+    frame = pd.DataFrame({
+        'a': rng.normal(size=n),
+        'b': rng.exponential(size=n),
+        'c': rng.integers(0, 5, size=n).astype(np.float64),
+        'constant': np.full(n, 2.0),
+        'empty': np.full(n, np.nan),
+    })
+    frame.loc[rng.choice(n, 40, replace=False), 'a'] = np.nan
+    frame.loc[rng.choice(n, 150, replace=False), 'b'] = np.nan
+    frame.loc[rng.choice(n, 3, replace=False), 'c'] = np.nan
+    frame['b'] = frame['b'] + 0.5 * frame['a']
+    return frame
+
+@pytest.mark.parametrize('block_rows', [65536, 64])
+def test_describe_matches_pandas(frame, block_rows, monkeypatch):
+    monkeypatch.setattr(stats_engine, 'MOMENT_BLOCK_ROWS', block_rows)
+    summary = describe([frame[col].to_numpy() for col in frame], PERCENTILES)
+    expected = frame.describe(percentiles=PERCENTILES)
+    np.testing.assert_array_equal(summary['count'], expected.loc['count'])
+    for row, key in [('mean', 'mean'), ('std', 'std'), ('min', 'min'), ('max', 'max')]:
+        np.testing.assert_allclose(summary[key], expected.loc[row], rtol=1e-12, equal_nan=True)
+    for q in [0.25, 0.5, 0.75] + PERCENTILES:
+        np.testing.assert_allclose(summary['quantiles'][q], frame.quantile(q), rtol=1e-12, equal_nan=True)
+
+def test_describe_compact_dtypes_match_float64(frame):
+    columns = [
+        frame['c'].fillna(0).to_numpy().astype(np.int8),
+        frame['b'].to_numpy().astype(np.float32),
+    ]
+    summary = describe(columns, PERCENTILES)
+    expected = describe([values.astype(np.float64) for values in columns], PERCENTILES)
+    for key in ['count', 'mean', 'std', 'min', 'max']:
+        np.testing.assert_allclose(summary[key], expected[key], rtol=1e-12)
+    for q, values in expected['quantiles'].items():
+        np.testing.assert_array_equal(summary['quantiles'][q], values)
+
+@pytest.mark.parametrize('dtype', [np.int8, np.int16, np.float32])
+def test_column_quantiles_in_compact_dtype(dtype):
+    rng = np.random.default_rng(3)
+    values = rng.integers(-100, 100, size=1001).astype(dtype)
+    if values.dtype.kind == 'f':
+        values[::7] = np.nan
+    series = pd.Series(values.astype(np.float64))
+    low, high, quantiles = column_quantiles(values, PERCENTILES)
+    assert low == series.min() and high == series.max()
+    for q in PERCENTILES:
+        assert quantiles[q] == pytest.approx(series.quantile(q), rel=1e-12)
+
+# La columna vacía hace que nanmean/nanstd avisen: su correlación es NaN, como en pandas
+@pytest.mark.filterwarnings('ignore:Mean of empty slice', 'ignore:Degrees of freedom')
+def test_correlation_matches_pandas_pairwise(frame):
+    columns = ['a', 'b', 'c', 'constant', 'empty']
+    corr = correlation([frame[col].to_numpy() for col in columns], len(frame))
+    # Las columnas se guardan estandarizadas en float32
+    np.testing.assert_allclose(corr, frame[columns].corr(), atol=1e-6, equal_nan=True)
+
+def test_correlation_without_nan_matches_pandas(frame):
+    columns = ['c', 'constant']
+    complete = frame.dropna(subset=['a', 'c'])
+    values = [complete[col].to_numpy() for col in ['a'] + columns]
+    corr = correlation(values, len(complete))
+    np.testing.assert_allclose(corr, complete[['a'] + columns].corr(), atol=1e-6, equal_nan=True)
+
+def test_grouped_moments_match_pandas_groupby(frame):
+    columns = ['a', 'b', 'c', 'empty']
+    rng = np.random.default_rng(2)
+    # -1: filas sin grupo, que no cuentan en ninguno
+    groups = rng.integers(-1, 3, size=len(frame))
+    count, mean, m2 = grouped_moments([frame[col].to_numpy() for col in columns], groups, 3)
+    
+    grouped = frame[columns][groups >= 0].groupby(groups[groups >= 0])
+    np.testing.assert_array_equal(count, grouped.count())
+    np.testing.assert_allclose(mean, grouped.mean(), rtol=1e-12, equal_nan=True)
+    np.testing.assert_allclose(std_from_m2(count, m2), grouped.std(), rtol=1e-12, equal_nan=True)
+    
+    total, pooled, pooled_m2 = pool_moments(count, mean, m2)
+    selected = frame[columns][groups >= 0]
+    np.testing.assert_array_equal(total, selected.count())
+    np.testing.assert_allclose(pooled, selected.mean(), rtol=1e-12, equal_nan=True)
+    np.testing.assert_allclose(std_from_m2(total, pooled_m2), selected.std(), rtol=1e-12, equal_nan=True)
+
+def test_effect_sizes():
+    rng = np.random.default_rng(4)
+    a = rng.normal(0, 1, size=(300, 3))
+    b = rng.normal([0.5, 0, -2], [1, 2, 0.5], size=(120, 3))
+    b[:, 1] = a[:120, 1]
+    moments = [(len(x) * np.ones(3, dtype=np.int64), x.mean(axis=0), ((x - x.mean(axis=0)) ** 2).sum(axis=0)) for x in (a, b)]
+    difference, cohens_d, smd = effect_sizes(*moments[0], *moments[1])
+    
+    var_a, var_b = a.var(axis=0, ddof=1), b.var(axis=0, ddof=1)
+    pooled = np.sqrt(((len(a) - 1) * var_a + (len(b) - 1) * var_b) / (len(a) + len(b) - 2))
+    np.testing.assert_allclose(difference, b.mean(axis=0) - a.mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(cohens_d, difference / pooled, rtol=1e-12)
+    np.testing.assert_allclose(smd, difference / np.sqrt((var_a + var_b) / 2), rtol=1e-12)
+
+def test_effect_sizes_undefined_without_spread():
+    count, mean, m2 = np.array([5, 1]), np.array([1.0, 3.0]), np.array([0.0, 0.0])
+    difference, cohens_d, smd = effect_sizes(count, mean, m2, count, mean + 1, m2)
+    np.testing.assert_array_equal(difference, [1.0, 1.0])
+    assert np.isnan(cohens_d).all() and np.isnan(smd).all()
@@ -1,28 +1,50 @@
+from django.conf import settings
 from django.urls import path
 from . import views
+from .offload import offload
+
+def cpu(view):
+    """Vistas con cálculo sobre el dataset: en ASGI se ejecutan en el pool acotado (api/offload.py)"""
+    return offload(view) if settings.ANALYTICS_ASGI else view
 
 urlpatterns = [
     # Información general
     path('overview/', views.dataset_overview, name='dataset_overview'),
+    path('dataset/version/', views.dataset_version, name='dataset_version'),
     
     # Análisis de clases
     path('class-distribution/', views.class_distribution, name='class_distribution'),
     
     # Estadísticas descriptivas
-    path('statistics/', views.statistics, name='statistics'),
+    path('statistics/', cpu(views.statistics), name='statistics'),
     
     # Análisis de correlación
-    path('correlation-matrix/', views.correlation_matrix, name='correlation_matrix'),
+    path('correlation-matrix/', cpu(views.correlation_matrix), name='correlation_matrix'),
+    path('correlation-matrix/top/', cpu(views.top_correlations), name='top_correlations'),
     
     # Distribuciones de características
-    path('feature-distributions/', views.feature_distributions, name='feature_distributions'),
+    path('feature-distributions/', cpu(views.feature_distributions), name='feature_distributions'),
     
     # Análisis categórico
-    path('categorical-analysis/', views.categorical_analysis, name='categorical_analysis'),
+    path('categorical-analysis/', cpu(views.categorical_analysis), name='categorical_analysis'),
+    path('categorical-analysis/crosstab/', cpu(views.categorical_crosstab), name='categorical_crosstab'),
     
     # Análisis de anomalías
-    path('anomaly-analysis/', views.anomaly_analysis, name='anomaly_analysis'),
+    path('anomaly-analysis/', cpu(views.anomaly_analysis), name='anomaly_analysis'),
+    
+    # Deriva entre el dataset de entrenamiento y el de prueba
+    path('drift/', cpu(views.drift), name='drift'),
     
     # Métricas del modelo
-    path('model-metrics/', views.model_metrics, name='model_metrics'),
+    path('model-metrics/', cpu(views.model_metrics), name='model_metrics'),
+    path('score/', cpu(views.score), name='score'),
+    
+    # Registros del dataset (streaming con cursor)
+    path('records/', cpu(views.record_list), name='record_list'),
+    
+    # Varias secciones en una petición
+    path('batch/', cpu(views.batch), name='batch'),
+    
+    # Jobs en segundo plano (?async=true)
+    path('jobs/<uuid:job_id>/', cpu(views.job_detail), name='job_detail'),
 ]
@@ -1,30 +1,243 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
 import logging
-from .data_loader import get_dataset
-from .analytics import DatasetAnalytics
-from .serializers import FeatureFilterSerializer, ClassFilterSerializer
+import threading
+import numpy as np
+import pandas as pd
+from . import data_loader, jobs, records
+from .data_loader import DatasetLoader
+from .analytics import DatasetAnalytics, class_filter_labels
+from .streaming import StreamingAnalytics
+from .parallel import ParallelAnalytics
+from .batch import iter_sections
+from .detector import detector
+from .metrics import phase
+from .response_cache import cache_response, render_json, response_cache
+from .serializers import (
+    AnomalyGroupingSerializer, ApproxSerializer, BatchSerializer, CategoricalSerializer, CrosstabSerializer, DistributionSerializer,
+    FeatureFilterSerializer, ClassFilterSerializer, JobWaitSerializer, RecordsSerializer, ScoreSerializer, SegmentFilterSerializer,
+    StatisticsFilterSerializer, TopCorrelationSerializer,
+)
 
 logger = logging.getLogger(__name__)
 
-# Cargar dataset una sola vez
-_dataset = None
-_analytics = None
+# El motor de analytics vive en la versión del dataset (DatasetVersion.engine)
+_init_lock = threading.Lock()
+# Segundos que se mantiene el motor de la versión anterior tras una recarga
+# (peticiones en curso) antes de liberar sus recursos (pool y memoria compartida)
+RETIRE_DELAY = 60
+_warmed_up = threading.Event()
 
 def _initialize_analytics():
-    """Inicializar analytics con lazy loading"""
-    global _dataset, _analytics
-    if _analytics is None:
-        try:
-            _dataset, _ = get_dataset()
-            _analytics = DatasetAnalytics(_dataset)
-            logger.info("Analytics inicializado correctamente")
-        except Exception as e:
-            logger.error(f"Error inicializando analytics: {e}")
-    return _analytics
+    """
+    Motor de analytics de la versión del dataset de la petición en curso,
+    construido con lazy loading la primera vez (una sola vez por versión).
+    """
+    loader = DatasetLoader()
+    try:
+        version = loader.current()
+    except Exception as e:
+        logger.error(f"Error cargando el dataset: {e}")
+        return None
+    
+    if version.engine is None:
+        with _init_lock:
+            if version.engine is None:
+                try:
+                    with phase('load'):
+                        version.engine = _build_analytics(version)
+                    logger.info("Analytics inicializado correctamente")
+                except Exception as e:
+                    logger.error(f"Error inicializando analytics: {e}")
+    loader.watch(_build_analytics, on_swap=_on_swap)
+    return version.engine
+
+def _build_analytics(version, previous=None):
+    """
+    Motor de analytics según el modo configurado (streaming, paralelo o en
+    memoria). Con previous (recarga por filas añadidas al final del archivo)
+    se parte de su motor y solo se procesan las filas nuevas.
+    """
+    loader = DatasetLoader()
+    base = previous.engine if previous is not None else None
+    if loader.is_streaming():
+        if base is not None:
+            return base.appended(loader.iter_chunks(offset=version.offset))
+        return StreamingAnalytics(loader)
+    
+    if base is not None:
+        return base.appended(version.data)
+    workers = getattr(settings, 'ANALYTICS_PARALLEL_WORKERS', 0)
+    if workers > 1:
+        return ParallelAnalytics(
+            version.data, workers,
+            min_rows=getattr(settings, 'ANALYTICS_PARALLEL_MIN_ROWS', 200000)
+        )
+    return DatasetAnalytics(version.data)
+
+def _on_swap(version, previous):
+    """
+    Tras publicar una versión nueva: las respuestas en caché de la anterior
+    ya no se piden (la huella forma parte de la clave), así que se liberan, y
+    con el warm-up activo se precalculan las de la nueva.
+    """
+    response_cache.clear()
+    engine = previous.engine if previous is not None else None
+    if engine is not None and engine is not version.engine and hasattr(engine, 'close'):
+        timer = threading.Timer(RETIRE_DELAY, engine.close)
+        timer.daemon = True
+        timer.start()
+    if getattr(settings, 'ANALYTICS_WARMUP', False):
+        warm_up()
+
+def is_ready():
+    """
+    Readiness: datos cargados y, si el warm-up está activo, payloads precalculados.
+    Distinto de liveness: el proceso puede estar vivo pero aún calentando.
+    """
+    if getattr(settings, 'ANALYTICS_WARMUP', False):
+        return _warmed_up.is_set()
+    version = DatasetLoader()._version
+    return version is not None and version.engine is not None
+
+def warm_up():
+    """
+    Carga el dataset y precalcula las respuestas de los endpoints de analytics
+    antes de aceptar tráfico (ver warm_up_server). Cada vista se ejecuta con
+    una petición GET sin parámetros, dejando su JSON en la caché de respuestas.
+    model_metrics carga el detector guardado en disco o inicia su entrenamiento.
+    """
+    if _initialize_analytics() is None:
+        return False
+    
+    for view in WARMUP_VIEWS:
+        request = HttpRequest()
+        request.method = 'GET'
+        response = view(request)
+        # 202: el detector sigue entrenando en segundo plano (model_metrics);
+        # 404: no hay dataset de prueba (drift)
+        if response.status_code not in (status.HTTP_200_OK, status.HTTP_202_ACCEPTED, status.HTTP_404_NOT_FOUND):
+            logger.warning(f"Warm-up de {view.__name__} respondió {response.status_code}")
+    
+    _warmed_up.set()
+    logger.info("Warm-up de analytics completado")
+    return True
+
+def warm_up_server():
+    """
+    Warm-up al arrancar el servidor (config/wsgi.py y asgi.py), no en
+    manage.py migrate ni en los demás comandos. Con `gunicorn --preload`
+    ocurre una vez en el master y los workers heredan los datos al hacer fork.
+    """
+    if getattr(settings, 'ANALYTICS_WARMUP', False):
+        warm_up()
+
+def _list_params(request, *names):
+    """Convierte parámetros separados por comas (?a=x,y) en listas para los serializers"""
+    params = {}
+    for name in names:
+        raw = request.query_params.get(name)
+        if raw:
+            params[name] = [item.strip() for item in raw.split(',') if item.strip()]
+    return params
+
+def _dataset_filters(request, analytics):
+    """
+    Valida los filtros de subconjunto (?class=, ?protocol_type=, ?service=, ?flag=)
+    y de columnas (?features=) y los resuelve con el índice de bitmaps.
+    
+    Retorna (kwargs para los métodos de analytics, errores). Sin filtros, los
+    kwargs están vacíos y se analiza el dataset completo.
+    """
+    params = _list_params(request, 'features', *SegmentFilterSerializer().fields)
+    filters = {}
+    errors = {}
+    
+    class_name = request.query_params.get('class')
+    if class_name:
+        serializer = ClassFilterSerializer(data={'class_name': class_name})
+        if serializer.is_valid():
+            filters['class'] = [serializer.validated_data['class_name']]
+        else:
+            errors['class'] = serializer.errors['class_name']
+    
+    serializer = SegmentFilterSerializer(data=params)
+    if serializer.is_valid():
+        filters.update(serializer.validated_data)
+    else:
+        errors.update(serializer.errors)
+    
+    serializer = FeatureFilterSerializer(data=params)
+    if serializer.is_valid():
+        features = serializer.validated_data.get('features')
+    else:
+        errors.update(serializer.errors)
+    
+    if errors:
+        return None, errors
+    if not filters and features is None:
+        return {}, None
+    
+    index = getattr(analytics, 'index', None)
+    if index is None:
+        return None, {'error': 'Los filtros no están disponibles en modo streaming'}
+    
+    if 'class' in filters:
+        # Etiqueta de class o grupo (anomaly, familia de ataque) presente en el índice
+        labels = class_filter_labels(index.values('class'), filters['class'][0])
+        if labels:
+            filters['class'] = labels
+    
+    for col, values in filters.items():
+        known = set(index.values(col))
+        unknown = [value for value in values if value not in known]
+        if unknown:
+            errors[col] = [f'Valores desconocidos: {", ".join(unknown)}']
+    
+    if features is not None:
+        known = set(analytics.numeric_cols) | set(analytics.categorical_cols)
+        unknown = [col for col in features if col not in known]
+        if unknown:
+            errors['features'] = [f'Características desconocidas: {", ".join(unknown)}']
+    
+    if errors:
+        return None, errors
+    return {'mask': analytics.select(filters), 'features': features}, None
+
+def _approximation(request, analytics):
+    """
+    Valida ?approx= y retorna (motor, errores): el motor aproximado de
+    analytics (muestra estratificada, ver ApproximateAnalytics) o analytics
+    si no se pidió. Los filtros se resuelven igual, sobre el dataset completo.
+    """
+    serializer = ApproxSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return None, serializer.errors
+    options = serializer.validated_data.get('approx')
+    if not options:
+        return analytics, None
+    if not hasattr(analytics, 'approximate'):
+        return None, {'approx': ['El modo aproximado no está disponible en modo streaming']}
+    return analytics.approximate(**options), None
+
+def _exact_only(request):
+    """
+    Errores si se pidió ?approx= en un endpoint sin modo aproximado (la
+    correlación y los histogramas salen de agregados precalculados o no
+    tienen intervalo de confianza): mejor un 400 que ignorarlo en silencio.
+    """
+    serializer = ApproxSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return serializer.errors
+    if serializer.validated_data.get('approx'):
+        return {'approx': ['Este endpoint no tiene modo aproximado: su resultado es siempre exacto']}
+    return None
 
 @api_view(['GET'])
+@cache_response
 def dataset_overview(request):
     """
     GET /api/overview/
@@ -47,6 +260,25 @@ def dataset_overview(request):
         )
 
 @api_view(['GET'])
+def dataset_version(request):
+    """
+    GET /api/dataset/version/
+    
+    Versión del dataset que se está sirviendo: número (aumenta con cada
+    recarga en caliente de DATASET_PATH), huella, hash del archivo, tipo de
+    la última carga (full o append) y filas añadidas. Sin caché: cambia sin
+    que cambie la huella de las claves.
+    """
+    try:
+        payload = DatasetLoader().current().describe()
+    except Exception as e:
+        logger.error(f"Error obteniendo la versión del dataset: {e}")
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    payload['watch_interval'] = data_loader.DATASET_WATCH_INTERVAL
+    return Response(payload, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@cache_response
 def class_distribution(request):
     """
     GET /api/class-distribution/
@@ -56,10 +288,22 @@ def class_distribution(request):
     - Anomaly: ~33% (intentos de ataque)
     
     Importante para entender el balance del dataset y evaluar métricas.
+    
+    Filtros opcionales (ver _dataset_filters):
+    - class, protocol_type, service, flag: subconjunto de filas (?protocol_type=tcp&service=http,ftp)
+    - approx: respuesta aproximada con intervalos de confianza desde una muestra
+      estratificada (?approx=true, ?approx=0.01 de error objetivo o ?approx=200ms)
     """
     try:
         analytics = _initialize_analytics()
-        data = analytics.get_class_distribution()
+        filters, errors = _dataset_filters(request, analytics)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        engine, errors = _approximation(request, analytics)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        filters.pop('features', None)
+        data = engine.get_class_distribution(**filters)
         return Response(data, status=status.HTTP_200_OK)
     except Exception as e:
         logger.error(f"Error en class_distribution: {e}")
@@ -69,6 +313,7 @@ def class_distribution(request):
         )
 
 @api_view(['GET'])
+@cache_response
 def statistics(request):
     """
     GET /api/statistics/
@@ -79,10 +324,29 @@ def statistics(request):
     - Desviación estándar: dispersión de datos
     - Mín/Máx: rangos
     - Cuartiles (Q25, Q75): distribución percentil
+    
+    Parámetros opcionales:
+    - percentiles: percentiles extra separados por comas (?percentiles=0.9,0.99)
+    - class, protocol_type, service, flag: subconjunto de filas (?protocol_type=tcp&service=http,ftp)
+    - features: columnas a incluir (?features=src_bytes,dst_bytes)
+    - approx: respuesta aproximada con intervalos de confianza desde una muestra
+      estratificada (?approx=true, ?approx=0.01 de error objetivo o ?approx=200ms)
     """
+    serializer = StatisticsFilterSerializer(data=_list_params(request, 'percentiles'))
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
     try:
         analytics = _initialize_analytics()
-        data = analytics.get_statistics()
+        filters, errors = _dataset_filters(request, analytics)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        engine, errors = _approximation(request, analytics)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        data = engine.get_statistics(
+            percentiles=serializer.validated_data.get('percentiles'), **filters
+        )
         return Response(data, status=status.HTTP_200_OK)
     except Exception as e:
         logger.error(f"Error en statistics: {e}")
@@ -92,6 +356,7 @@ def statistics(request):
         )
 
 @api_view(['GET'])
+@cache_response
 def correlation_matrix(request):
     """
     GET /api/correlation-matrix/
@@ -101,11 +366,25 @@ def correlation_matrix(request):
     - Valores cercanos a -1: correlación negativa fuerte
     - Valores cercanos a 0: sin correlación lineal
     
+    Formato compacto: 'columns' (orden de las características) y 'values'
+    (triángulo superior sin diagonal, por filas).
+    
     NOTA: Solo captura relaciones LINEALES. Relaciones no-lineales no se detectan.
+    
+    Filtros opcionales (ver _dataset_filters):
+    - class, protocol_type, service, flag: subconjunto de filas (?protocol_type=tcp&service=http,ftp)
+    - features: columnas a incluir (?features=src_bytes,dst_bytes)
     """
+    errors = _exact_only(request)
+    if errors:
+        return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+    
     try:
         analytics = _initialize_analytics()
-        data = analytics.get_correlation_matrix()
+        filters, errors = _dataset_filters(request, analytics)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        data = analytics.get_correlation_matrix(**filters)
         return Response(data, status=status.HTTP_200_OK)
     except Exception as e:
         logger.error(f"Error en correlation_matrix: {e}")
@@ -115,18 +394,70 @@ def correlation_matrix(request):
         )
 
 @api_view(['GET'])
+@cache_response
+def top_correlations(request):
+    """
+    GET /api/correlation-matrix/top/?k=10
+    
+    Los k pares de características con mayor correlación absoluta, de mayor
+    a menor. Útil para detectar variables redundantes sin recorrer la matriz.
+    
+    Acepta los mismos filtros que /api/correlation-matrix/.
+    """
+    serializer = TopCorrelationSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    errors = _exact_only(request)
+    if errors:
+        return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        analytics = _initialize_analytics()
+        filters, errors = _dataset_filters(request, analytics)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        data = analytics.get_top_correlations(k=serializer.validated_data['k'], **filters)
+        return Response(data, status=status.HTTP_200_OK)
+    except Exception as e:
+        logger.error(f"Error en top_correlations: {e}")
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@api_view(['GET'])
+@cache_response
 def feature_distributions(request):
     """
     GET /api/feature-distributions/
     
-    Histogramas de distribución de características numéricas:
-    - Frecuencia en 30 intervalos (bins)
+    Histogramas de distribución de todas las características numéricas:
+    - Frecuencia en 30 intervalos (bins) por defecto
     - Útil para identificar distribuciones normales, sesgadas, multimodales
     - Ayuda a detectar outliers y anomalías
+    
+    Parámetros opcionales:
+    - bins: número de intervalos, divisor de 960 (10, 15, 20, 30, 60, 120...);
+      sin filtros de filas se re-agregan de la pirámide precalculada
+    - binning: linear (por defecto), log (colas largas como src_bytes) o quantile
+    - class, protocol_type, service, flag: subconjunto de filas (?protocol_type=tcp&service=http,ftp)
+    - features: columnas a incluir (?features=src_bytes,dst_bytes)
     """
+    serializer = DistributionSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    errors = _exact_only(request)
+    if errors:
+        return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+    
     try:
         analytics = _initialize_analytics()
-        data = analytics.get_feature_distributions()
+        filters, errors = _dataset_filters(request, analytics)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        data = analytics.get_feature_distributions(**serializer.validated_data, **filters)
         return Response(data, status=status.HTTP_200_OK)
     except Exception as e:
         logger.error(f"Error en feature_distributions: {e}")
@@ -136,18 +467,36 @@ def feature_distributions(request):
         )
 
 @api_view(['GET'])
+@cache_response
 def categorical_analysis(request):
     """
     GET /api/categorical-analysis/
     
-    Análisis de características categóricas:
-    - Frecuencia de cada valor (protocolo, servicio, etc.)
+    Análisis de todas las características categóricas:
+    - Frecuencia de los valores más frecuentes (protocolo, servicio, etc.)
     - Útil para entender qué tipos de protocolos y servicios dominan
     - Importante para análisis de patrones de ataque
+    
+    Parámetros opcionales:
+    - top: valores a listar por columna (20 por defecto); el resto se suma en other
+    - class, protocol_type, service, flag: subconjunto de filas (?protocol_type=tcp&service=http,ftp)
+    - features: columnas a incluir (?features=service,flag)
+    - approx: respuesta aproximada con intervalos de confianza desde una muestra
+      estratificada (?approx=true, ?approx=0.01 de error objetivo o ?approx=200ms)
     """
+    serializer = CategoricalSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
     try:
         analytics = _initialize_analytics()
-        data = analytics.get_categorical_analysis()
+        filters, errors = _dataset_filters(request, analytics)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        engine, errors = _approximation(request, analytics)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        data = engine.get_categorical_analysis(top=serializer.validated_data['top'], **filters)
         return Response(data, status=status.HTTP_200_OK)
     except Exception as e:
         logger.error(f"Error en categorical_analysis: {e}")
@@ -157,18 +506,76 @@ def categorical_analysis(request):
         )
 
 @api_view(['GET'])
+@cache_response
+def categorical_crosstab(request):
+    """
+    GET /api/categorical-analysis/crosstab/?column=service
+    
+    Tabla de contingencia de una columna categórica contra class:
+    - Registros de cada valor por clase y proporción de cada clase en el valor
+    - Los top valores con más registros (20 por defecto); el resto en other
+    
+    Parámetros opcionales:
+    - top: valores a listar
+    - grouping: binary (normal/anomaly, por defecto) o family (normal, DoS, Probe, R2L, U2R)
+    - class, protocol_type, service, flag: subconjunto de filas (?protocol_type=tcp)
+    """
+    serializer = CrosstabSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    options = serializer.validated_data
+    
+    try:
+        analytics = _initialize_analytics()
+        if options['column'] not in analytics.categorical_cols:
+            return Response(
+                {'column': [f'Columna categórica desconocida: {options["column"]}']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        filters, errors = _dataset_filters(request, analytics)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        filters.pop('features', None)
+        data = analytics.get_categorical_crosstab(**options, **filters)
+        return Response(data, status=status.HTTP_200_OK)
+    except Exception as e:
+        logger.error(f"Error en categorical_crosstab: {e}")
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@api_view(['GET'])
+@cache_response
 def anomaly_analysis(request):
     """
     GET /api/anomaly-analysis/
     
     Comparación estadística entre conexiones normales y anómalas:
-    - Media de características para cada clase
-    - Diferencias que pueden ser indicadores de ataque
+    - Media, desviación estándar y conteo de cada característica numérica por clase
+    - Diferencias y tamaño del efecto (Cohen's d, SMD) como indicadores de ataque
     - Cuenta total de registros normales vs anómalos
+    
+    Parámetros opcionales:
+    - grouping: binary (normal/anomaly, por defecto) o family (normal, DoS, Probe, R2L, U2R)
+    - class, protocol_type, service, flag: subconjunto de filas (?protocol_type=tcp&service=http,ftp)
+    - features: columnas a incluir (?features=src_bytes,dst_bytes)
+    - approx: respuesta aproximada con intervalos de confianza desde una muestra
+      estratificada (?approx=true, ?approx=0.01 de error objetivo o ?approx=200ms)
     """
+    serializer = AnomalyGroupingSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
     try:
         analytics = _initialize_analytics()
-        data = analytics.get_anomaly_statistics()
+        filters, errors = _dataset_filters(request, analytics)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        engine, errors = _approximation(request, analytics)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        data = engine.get_anomaly_statistics(grouping=serializer.validated_data['grouping'], **filters)
         return Response(data, status=status.HTTP_200_OK)
     except Exception as e:
         logger.error(f"Error en anomaly_analysis: {e}")
@@ -178,25 +585,318 @@ def anomaly_analysis(request):
         )
 
 @api_view(['GET'])
+@cache_response
+def drift(request):
+    """
+    GET /api/drift/
+    
+    Deriva del dataset de prueba (TEST_DATASET_PATH, p.ej. KDDTest+ o
+    tráfico reciente) respecto al de entrenamiento, por característica:
+    - numéricas: PSI sobre 10 bins de igual frecuencia del entrenamiento y
+      estadístico de Kolmogorov-Smirnov (con su p-valor asintótico)
+    - categóricas: PSI, divergencia de Jensen-Shannon, categorías nuevas o
+      ausentes y las de mayor cambio de frecuencia
+    - drifted: características con PSI >= 0.1, de mayor a menor
+    
+    Parámetros opcionales:
+    - features: columnas a incluir (?features=src_bytes,service)
+    """
+    try:
+        analytics = _initialize_analytics()
+        version = DatasetLoader().current()
+        if not hasattr(analytics, 'get_drift'):
+            return Response(
+                {'error': 'El análisis de deriva no está disponible en modo streaming'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if version.test is None:
+            return Response(
+                {'error': 'No hay dataset de prueba cargado (TEST_DATASET_PATH)'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        filters, errors = _dataset_filters(request, analytics)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        if filters.get('mask') is not None:
+            return Response(
+                {'error': 'El análisis de deriva compara los datasets completos: solo admite features'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        data = analytics.get_drift(version.test, features=filters.get('features'))
+        return Response(data, status=status.HTTP_200_OK)
+    except Exception as e:
+        logger.error(f"Error en drift: {e}")
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@api_view(['GET'])
+@cache_response
 def model_metrics(request):
     """
     GET /api/model-metrics/
     
-    Métricas esperadas de modelos de machine learning para NSL-KDD:
+    Métricas medidas del detector entrenado sobre el dataset (api/detector.py),
+    evaluado en un 20% de registros reservados:
     - Accuracy: Porcentaje de predicciones correctas
     - Precision: De las anomalías detectadas, cuántas son reales
     - Recall: De todas las anomalías reales, cuántas detectamos
     - F1-Score: Balance entre Precision y Recall
+    - ROC AUC y matriz de confusión
     
-    Estas son métricas benchmark basadas en investigaciones sobre NSL-KDD.
+    Responde 202 (sin cachear) mientras el modelo se entrena en segundo plano
+    y 503 si el entrenamiento falló.
     """
     try:
         analytics = _initialize_analytics()
         data = analytics.get_model_metrics()
-        return Response(data, status=status.HTTP_200_OK)
+        code = {
+            'ready': status.HTTP_200_OK,
+            'failed': status.HTTP_503_SERVICE_UNAVAILABLE,
+        }.get(data['status'], status.HTTP_202_ACCEPTED)
+        return Response(data, status=code)
     except Exception as e:
         logger.error(f"Error en model_metrics: {e}")
         return Response(
             {'error': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+@api_view(['POST'])
+def score(request):
+    """
+    POST /api/score/
+    
+    Puntúa registros de conexión con el detector en una sola llamada
+    vectorizada (hasta 10,000 registros por petición):
+    {"records": [{"protocol_type": "tcp", "service": "http", "src_bytes": 181, ...}, ...]}
+    También acepta la lista de registros directamente como cuerpo.
+    
+    Las características ausentes o desconocidas se tratan como faltantes y se
+    listan en missing_features. Retorna por registro la probabilidad de
+    anomalía (scores) y la predicción (normal/anomaly) según threshold (0.5).
+    Responde 503 con Retry-After mientras el modelo se entrena.
+    """
+    payload = request.data
+    if isinstance(payload, list):
+        payload = {'records': payload}
+    serializer = ScoreSerializer(data=payload)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    options = serializer.validated_data
+    
+    try:
+        with phase('compute'):
+            frame = pd.DataFrame.from_records(options['records'])
+            result = detector.score(frame, options['threshold'])
+        
+        if result is None:
+            model = detector.describe()
+            response = Response(
+                {'status': model['status'], 'error': model['error']},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+            response['Retry-After'] = '5'
+            return response
+        
+        missing = [col for col in detector.features if col not in frame.columns]
+        if len(missing) == len(detector.features):
+            return Response(
+                {'records': ['Ningún registro contiene características del modelo']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        scores, anomalies = result
+        return Response({
+            'count': len(scores),
+            'threshold': options['threshold'],
+            'anomalies': int(anomalies.sum()),
+            'scores': scores.astype(np.float32),
+            'predictions': np.where(anomalies, 'anomaly', 'normal'),
+            'missing_features': missing,
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        logger.error(f"Error en score: {e}")
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+def _ndjson(results):
+    """Una línea JSON por sección de iter_sections"""
+    for name, payload, error in results:
+        line = {'section': name, 'error': error} if error else {'section': name, 'data': payload}
+        yield render_json(line) + b'\n'
+
+@api_view(['GET'])
+@cache_response
+def batch(request):
+    """
+    GET /api/batch/?sections=overview,statistics,correlation-matrix
+    
+    Varias secciones del dashboard en una sola petición, con el mismo JSON
+    que sus endpoints individuales: {"overview": {...}, "statistics": {...}}.
+    Las secciones comparten el trabajo sobre el dataset (ver api/batch.py):
+    una extracción de columnas, una máscara de NaN y una agrupación por clase.
+    
+    Parámetros opcionales:
+    - sections: por defecto las 8 secciones del dashboard; también top-correlations
+    - stream: true para recibir NDJSON, una línea {"section", "data"} (o
+      {"section", "error"}) por sección en cuanto está calculada
+    - percentiles (statistics), k (top-correlations), bins y binning
+      (feature-distributions), top (categorical-analysis) y grouping (anomaly-analysis)
+    - class, protocol_type, service, flag y features: se aplican a todas las secciones
+    """
+    params = _list_params(request, 'sections', 'percentiles')
+    for name in ('stream', 'k', 'bins', 'binning', 'top', 'grouping'):
+        if name in request.query_params:
+            params[name] = request.query_params[name]
+    serializer = BatchSerializer(data=params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    options = serializer.validated_data
+    sections = list(dict.fromkeys(options['sections']))
+    
+    try:
+        analytics = _initialize_analytics()
+        filters, errors = _dataset_filters(request, analytics)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        results = iter_sections(
+            analytics, sections, filters,
+            percentiles=options.get('percentiles'), k=options['k'], bins=options['bins'],
+            binning=options['binning'], top=options['top'], grouping=options['grouping'],
+        )
+        
+        if options['stream']:
+            response = StreamingHttpResponse(_ndjson(results), content_type='application/x-ndjson')
+            response['X-Accel-Buffering'] = 'no'
+            return response
+        
+        data, errors = {}, {}
+        for name, payload, error in results:
+            if error:
+                errors[name] = error
+            else:
+                data[name] = payload
+        if errors:
+            return Response({'error': errors}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response(data, status=status.HTTP_200_OK)
+    except Exception as e:
+        logger.error(f"Error en batch: {e}")
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@api_view(['GET'])
+def record_list(request):
+    """
+    GET /api/records/?limit=1000&features=duration,service,class
+    
+    Registros del dataset cargado, en streaming y por páginas con cursor:
+    - NDJSON (un objeto por línea) o, con output=arrow, un stream IPC de
+      Apache Arrow (requiere pyarrow)
+    - X-Next-Cursor (y Link rel="next") con el cursor de la página
+      siguiente; sin la cabecera no hay más registros. Un cursor solo vale
+      para la versión del dataset que lo generó
+    
+    Parámetros opcionales:
+    - limit: registros por página (1000 por defecto, hasta 1,000,000); se
+      serializan por bloques, así que la memoria no crece con la página
+    - cursor: continúa donde terminó la página anterior
+    - features: columnas a incluir (por defecto todas)
+    - class, protocol_type, service, flag: solo las filas de ese subconjunto
+    
+    Sin caché de respuestas: el cuerpo se genera mientras se envía.
+    """
+    params = {name: request.query_params[name] for name in ('limit', 'cursor', 'output') if name in request.query_params}
+    serializer = RecordsSerializer(data=params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    options = serializer.validated_data
+    if options['output'] == 'arrow' and records.pa is None:
+        return Response({'output': ['El formato arrow requiere pyarrow instalado']}, status=status.HTTP_400_BAD_REQUEST)
+    
+    loader = DatasetLoader()
+    try:
+        with loader.pinned() as version:
+            analytics = _initialize_analytics()
+            if version.data is None:
+                return Response(
+                    {'error': 'Los registros no están disponibles en modo streaming'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            filters, errors = _dataset_filters(request, analytics)
+            if errors:
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                start = records.decode_cursor(options['cursor'], version) if 'cursor' in options else 0
+            except ValueError as e:
+                return Response({'cursor': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+            
+            columns = filters.get('features') or version.data.columns.tolist()
+            page = records.RecordPage(version.data, columns, start, options['limit'], filters.get('mask'))
+    except Exception as e:
+        logger.error(f"Error en record_list: {e}")
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    
+    body = page.arrow() if options['output'] == 'arrow' else page.ndjson()
+    response = StreamingHttpResponse(body, content_type=records.RECORDS_FORMATS[options['output']])
+    response['X-Accel-Buffering'] = 'no'
+    response['X-Record-Count'] = str(page.rows)
+    response['X-Dataset-Version'] = str(version.number)
+    if page.next is not None:
+        cursor = records.encode_cursor(version, page.next)
+        query = request.GET.copy()
+        query['cursor'] = cursor
+        response['X-Next-Cursor'] = cursor
+        response['Link'] = f'<{request.build_absolute_uri("?" + query.urlencode())}>; rel="next"'
+    return response
+
+@api_view(['GET'])
+def job_detail(request, job_id):
+    """
+    GET /api/jobs/<id>/?wait=30
+    
+    Estado de un job creado por un endpoint de analytics con ?async=true
+    (o por un endpoint costoso sobre un dataset grande, ver api/jobs.py):
+    - 202 con status pending/running mientras se calcula
+    - 200 con status done y result (el JSON del endpoint) al terminar, o
+      status failed con status_code y result (el error del endpoint)
+    
+    wait (segundos, máximo 60) activa el long-poll: la respuesta espera a que
+    el job termine. Conviene con workers gthread, ya que ocupa un hilo.
+    """
+    serializer = JobWaitSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    job = jobs.wait(job_id, serializer.validated_data['wait'])
+    if job is None:
+        return Response({'error': 'Job no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+    if job.status in jobs.ACTIVE:
+        return Response(jobs.describe(job), status=status.HTTP_202_ACCEPTED)
+    
+    # El resultado ya es JSON: se inserta sin volver a parsearlo
+    meta = render_json(jobs.describe(job))
+    return HttpResponse(meta[:-1] + b',"result":' + bytes(job.result) + b'}', content_type='application/json')
+
+# Endpoints precalculados durante el warm-up
+WARMUP_VIEWS = [
+    dataset_overview,
+    class_distribution,
+    statistics,
+    correlation_matrix,
+    top_correlations,
+    feature_distributions,
+    categorical_analysis,
+    anomaly_analysis,
+    drift,
+    model_metrics,
+    batch,
+]
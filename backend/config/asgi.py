@@ -0,0 +1,12 @@
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Vistas de analytics async con el cálculo en un pool acotado (api/offload.py)
+os.environ.setdefault('ANALYTICS_ASGI', 'True')
+
+application = get_asgi_application()
+
+# Carga el dataset y precalcula los payloads antes de aceptar tráfico
+from api.views import warm_up_server
+warm_up_server()
@@ -1,3 +1,4 @@
+import ipaddress
 import os
 from pathlib import Path
 from corsheaders.defaults import default_headers
@@ -17,6 +18,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.TimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -24,6 +26,8 @@ MIDDLEWARE = [
 
 CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', 'http://localhost:3000').split(',')
 CORS_ALLOW_CREDENTIALS = True
+# Cabeceras de paginación de /api/records/ legibles desde el navegador
+CORS_EXPOSE_HEADERS = ['Link', 'X-Next-Cursor', 'X-Record-Count', 'X-Dataset-Version']
 
 ROOT_URLCONF = 'config.urls'
 
@@ -44,6 +48,8 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Los hilos de jobs y los workers de gunicorn escriben en la misma base
+        'OPTIONS': {'timeout': 20},
     }
 }
 
@@ -51,12 +57,50 @@ USE_TZ = True
 LANGUAGE_CODE = 'es-es'
 
 REST_FRAMEWORK = {
+    # Serializa arrays y escalares NumPy/pandas directamente (orjson si está instalado)
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.renderers.NumpyJSONRenderer',
     ],
     'EXCEPTION_HANDLER': 'api.exceptions.custom_exception_handler',
 }
 
+# Cargar datos y precalcular respuestas al arrancar (activar en el proceso web)
+ANALYTICS_WARMUP = os.getenv('ANALYTICS_WARMUP', 'False') == 'True'
+
+# Procesos para estadísticas, correlación y comparación por clase (0/1 = secuencial).
+# Por debajo de ANALYTICS_PARALLEL_MIN_ROWS filas se usa siempre el modo secuencial.
+ANALYTICS_PARALLEL_WORKERS = int(os.getenv('ANALYTICS_PARALLEL_WORKERS', '0'))
+ANALYTICS_PARALLEL_MIN_ROWS = int(os.getenv('ANALYTICS_PARALLEL_MIN_ROWS', '200000'))
+
+# Jobs en segundo plano (api/jobs.py): hilos por worker, y a partir de cuántas
+# filas los endpoints costosos responden 202 con un job sin ?async=true (0 = nunca)
+ANALYTICS_JOB_WORKERS = int(os.getenv('ANALYTICS_JOB_WORKERS', '2'))
+ANALYTICS_JOBS_MIN_ROWS = int(os.getenv('ANALYTICS_JOBS_MIN_ROWS', '0'))
+# Segundos sin latido (un job en curso lo renueva cada tercio) tras los que un
+# job activo se da por perdido, y retención de los resultados terminados
+ANALYTICS_JOB_TIMEOUT = int(os.getenv('ANALYTICS_JOB_TIMEOUT', '600'))
+ANALYTICS_JOB_RETENTION = int(os.getenv('ANALYTICS_JOB_RETENTION', str(7 * 24 * 3600)))
+
+# Despliegue ASGI (config/asgi.py lo activa): las vistas de analytics se
+# ejecutan en un pool de ANALYTICS_ASYNC_WORKERS hilos fuera del event loop
+ANALYTICS_ASGI = os.getenv('ANALYTICS_ASGI', 'False') == 'True'
+ANALYTICS_ASYNC_WORKERS = int(os.getenv('ANALYTICS_ASYNC_WORKERS', '4'))
+
+# Acceso a /metrics/: conexiones directas desde estas redes (por defecto
+# loopback y privadas) o, si se define METRICS_TOKEN, con ese bearer token
+METRICS_ALLOWED_NETWORKS = [
+    ipaddress.ip_network(network.strip())
+    for network in os.getenv(
+        'METRICS_ALLOWED_NETWORKS',
+        '127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16',
+    ).split(',')
+    if network.strip()
+]
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Caché de respuestas JSON de /api/ (bytes totales incluyendo variantes gzip/brotli)
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
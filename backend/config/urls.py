@@ -1,16 +1,58 @@
+import hmac
+import ipaddress
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
 from django.urls import path, include
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from rest_framework import status
+from api import metrics
+from api.views import is_ready
 
 @api_view(['GET'])
 def health_check(request):
-    """Verificar que el servidor está funcionando"""
+    """Verificar que el servidor está funcionando (liveness)"""
     return Response({
         'status': 'healthy',
         'message': 'API de análisis NSL-KDD funcionando correctamente'
     })
 
+@api_view(['GET'])
+def readiness_check(request):
+    """Verificar que el dataset está cargado y precalculado (readiness)"""
+    if is_ready():
+        return Response({'status': 'ready'})
+    return Response(
+        {'status': 'warming_up'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+def _metrics_allowed(request):
+    """
+    /metrics/ no es público: con METRICS_TOKEN, la petición debe traer
+    `Authorization: Bearer <token>`; sin él, debe llegar directa (sin pasar
+    por el proxy, que añade X-Forwarded-For) desde METRICS_ALLOWED_NETWORKS.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if 'X-Forwarded-For' in request.headers:
+        return False
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in network for network in getattr(settings, 'METRICS_ALLOWED_NETWORKS', ()))
+
+def metrics_view(request):
+    """Métricas en formato de texto de Prometheus (del worker que responde)"""
+    if not _metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 urlpatterns = [
     path('health/', health_check, name='health_check'),
+    path('health/ready/', readiness_check, name='readiness_check'),
+    path('metrics/', metrics_view, name='metrics'),
     path('api/', include('api.urls')),
 ]
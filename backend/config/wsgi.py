@@ -4,3 +4,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Carga el dataset y precalcula los payloads antes de aceptar tráfico
+from api.views import warm_up_server
+warm_up_server()
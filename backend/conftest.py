@@ -0,0 +1,6 @@
+import os
+import django
+
+# Los tests usan los módulos de api/ sin servidor ni base de datos
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
@@ -12,6 +12,8 @@ interface AnomalyData {
       normal_mean: number
       anomaly_mean: number
       difference: number
+      cohens_d: number | null
+      smd: number | null
       explanation: string
     }
   >
@@ -43,11 +45,15 @@ export default function AnomalyAnalysis() {
   if (isLoading) return <LoadingSpinner />
   if (!data) return null
 
-  const chartData = Object.entries(data.comparison).map(([feature, stats]) => ({
-    name: feature.substring(0, 12),
-    normal: Number.parseFloat(stats.normal_mean.toFixed(2)),
-    anomaly: Number.parseFloat(stats.anomaly_mean.toFixed(2)),
-  }))
+  // Las 10 características con mayor tamaño del efecto (|Cohen's d|)
+  const chartData = Object.entries(data.comparison)
+    .sort(([, a], [, b]) => Math.abs(b.cohens_d ?? 0) - Math.abs(a.cohens_d ?? 0))
+    .slice(0, 10)
+    .map(([feature, stats]) => ({
+      name: feature.substring(0, 12),
+      normal: Number.parseFloat(stats.normal_mean.toFixed(2)),
+      anomaly: Number.parseFloat(stats.anomaly_mean.toFixed(2)),
+    }))
 
   return (
     <div className="space-y-6">
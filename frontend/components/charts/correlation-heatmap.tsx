@@ -3,15 +3,20 @@
 import { useEffect, useState } from "react"
 import LoadingSpinner from "../loading-spinner"
 
-interface CorrelationMatrix {
-  [key: string]: Record<string, number>
-}
-
 interface CorrelationData {
-  correlation_matrix: CorrelationMatrix
+  columns: string[]
+  // Triángulo superior sin diagonal, por filas
+  values: (number | null)[]
   explanation: string
 }
 
+const correlationAt = (data: CorrelationData, i: number, j: number) => {
+  if (i === j) return 1
+  const [row, col] = i < j ? [i, j] : [j, i]
+  const k = data.columns.length
+  return data.values[row * k - (row * (row + 1)) / 2 + (col - row - 1)] ?? 0
+}
+
 export default function CorrelationHeatmap() {
   const [data, setData] = useState<CorrelationData | null>(null)
   const [isLoading, setIsLoading] = useState(true)
@@ -35,7 +40,7 @@ export default function CorrelationHeatmap() {
   if (isLoading) return <LoadingSpinner />
   if (!data) return null
 
-  const features = Object.keys(data.correlation_matrix).slice(0, 8)
+  const features = data.columns.slice(0, 8)
 
   const getColor = (value: number) => {
     const abs = Math.abs(value)
@@ -65,11 +70,11 @@ export default function CorrelationHeatmap() {
             </tr>
           </thead>
           <tbody>
-            {features.map((row) => (
+            {features.map((row, i) => (
               <tr key={row}>
                 <td className="bg-card border border-border p-2 text-sm font-semibold">{row.substring(0, 10)}</td>
-                {features.map((col) => {
-                  const value = data.correlation_matrix[row]?.[col] ?? 0
+                {features.map((col, j) => {
+                  const value = correlationAt(data, i, j)
                   return (
                     <td
                       key={`${row}-${col}`}
@@ -14,18 +14,31 @@ interface DistributionData {
   }
 }
 
+// Resoluciones servidas desde la pirámide precalculada del backend (divisores de 960)
+const BIN_OPTIONS = [10, 15, 20, 30, 60, 120, 240]
+
+const BINNING_OPTIONS = [
+  { value: "linear", label: "Lineal" },
+  { value: "log", label: "Logarítmico" },
+  { value: "quantile", label: "Cuantiles" },
+]
+
 export default function FeatureDistributions() {
   const [distributions, setDistributions] = useState<DistributionData | null>(null)
   const [isLoading, setIsLoading] = useState(true)
   const [selectedFeature, setSelectedFeature] = useState<string | null>(null)
+  const [bins, setBins] = useState(30)
+  const [binning, setBinning] = useState("linear")
 
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/feature-distributions/`)
+        const response = await fetch(
+          `${process.env.NEXT_PUBLIC_API_URL}/feature-distributions/?bins=${bins}&binning=${binning}`,
+        )
         const result = await response.json()
         setDistributions(result)
-        setSelectedFeature(Object.keys(result)[0])
+        setSelectedFeature((current) => (current && current in result ? current : Object.keys(result)[0]))
       } catch (err) {
         console.error("Error:", err)
       } finally {
@@ -34,7 +47,7 @@ export default function FeatureDistributions() {
     }
 
     fetchData()
-  }, [])
+  }, [bins, binning])
 
   if (isLoading) return <LoadingSpinner />
   if (!distributions) return null
@@ -64,6 +77,36 @@ export default function FeatureDistributions() {
             </option>
           ))}
         </select>
+        <div className="grid grid-cols-2 gap-4 mt-4">
+          <div>
+            <label className="text-sm text-muted">Intervalos</label>
+            <select
+              value={bins}
+              onChange={(e) => setBins(Number(e.target.value))}
+              className="w-full mt-2 bg-background border border-border rounded px-3 py-2 text-foreground"
+            >
+              {BIN_OPTIONS.map((option) => (
+                <option key={option} value={option}>
+                  {option}
+                </option>
+              ))}
+            </select>
+          </div>
+          <div>
+            <label className="text-sm text-muted">Escala</label>
+            <select
+              value={binning}
+              onChange={(e) => setBinning(e.target.value)}
+              className="w-full mt-2 bg-background border border-border rounded px-3 py-2 text-foreground"
+            >
+              {BINNING_OPTIONS.map((option) => (
+                <option key={option.value} value={option.value}>
+                  {option.label}
+                </option>
+              ))}
+            </select>
+          </div>
+        </div>
       </Card>
 
       <div className="bg-blue-900/20 border border-blue-700/30 p-4 rounded-lg">
@@ -5,13 +5,26 @@ import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContaine
 import { Card } from "@/components/ui/card"
 import LoadingSpinner from "./loading-spinner"
 
+interface Metrics {
+  accuracy: number
+  precision: number
+  recall: number
+  f1_score: number
+}
+
 interface MetricsData {
-  expected_metrics: {
-    accuracy: number
-    precision: number
-    recall: number
-    f1_score: number
-  }
+  status: "idle" | "training" | "ready" | "failed"
+  error: string | null
+  measured_metrics: (Metrics & { roc_auc: number }) | null
+  confusion_matrix: number[][] | null
+  model: {
+    algorithm: string
+    train_rows: number
+    test_rows: number
+    training_seconds: number
+    scoring_records_per_second: number
+  } | null
+  expected_metrics: Metrics
   explanation: string
   dataset_characteristics: {
     imbalanced: boolean
@@ -25,11 +38,15 @@ export default function ModelMetrics() {
   const [isLoading, setIsLoading] = useState(true)
 
   useEffect(() => {
+    let timer: ReturnType<typeof setTimeout> | undefined
+
     const fetchData = async () => {
       try {
         const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/model-metrics/`)
         const result = await response.json()
         setData(result)
+        // 202: el detector se está entrenando en el backend, volver a consultar
+        if (response.status === 202) timer = setTimeout(fetchData, 5000)
       } catch (err) {
         console.error("Error:", err)
       } finally {
@@ -38,12 +55,18 @@ export default function ModelMetrics() {
     }
 
     fetchData()
+    return () => clearTimeout(timer)
   }, [])
 
   if (isLoading) return <LoadingSpinner />
   if (!data) return null
 
-  const metricsData = Object.entries(data.expected_metrics).map(([name, value]) => ({
+  const measured = data.measured_metrics
+  const shown: Metrics = measured
+    ? { accuracy: measured.accuracy, precision: measured.precision, recall: measured.recall, f1_score: measured.f1_score }
+    : data.expected_metrics
+
+  const metricsData = Object.entries(shown).map(([name, value]) => ({
     name:
       name === "accuracy" ? "Accuracy" : name === "precision" ? "Precisión" : name === "recall" ? "Recall" : "F1-Score",
     value: (value * 100).toFixed(1),
@@ -54,6 +77,14 @@ export default function ModelMetrics() {
 
   return (
     <div className="space-y-6">
+      <div className="text-sm text-muted">
+        {measured && data.model
+          ? `Medidas sobre ${data.model.test_rows.toLocaleString()} registros reservados · ${data.model.algorithm} entrenado con ${data.model.train_rows.toLocaleString()} registros en ${data.model.training_seconds.toFixed(1)} s · ROC AUC ${measured.roc_auc.toFixed(3)}`
+          : data.status === "failed"
+            ? `El entrenamiento del detector falló: ${data.error}. Se muestran valores de referencia.`
+            : "Entrenando el detector... se muestran valores de referencia de NSL-KDD."}
+      </div>
+
       <div className="bg-blue-900/20 border border-blue-700/30 p-4 rounded-lg">
         <h3 className="font-semibold mb-2">Explicación de Métricas</h3>
         <p className="text-sm text-muted mb-4">{data.explanation}</p>
@@ -106,6 +137,33 @@ export default function ModelMetrics() {
         ))}
       </div>
 
+      {data.confusion_matrix && (
+        <Card className="bg-card border-border p-6">
+          <h3 className="font-semibold mb-4">Matriz de Confusión</h3>
+          <table className="text-sm">
+            <thead>
+              <tr>
+                <th />
+                <th className="px-4 py-2 text-muted">Predicho normal</th>
+                <th className="px-4 py-2 text-muted">Predicho anomalía</th>
+              </tr>
+            </thead>
+            <tbody>
+              {data.confusion_matrix.map((row, i) => (
+                <tr key={i}>
+                  <td className="px-4 py-2 text-muted">{i === 0 ? "Normal" : "Anomalía"}</td>
+                  {row.map((count, j) => (
+                    <td key={j} className="px-4 py-2 text-right font-semibold">
+                      {count.toLocaleString()}
+                    </td>
+                  ))}
+                </tr>
+              ))}
+            </tbody>
+          </table>
+        </Card>
+      )}
+
       <Card className="bg-card border-border p-6">
         <h3 className="font-semibold mb-4">Características del Dataset</h3>
         <div className="space-y-3">